@@ -5,6 +5,10 @@ import json
 import sys
 from pathlib import Path
 
+# Share the backend's word diff engine
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from word_diff import new_words as find_new_words
+
 def analyze_pdf_structure(pdf_path, start_page=47, end_page=90):
     """Analyze PDF structure and extract field information"""
     print(f"Analyzing {pdf_path}...")
@@ -114,23 +118,14 @@ def compare_pdfs(filled_pdf, blank_pdf, start_page=47, end_page=90):
                     if line['text'].strip() in filled_content:
                         print(f"  - '{line['text']}' at position ({line['x']:.2f}, {line['y']:.2f})")
             
-            # Compare words for more granular analysis
-            filled_words = [(w['text'], w['x'], w['y']) for w in filled_page['words']]
-            blank_words = [(w['text'], w['x'], w['y']) for w in blank_page['words']]
-            
-            # Find words that appear in filled but not in blank (at same positions)
-            new_words = []
-            for fw in filled_words:
-                found = False
-                for bw in blank_words:
-                    if abs(fw[1] - bw[1]) < 5 and abs(fw[2] - bw[2]) < 5:  # Within 5 points
-                        if fw[0] == bw[0]:
-                            found = True
-                            break
-                if not found and fw[0].strip():
-                    new_words.append(fw)
+            # Find words that appear in filled but not in blank (at same positions, within 5 points)
+            new_words = [
+                (w['text'], w['x'], w['y'])
+                for w in find_new_words(filled_page['words'], blank_page['words'], 5.0, x_key='x', y_key='y')
+            ]
             
             if new_words:
+                differences[page_key] = [{'text': word, 'x': x, 'y': y} for word, x, y in new_words]
                 print(f"New words/fields found: {len(new_words)}")
                 for word, x, y in new_words[:10]:  # Show first 10
                     print(f"  - '{word}' at ({x:.2f}, {y:.2f})")
@@ -0,0 +1,2 @@
+"""Benchmarks for the PDF service. Run from the backend directory, e.g.
+``python -m benchmarks.bench_field_extractor``."""
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Documents per second: N separate /fill-pdf calls against one /fill-pdf-batch call.
+
+Starts the app under uvicorn in a subprocess with the configured executor
+(process workers by default) and fills the same template for N subsidiary
+profiles both ways. The batch figure is the client-side rate; the server's
+own docs/sec from manifest.json is printed next to it.
+
+Usage: python -m benchmarks.bench_batch_fill [--pages 100] [--profiles 16]
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from benchmarks.bench_fill import free_port, start_server
+from benchmarks.corpus import SAMPLE_PROFILE, make_tender_pdf
+from pdf_service import PDFService
+
+
+def multipart(file_field: str, filename: str, content: bytes, fields: Optional[Dict[str, str]] = None):
+    boundary = uuid.uuid4().hex
+    parts = [
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+        for name, value in (fields or {}).items()
+    ]
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n".encode() + content + b"\r\n"
+    )
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def post(port: int, path: str, body: bytes, content_type: str) -> bytes:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+    response = conn.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise SystemExit(f"{path} returned {response.status}: {data[:200]}")
+    return data
+
+
+def make_profiles(count: int):
+    base = {field: SAMPLE_PROFILE.get(field, "n/a") for field in PDFService.validate_profile_data({})[1]}
+    return [{**base, "company_name": f"{base['company_name']} Subsidiary {n + 1}"} for n in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--profiles", type=int, default=16)
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.profiles)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "tender.pdf")
+        make_tender_pdf(pdf_path, args.pages)
+        with open(pdf_path, "rb") as f:
+            template = f.read()
+
+        port = free_port()
+        env = {**os.environ, "AUTO_TENDER_SCRATCH_DIR": os.path.join(tmp_dir, "scratch")}
+        server = start_server(port, env)
+        try:
+            # Warm up the workers so neither run pays for process start-up
+            body, content_type = multipart("template_file", "tender.pdf", template)
+            post(port, "/fill-pdf?" + urlencode({"profile_data": json.dumps(profiles[0])}), body, content_type)
+
+            start = time.perf_counter()
+            for profile in profiles:
+                post(port, "/fill-pdf?" + urlencode({"profile_data": json.dumps(profile)}), body, content_type)
+            single_elapsed = time.perf_counter() - start
+
+            body, content_type = multipart("template_file", "tender.pdf", template,
+                                           {"profiles": json.dumps(profiles)})
+            start = time.perf_counter()
+            archive = post(port, "/fill-pdf-batch", body, content_type)
+            batch_elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        pdf_count = sum(1 for name in zf.namelist() if name.endswith(".pdf"))
+
+    print(f"{args.profiles} profiles on a {args.pages}-page template ({len(template) / 1e6:.1f} MB)")
+    print(f"  {'/fill-pdf x' + str(args.profiles):<16} {single_elapsed:7.2f} s  {args.profiles / single_elapsed:7.2f} docs/s")
+    print(f"  {'/fill-pdf-batch':<16} {batch_elapsed:7.2f} s  {pdf_count / batch_elapsed:7.2f} docs/s"
+          f"  (server {manifest['docs_per_second']} docs/s, {len(manifest['failed'])} failed)")
+    print(f"  speedup {single_elapsed / batch_elapsed:.2f}x, archive {len(archive) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Cold start with and without warm-up: time to serve, and the first request against later ones.
+
+Starts the app under uvicorn with process workers, once with
+AUTO_TENDER_WARMUP=0 and once with it on. For each run it reports the
+seconds from spawning the server to its first response, then times
+/extract-data-from-filled-pdf on distinct small tenders (so no request
+hits the parsed-document cache) and /fill-pdf-using-template, in turn.
+The first request of each endpoint is compared with the median of the
+rest: with warm-up they should match.
+
+Usage: python -m benchmarks.bench_cold_start [--pages 4] [--requests 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from benchmarks.bench_fill import free_port, multipart, start_server
+from benchmarks.corpus import FULL_PROFILE, make_tender_pair
+
+
+def post(port: int, path: str, field: str, pdf: bytes) -> float:
+    """Seconds for one upload to path, response body included"""
+    body, content_type = multipart(field, "tender.pdf", pdf)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    start = time.perf_counter()
+    conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+    response = conn.getresponse()
+    response.read()
+    if response.status != 200:
+        raise SystemExit(f"{path} returned {response.status}")
+    return time.perf_counter() - start
+
+
+def run(tmp_dir: str, warmup: bool, documents, blank: bytes, requests: int):
+    env = {**os.environ, "AUTO_TENDER_EXECUTOR": "process", "AUTO_TENDER_WORKERS": "1",
+           "AUTO_TENDER_WARMUP": "1" if warmup else "0", "AUTO_TENDER_LOG_LEVEL": "WARNING",
+           "AUTO_TENDER_SCRATCH_DIR": os.path.join(tmp_dir, "scratch"),
+           "AUTO_TENDER_TEMPLATE_STORE": os.path.join(tmp_dir, "templates.sqlite3")}
+    env.pop("AUTO_TENDER_CACHE_DIR", None)
+    port = free_port()
+    start = time.perf_counter()
+    server = start_server(port, env)
+    ready = time.perf_counter() - start
+    fill_query = urlencode({"template_data": json.dumps({"filled_values": FULL_PROFILE}),
+                            "profile_data": json.dumps(FULL_PROFILE)})
+    try:
+        extract = [post(port, "/extract-data-from-filled-pdf", "filled_pdf", pdf) for pdf in documents[:requests]]
+        fill = [post(port, f"/fill-pdf-using-template?{fill_query}", "blank_pdf", blank) for _ in range(requests)]
+    finally:
+        server.terminate()
+        server.wait()
+    return ready, extract, fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents = []
+        for seed in range(args.requests):
+            filled_path, blank_path = make_tender_pair(tmp_dir, args.pages, 0.5, seed=seed, name=f"t{seed}")
+            with open(filled_path, "rb") as f:
+                documents.append(f.read())
+        with open(blank_path, "rb") as f:
+            blank = f.read()
+
+        print(f"{'':<10}{'ready':>9}{'extract 1st':>13}{'extract p50':>13}{'fill 1st':>11}{'fill p50':>11}")
+        for warmup in (False, True):
+            ready, extract, fill = run(tmp_dir, warmup, documents, blank, args.requests)
+            print(f"{'warm-up' if warmup else 'cold':<10}{ready:8.2f}s"
+                  f"{extract[0] * 1000:10.1f} ms{statistics.median(extract[1:]) * 1000:10.1f} ms"
+                  f"{fill[0] * 1000:8.1f} ms{statistics.median(fill[1:]) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
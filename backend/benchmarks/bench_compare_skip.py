@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compare time with and without skipping pages whose content fingerprints match.
+
+Builds a filled and a blank tender that differ only on their form pages
+(or fills --pdf through the placeholder locator) and compares every page
+both ways from a cold cache: extracting and diffing all pages, as before,
+and PDFService.compare_pdfs_and_extract_differences, which fingerprints the
+pages first and extracts only those that differ.
+
+Usage: python -m benchmarks.bench_compare_skip [--pages 200] [--form-pages 12] [--pdf tender.pdf]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import SAMPLE_PROFILE, make_tender_pdf
+from pdf_cache import DOCUMENT_CACHE
+from pdf_service import PDFService, TenderInfo
+
+
+def compare_all_pages(filled_path: str, blank_path: str, page_numbers):
+    """The comparison without the fingerprint pre-pass"""
+    filled_text = {str(n): t for n, t in PDFService.extract_page_texts(filled_path, page_numbers).items()}
+    blank_text = {str(n): t for n, t in PDFService.extract_page_texts(blank_path, page_numbers).items()}
+    return PDFService.diff_page_texts(filled_text, blank_text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--form-pages", type=int, default=12)
+    parser.add_argument("--pdf", help="Blank tender to fill and compare (default: a synthetic tender)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filled_path = os.path.join(tmp_dir, "filled.pdf")
+        if args.pdf:
+            blank_path = args.pdf
+            fields = PDFService.get_field_coordinates(blank_path)
+            PDFService.fill_pdf_to_file(blank_path, SAMPLE_PROFILE, TenderInfo("", "", ""), filled_path,
+                                        fields=fields)
+        else:
+            blank_path = os.path.join(tmp_dir, "blank.pdf")
+            form_pages = range(args.pages // 4, args.pages // 4 + args.form_pages)
+            make_tender_pdf(blank_path, args.pages, form_pages=form_pages)
+            make_tender_pdf(filled_path, args.pages, form_pages=form_pages, profile=SAMPLE_PROFILE)
+        page_numbers = list(range(1, PDFService.page_count(blank_path) + 1))
+
+        DOCUMENT_CACHE.clear()
+        start = time.perf_counter()
+        baseline = compare_all_pages(filled_path, blank_path, page_numbers)
+        baseline_seconds = time.perf_counter() - start
+
+        DOCUMENT_CACHE.clear()
+        start = time.perf_counter()
+        result = PDFService.compare_pdfs_and_extract_differences(filled_path, blank_path, page_numbers)
+        skip_seconds = time.perf_counter() - start
+
+    if result['differences'] != baseline['differences']:
+        raise SystemExit("Differences changed when identical pages were skipped")
+    print(f"{len(page_numbers)} pages, {len(result['pages_compared'])} with differences")
+    print(f"  extract all pages   {baseline_seconds:7.2f} s")
+    print(f"  skip identical      {skip_seconds:7.2f} s  ({result['pages_skipped']} pages skipped,"
+          f" {result['pages_scanned']} extracted)")
+    print(f"  speedup {baseline_seconds / skip_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Compare the compiled FieldExtractor with the original per-pattern loop.
+
+Usage: python -m benchmarks.bench_field_extractor [--pages 200] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+from typing import Dict
+
+from field_extractor import DEFAULT_EXTRACTOR, FIELD_PATTERNS
+
+BOILERPLATE = [
+    "The tenderer shall submit the bid in a sealed envelope clearly marked",
+    "All prices shall be quoted in Kenya Shillings inclusive of all taxes",
+    "SECTION IV - FORMS OF TENDER AND QUALIFICATION INFORMATION",
+    "The procuring entity reserves the right to accept or reject any tender",
+    "Bills of quantities shall be read together with the specifications",
+    "Works shall be executed in accordance with the general conditions",
+    "Tender security shall remain valid for thirty days beyond validity",
+    "........................................................................",
+    "_______________________________ ______________________________",
+]
+
+FILLED_LINES = [
+    "Company: Mbale Roadworks Ltd",
+    "Registration: CPR/2019/4411",
+    "Contact: Jane Wanjiru",
+    "Telephone: +254 700 123456",
+    "E-mail: tenders@mbale-roadworks.co.ke",
+    "Address: 12 Moi Avenue, Nairobi",
+    "Turnover: 150,000,000",
+    "Tax ID: P051234567X",
+    "Directors: Jane Wanjiru, Peter Otieno",
+    "Signature: Jane Wanjiru",
+    "Bank Guarantee: Equity Bank, ten percent of contract sum",
+    "Insurance: Comprehensive contractors all risk cover",
+    "Project Value: 42,500,000",
+    "Completion: 2023-11-30",
+    "Equipment: Graders, rollers, tippers",
+    "Methodology: Phased construction with lane closures",
+]
+
+
+def make_document(pages: int, seed: int = 7) -> Dict[str, str]:
+    """Build page texts with boilerplate and a few filled lines per page"""
+    rng = random.Random(seed)
+    text_content = {}
+    for page_num in range(1, pages + 1):
+        lines = [rng.choice(BOILERPLATE) for _ in range(45)]
+        # Filled values only appear in the back half, like the KURA forms
+        if page_num > pages // 2:
+            for _ in range(2):
+                lines.insert(rng.randrange(len(lines)), rng.choice(FILLED_LINES))
+        text_content[str(page_num)] = "\n".join(lines)
+    return text_content
+
+
+def legacy_extract(all_text: str) -> Dict[str, str]:
+    """The original loop from PDFService._identify_filled_values"""
+    filled_values = {}
+    for field_name, field_patterns in FIELD_PATTERNS.items():
+        for pattern in field_patterns:
+            match = re.search(pattern, all_text, re.IGNORECASE)
+            if match:
+                filled_values[field_name] = match.group(1).strip()
+                break
+    return filled_values
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text_content = make_document(args.pages)
+    all_text = " ".join(text_content.values())
+
+    legacy = legacy_extract(all_text)
+    compiled = DEFAULT_EXTRACTOR.extract(all_text)
+    if legacy != compiled:
+        raise SystemExit(f"Extractor mismatch:\n  legacy:   {legacy}\n  compiled: {compiled}")
+
+    # Blank documents are the worst case for the legacy loop: no pattern
+    # matches, so every one of them scans the entire text.
+    blank_text = " ".join(make_document(args.pages, seed=11).values()).split("Company")[0]
+
+    print(f"Document: {args.pages} pages, {len(all_text):,} characters, {len(compiled)} fields")
+    for name, text in (("filled", all_text), ("blank", blank_text)):
+        legacy_time = best_of(lambda: legacy_extract(text), args.repeat)
+        compiled_time = best_of(lambda: DEFAULT_EXTRACTOR.extract(text), args.repeat)
+        print(f"{name:>7}: legacy {legacy_time * 1000:8.2f} ms | compiled {compiled_time * 1000:8.2f} ms"
+              f" | speedup {legacy_time / compiled_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
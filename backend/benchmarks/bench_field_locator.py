@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Placeholder location time: character parse, regex scan, and cold vs cached lookups.
+
+Parses the section's characters once with pdfplumber and times
+FieldLocator's regex scan over them on its own. Then it times
+PDFService.get_field_coordinates cold (parse + scan) and again from the
+parsed-document cache, which is what repeat fills of a template pay.
+
+Usage: python -m benchmarks.bench_field_locator [--pdf tender.pdf] [--pages 47-90]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pdfplumber
+
+from benchmarks.corpus import make_tender_pdf
+from compiled_template import COMPILED_TEMPLATE
+from field_locator import parse_page_range
+from pdf_cache import DOCUMENT_CACHE
+from pdf_service import PDFService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", help="Tender PDF (default: a synthetic 300-page tender)")
+    parser.add_argument("--pages", default="47-90")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    page_numbers = parse_page_range(args.pages)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp_dir, "tender.pdf")
+            make_tender_pdf(pdf_path, 300, form_pages=range(page_numbers[0], page_numbers[-1] + 1))
+
+        with pdfplumber.open(pdf_path) as pdf:
+            page_numbers = [n for n in page_numbers if n <= len(pdf.pages)]
+            start = time.perf_counter()
+            pages = [pdf.pages[n - 1].chars for n in page_numbers]
+            parse_seconds = time.perf_counter() - start
+        char_count = sum(len(chars) for chars in pages)
+
+        locator = COMPILED_TEMPLATE.current().locator
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            runs = sum(len(locator.find_placeholders(chars)) for chars in pages)
+        scan_seconds = (time.perf_counter() - start) / args.repeat
+
+        DOCUMENT_CACHE.clear()
+        start = time.perf_counter()
+        fields = PDFService.get_field_coordinates(pdf_path, page_numbers)
+        cold_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        PDFService.get_field_coordinates(pdf_path, page_numbers)
+        cached_seconds = time.perf_counter() - start
+
+    named = sum(1 for field in fields if not field.name.startswith("field_p"))
+    print(f"{len(page_numbers)} pages, {char_count} characters (pdfplumber parse {parse_seconds:.2f} s)")
+    print(f"  regex scan {scan_seconds * 1000:8.2f} ms  ({runs} placeholder runs)")
+    print(f"  get_field_coordinates cold {cold_seconds * 1000:8.1f} ms, cached {cached_seconds * 1000:6.2f} ms"
+          f"  ({len(fields)} fields, {named} matched to profile fields)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Time-to-first-byte, total time and server peak memory for /fill-pdf.
+
+Starts the app under uvicorn in a subprocess and streams the response over
+a real socket, so TTFB reflects when the first body chunk reaches the client.
+Peak memory is the server's VmHWM (Linux only).
+
+Usage: python -m benchmarks.bench_fill [--pages 300] [--requests 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlencode
+
+from benchmarks.corpus import SAMPLE_PROFILE, make_tender_pdf
+from pdf_service import PDFService
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def multipart(field: str, filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit("Server did not start")
+
+
+def timed_fill(port: int, body: bytes, content_type: str, query: str):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    start = time.perf_counter()
+    conn.request("POST", f"/fill-pdf?{query}", body=body, headers={"Content-Type": content_type})
+    response = conn.getresponse()
+    if response.status != 200:
+        raise SystemExit(f"/fill-pdf returned {response.status}: {response.read()[:200]}")
+    response.read(1)
+    ttfb = time.perf_counter() - start
+    size = 1
+    while chunk := response.read(64 * 1024):
+        size += len(chunk)
+    return ttfb, time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+
+    profile = {field: SAMPLE_PROFILE.get(field, "n/a") for field in PDFService.validate_profile_data({})[1]}
+    query = urlencode({"profile_data": json.dumps(profile)})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "tender.pdf")
+        make_tender_pdf(pdf_path, args.pages)
+        with open(pdf_path, "rb") as f:
+            body, content_type = multipart("template_file", "tender.pdf", f.read())
+
+        port = free_port()
+        env = {**os.environ, "AUTO_TENDER_EXECUTOR": "inline", "AUTO_TENDER_SCRATCH_DIR": os.path.join(tmp_dir, "scratch")}
+        server = start_server(port, env)
+        try:
+            results = [timed_fill(port, body, content_type, query) for _ in range(args.requests)]
+            peak = peak_rss_mb(server.pid)
+            time.sleep(0.5)  # let the last response's cleanup task run
+            leftover = len(os.listdir(env["AUTO_TENDER_SCRATCH_DIR"]))
+        finally:
+            server.terminate()
+            server.wait()
+
+    ttfbs = [r[0] * 1000 for r in results]
+    totals = [r[1] * 1000 for r in results]
+    print(f"/fill-pdf on a {args.pages}-page template, {len(body) / 1e6:.1f} MB in, {results[0][2] / 1e6:.1f} MB out")
+    print(f"  TTFB   p50 {statistics.median(ttfbs):8.1f} ms   max {max(ttfbs):8.1f} ms")
+    print(f"  total  p50 {statistics.median(totals):8.1f} ms   max {max(totals):8.1f} ms")
+    print(f"  server peak RSS {peak:.1f} MB, {leftover} files left in scratch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Fill time and output churn: full rewrite against an incremental update.
+
+Fills a tender whose form pages carry placeholders three ways: the old
+page-copying rewrite (which filled nothing), a full rewrite that merges the
+overlay into each form page, and PDFService.fill_pdf, which appends only
+the changed pages to the original bytes. Churn is the number of output
+bytes after the longest prefix shared with the original.
+
+Usage: python -m benchmarks.bench_incremental_fill [--pages 300] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import PyPDF2
+
+from benchmarks.corpus import SAMPLE_PROFILE, form_fields, make_tender_pdf
+from pdf_service import PDFService, TenderInfo
+
+TENDER = TenderInfo(tender_name="Road Works", tender_number="KURA/RMLF/WE/127", organization="KURA")
+
+
+def copy_rewrite(pdf_path: str, placements) -> bytes:
+    """The previous fill_pdf: copy every page into a PdfWriter, fill nothing"""
+    reader = PyPDF2.PdfReader(pdf_path)
+    writer = PyPDF2.PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def merge_rewrite(pdf_path: str, placements) -> bytes:
+    """Render the same overlays but merge them and re-serialize the whole document"""
+    reader = PyPDF2.PdfReader(pdf_path)
+    overlay_pages = sorted(placements)
+    overlay_reader = PyPDF2.PdfReader(io.BytesIO(overlay_document(reader, placements)))
+    writer = PyPDF2.PdfWriter()
+    for page_number, page in enumerate(reader.pages, start=1):
+        if page_number in placements:
+            page.merge_page(overlay_reader.pages[overlay_pages.index(page_number)])
+        writer.add_page(page)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def overlay_document(reader, placements) -> bytes:
+    """The overlay pages as a standalone PDF, for merge_page"""
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    overlay = canvas.Canvas(buffer)
+    for page_number in sorted(placements):
+        media_box = reader.pages[page_number - 1].mediabox
+        overlay.setPageSize((float(media_box.width), float(media_box.height)))
+        for field, text in placements[page_number]:
+            overlay.setFont("Helvetica", 9)
+            overlay.drawString(field.x, float(media_box.height) - field.y - 10, text)
+        overlay.showPage()
+    overlay.save()
+    return buffer.getvalue()
+
+
+def incremental(pdf_path: str, placements, fields) -> bytes:
+    return PDFService.fill_pdf(pdf_path, SAMPLE_PROFILE, TENDER, fields)
+
+
+def churn(original: bytes, output: bytes) -> int:
+    shared = 0
+    limit = min(len(original), len(output))
+    step = 64 * 1024
+    while shared < limit and original[shared:shared + step] == output[shared:shared + step]:
+        shared += step
+    while shared < limit and original[shared] == output[shared]:
+        shared += 1
+    return len(output) - shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    form_pages = range(47, min(args.pages, 90) + 1)
+    fields = form_fields(form_pages)
+    placements = {}
+    for field in fields:
+        placements.setdefault(field.page, []).append((field, SAMPLE_PROFILE[field.name]))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "tender.pdf")
+        make_tender_pdf(pdf_path, args.pages, form_pages=form_pages)
+        with open(pdf_path, "rb") as f:
+            original = f.read()
+
+        print(f"{args.pages}-page tender ({len(original) / 1e6:.2f} MB), "
+              f"{len(fields)} fields on pages {form_pages.start}-{form_pages.stop - 1}")
+        runs = [
+            ("copy all pages (old)", lambda: copy_rewrite(pdf_path, placements)),
+            ("overlay + full rewrite", lambda: merge_rewrite(pdf_path, placements)),
+            ("overlay + incremental", lambda: incremental(pdf_path, placements, fields)),
+        ]
+        for label, fill in runs:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                output = fill()
+                timings.append(time.perf_counter() - start)
+            print(f"  {label:<24} {statistics.median(timings) * 1000:8.1f} ms   "
+                  f"output {len(output) / 1e6:6.2f} MB   churn {churn(original, output) / 1e3:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
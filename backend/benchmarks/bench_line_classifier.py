@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Classify differing lines: the compiled LineClassifier against one re.search per rule.
+
+Usage: python -m benchmarks.bench_line_classifier [--lines 50000] [--repeat 3]
+"""
+import argparse
+import random
+import re
+from typing import List, Optional
+
+from benchmarks.bench_field_extractor import FILLED_LINES, best_of
+from benchmarks.corpus import BOILERPLATE
+from line_classifier import DIFFERENCE_CLASSIFIER, DIFFERENCE_RULES
+
+
+def legacy_classify(line: str) -> Optional[str]:
+    """The elif chain previously in PDFService.diff_page_texts"""
+    lowered = line.lower()
+    for field_name, pattern in DIFFERENCE_RULES:
+        if re.search(pattern, lowered):
+            return field_name
+    return None
+
+
+def make_lines(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    pool = BOILERPLATE + FILLED_LINES + ["Mbale Roadworks Ltd", "2023-11-30", "P.O. Box 41727-00100"]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    legacy = [legacy_classify(line) for line in lines]
+    compiled = [DIFFERENCE_CLASSIFIER.classify(line) for line in lines]
+    if legacy != compiled:
+        mismatch = next(i for i, (a, b) in enumerate(zip(legacy, compiled)) if a != b)
+        raise SystemExit(f"Classifier mismatch on {lines[mismatch]!r}: {legacy[mismatch]} != {compiled[mismatch]}")
+
+    legacy_time = best_of(lambda: [legacy_classify(line) for line in lines], args.repeat)
+    compiled_time = best_of(lambda: [DIFFERENCE_CLASSIFIER.classify(line) for line in lines], args.repeat)
+    print(f"{args.lines} lines, {len(DIFFERENCE_CLASSIFIER.rules)} rules")
+    print(f"  re.search per rule {legacy_time * 1000:8.1f} ms")
+    print(f"  LineClassifier     {compiled_time * 1000:8.1f} ms  ({legacy_time / compiled_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Line diff cost and accuracy: aligned diff_lines against the old zip-by-index comparison.
+
+Builds blank pages of boilerplate lines and filled copies with a few
+filled-in fields and a few inserted lines, then reports how long each
+comparison takes per page and how many differences it reports against the
+number of lines that really changed. difflib's SequenceMatcher is timed
+as a reference point.
+
+Usage: python -m benchmarks.bench_line_diff [--lines 50,500,5000] [--edits 6] [--repeat 5]
+"""
+import argparse
+import difflib
+import random
+import time
+from typing import List, Tuple
+
+from benchmarks.corpus import BOILERPLATE, FORM_LABELS, SAMPLE_PROFILE
+from line_diff import diff_lines
+
+
+def make_page(lines: int, edits: int, seed: int = 7) -> Tuple[List[str], List[str], int]:
+    """Blank and filled lines of a page, and how many filled lines really changed"""
+    rng = random.Random(seed)
+    blank = [f"{rng.choice(BOILERPLATE)} {n}" for n in range(lines)]
+    filled = list(blank)
+    positions = sorted(rng.sample(range(lines), min(lines, edits)))
+    # Work from the end so earlier positions stay valid
+    for n, position in enumerate(reversed(positions)):
+        field_name, label = FORM_LABELS[n % len(FORM_LABELS)]
+        if n % 2:
+            filled.insert(position, f"Additional note for {label}")
+        else:
+            blank[position] = f"{label}: ________________"
+            filled[position] = f"{label}: {SAMPLE_PROFILE[field_name]}"
+    return blank, filled, len(positions)
+
+
+def zip_diff(blank: List[str], filled: List[str]) -> int:
+    """Differences reported by the previous index-by-index comparison"""
+    return sum(1 for filled_line, blank_line in zip(filled, blank) if filled_line.strip() != blank_line.strip())
+
+
+def difflib_diff(blank: List[str], filled: List[str]) -> int:
+    matcher = difflib.SequenceMatcher(None, blank, filled, autojunk=False)
+    return sum(j2 - j1 for tag, _, _, j1, j2 in matcher.get_opcodes() if tag in ("replace", "insert"))
+
+
+def best_of(fn, repeat: int) -> Tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", default="50,500,5000")
+    parser.add_argument("--edits", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lines':>6} {'changed':>7} | {'zip':>8} {'found':>5} | {'diff_lines':>10} {'found':>5}"
+          f" | {'difflib':>8} {'found':>5}")
+    for lines in (int(n) for n in args.lines.split(",")):
+        blank, filled, changed = make_page(lines, args.edits)
+        zip_time, zip_found = best_of(lambda: zip_diff(blank, filled), args.repeat)
+        myers_time, changes = best_of(lambda: diff_lines(blank, filled), args.repeat)
+        difflib_time, difflib_found = best_of(lambda: difflib_diff(blank, filled), args.repeat)
+        print(f"{lines:>6} {changed:>7} | {zip_time * 1000:6.2f}ms {zip_found:>5} |"
+              f" {myers_time * 1000:8.2f}ms {len(changes):>5} | {difflib_time * 1000:6.2f}ms {difflib_found:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""What logging costs the caller at each level, next to the print() debugging it replaced.
+
+For DEBUG, INFO and WARNING this times one debug line, one info line, and
+PDFService._identify_filled_values and diff_page_texts (which log a debug
+line per field found and per comparison) on a synthetic document. Lines
+go through the service's queue to the JSON writer thread, which writes to
+/dev/null; the caller pays for the level check and the enqueue, and the
+time to drain the queue afterwards is reported separately. The same debug
+line written with print() and with a synchronous JSON handler are timed
+for comparison.
+
+Usage: python -m benchmarks.bench_logging [--calls 100000] [--pages 50] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import time
+
+from benchmarks.bench_field_extractor import make_document
+from logs import JSONFormatter, configure_logging, request_context, stop_logging
+from pdf_service import PDFService
+
+logger = logging.getLogger("pdf_service")
+
+
+def per_call(fn, calls: int) -> float:
+    """Seconds per call of fn()"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    text_content = make_document(args.pages)
+    blank_content = {page: "\n".join(line for line in text.split("\n") if ":" not in line)
+                     for page, text in text_content.items()}
+
+    def debug_line():
+        logger.debug("Found %s: %s", "company_name", "Mbale Roadworks Ltd")
+
+    def info_line():
+        logger.info("Found %s: %s", "company_name", "Mbale Roadworks Ltd")
+
+    def extract():
+        PDFService._identify_filled_values(text_content)
+
+    def diff():
+        PDFService.diff_page_texts(text_content, blank_content)
+
+    with open(os.devnull, "w") as devnull, request_context("bench"):
+        field, value = "company_name", "Mbale Roadworks Ltd"
+        printed = per_call(lambda: print(f"DEBUG: Found {field}: {value}", file=devnull), args.calls)
+
+        root = logging.getLogger()
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(JSONFormatter())
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        synchronous = per_call(debug_line, args.calls)
+        root.removeHandler(handler)
+
+        print(f"{'':<10}{'debug line':>12}{'info line':>12}{'extract':>12}{'diff':>12}{'drain':>12}")
+        print(f"{'print()':<10}{printed * 1e6:9.2f} us")
+        print(f"{'sync JSON':<10}{synchronous * 1e6:9.2f} us")
+        for level in ("WARNING", "INFO", "DEBUG"):
+            configure_logging(level, devnull)
+            debug = per_call(debug_line, args.calls)
+            info = per_call(info_line, args.calls)
+            extracted = per_call(extract, args.repeat)
+            diffed = per_call(diff, args.repeat)
+            start = time.perf_counter()
+            stop_logging()
+            drained = time.perf_counter() - start
+            print(f"{level:<10}{debug * 1e6:9.2f} us{info * 1e6:9.2f} us{extracted * 1e3:9.2f} ms"
+                  f"{diffed * 1e3:9.2f} ms{drained * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
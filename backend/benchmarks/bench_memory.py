@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Peak RSS per endpoint, each measured in a fresh process.
+
+Every endpoint runs once through the in-process test client with the
+inline executor, so parsing happens in the measured process. The report
+shows peak RSS above the post-import baseline, next to the upload size.
+
+Usage: python -m benchmarks.bench_memory [--pages 150]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.corpus import SAMPLE_PROFILE, make_tender_pdf
+
+ENDPOINTS = [
+    "/extract-tender-info",
+    "/extract-data-from-filled-pdf",
+    "/compare-pdfs-and-extract-differences",
+    "/compare-pdfs-and-create-template",
+    "/fill-pdf",
+    "/fill-pdf-using-template",
+]
+
+
+def _peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_child(endpoint: str, filled_path: str, blank_path: str):
+    os.environ["AUTO_TENDER_EXECUTOR"] = "inline"
+    from fastapi.testclient import TestClient
+    from main import app
+    from pdf_service import PDFService
+
+    profile = {field: SAMPLE_PROFILE.get(field, "n/a") for field in PDFService.validate_profile_data({})[1]}
+    with TestClient(app) as client, open(filled_path, "rb") as filled, open(blank_path, "rb") as blank:
+        baseline = _peak_rss_kb()
+        if endpoint == "/extract-tender-info":
+            response = client.post(endpoint, files={"file": ("blank.pdf", blank)})
+        elif endpoint == "/extract-data-from-filled-pdf":
+            response = client.post(endpoint, files={"filled_pdf": ("filled.pdf", filled)})
+        elif endpoint.startswith("/compare-"):
+            response = client.post(endpoint, files={"filled_pdf": ("filled.pdf", filled),
+                                                    "blank_pdf": ("blank.pdf", blank)})
+        elif endpoint == "/fill-pdf":
+            response = client.post(endpoint, files={"template_file": ("blank.pdf", blank)},
+                                   params={"profile_data": json.dumps(profile)})
+        else:
+            response = client.post(endpoint, files={"blank_pdf": ("blank.pdf", blank)},
+                                   params={"template_data": json.dumps({"filled_values": profile}),
+                                           "profile_data": json.dumps(profile)})
+        response.raise_for_status()
+    print(json.dumps({"baseline_kb": baseline, "peak_kb": _peak_rss_kb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=150)
+    parser.add_argument("--child", nargs=3, metavar=("ENDPOINT", "FILLED", "BLANK"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filled_path = os.path.join(tmp_dir, "filled.pdf")
+        blank_path = os.path.join(tmp_dir, "blank.pdf")
+        make_tender_pdf(filled_path, args.pages, profile=SAMPLE_PROFILE)
+        make_tender_pdf(blank_path, args.pages)
+        upload_mb = (os.path.getsize(filled_path) + os.path.getsize(blank_path)) / (1024 * 1024)
+        print(f"{args.pages}-page tender pair, {upload_mb:.1f} MB uploaded for two-file endpoints")
+
+        for endpoint in ENDPOINTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_memory", "--child", endpoint, filled_path, blank_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            delta_mb = (result["peak_kb"] - result["baseline_kb"]) / 1024
+            print(f"{endpoint:<40} peak RSS +{delta_mb:7.1f} MB  (total {result['peak_kb'] / 1024:7.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
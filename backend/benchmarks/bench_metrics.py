@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Cost of the /metrics instrumentation: one phase() block, and MetricsMiddleware around a request.
+
+The middleware is timed around a bare ASGI app that answers at once, so
+the difference is all bookkeeping; compare it with the latency of the
+cheapest real endpoints in benchmarks/baseline.json.
+
+Usage: python -m benchmarks.bench_metrics [--calls 200000] [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from metrics import _CURRENT, MetricsMiddleware, MetricsRegistry, TaskMetrics, phase
+
+
+async def bare_app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, requests: int) -> float:
+    """Seconds per request through app"""
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def time_phases(calls: int) -> float:
+    """Seconds per phase() block"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        with phase("parse"):
+            pass
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    idle = time_phases(args.calls)
+    token = _CURRENT.set(TaskMetrics())
+    try:
+        recording = time_phases(args.calls)
+    finally:
+        _CURRENT.reset(token)
+    print(f"phase() outside a request   {idle * 1e9:8.0f} ns")
+    print(f"phase() inside a request    {recording * 1e9:8.0f} ns")
+
+    bare = asyncio.run(drive(bare_app, args.requests))
+    measured = asyncio.run(drive(MetricsMiddleware(bare_app, MetricsRegistry()), args.requests))
+    print(f"bare ASGI request           {bare * 1e6:8.1f} us")
+    print(f"with MetricsMiddleware      {measured * 1e6:8.1f} us  (+{(measured - bare) * 1e6:.1f} us per request)")
+
+
+if __name__ == "__main__":
+    main()
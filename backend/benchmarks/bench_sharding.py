@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Speedup of page-sharded text extraction with worker count.
+
+Usage: python -m benchmarks.bench_sharding [--pages 300]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import make_tender_pdf
+from executor import PDFExecutor
+from pdf_cache import document_key
+import sharding
+
+
+async def timed_extract(workers: int, pdf_path: str, key: str) -> float:
+    # A fresh executor per run, so no worker starts with the document cached
+    executor = PDFExecutor(mode="process", workers=workers, max_pending=workers * 4, timeout=None)
+    executor.start()
+    try:
+        # Spin every worker up before timing
+        await asyncio.gather(*(executor.run(os.getpid) for _ in range(workers)))
+        start = time.perf_counter()
+        texts = await sharding.extract_page_texts(executor, pdf_path, key, shards=workers)
+        elapsed = time.perf_counter() - start
+        assert len(texts) > 0 and list(texts) == sorted(texts)
+        return elapsed
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "tender.pdf")
+        make_tender_pdf(pdf_path, args.pages)
+        key = document_key(pdf_path)
+
+        baseline = None
+        workers = 1
+        while workers <= args.max_workers:
+            elapsed = asyncio.run(timed_extract(workers, pdf_path, key))
+            baseline = baseline or elapsed
+            print(f"{workers:2d} workers: {elapsed:6.2f} s  {args.pages / elapsed:7.1f} pages/s"
+                  f"  speedup {baseline / elapsed:4.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
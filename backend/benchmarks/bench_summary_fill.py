@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Documents per second of fill_pdf_using_template: the cached SummaryRenderer against a per-request build.
+
+legacy_fill is the function as it was before pdf_summary: a stylesheet,
+a ParagraphStyle per field and a parsed paragraph for every line, built
+on every call. Both run on the same filled values, after one untimed call
+each. Outputs are compared in reportlab's invariant mode (no timestamps
+or random document ids), so they must be byte for byte the same.
+
+Usage: python -m benchmarks.bench_summary_fill [--docs 200] [--fields 23]
+"""
+import argparse
+import time
+from io import BytesIO
+from typing import Dict
+
+from reportlab import rl_config
+
+from benchmarks.corpus import FULL_PROFILE
+from compiled_template import COMPILED_TEMPLATE
+from pdf_service import PDFService
+
+
+def legacy_fill(template_data: Dict) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30, alignment=1)
+    story.append(Paragraph("FILLED TENDER DOCUMENT", title_style))
+    story.append(Spacer(1, 20))
+    filled_values = template_data.get('filled_values', {})
+    categories = {
+        category.replace('_info', '_information').replace('_', ' ').title(): fields
+        for category, fields in COMPILED_TEMPLATE.current().categories.items()
+    }
+    for category, fields in categories.items():
+        category_style = ParagraphStyle('CategoryHeader', parent=styles['Heading2'], fontSize=14, spaceAfter=12,
+                                        spaceBefore=20, textColor=colors.darkblue)
+        story.append(Paragraph(category, category_style))
+        for field in fields:
+            if field in filled_values and filled_values[field]:
+                field_style = ParagraphStyle('FieldStyle', parent=styles['Normal'], fontSize=10, spaceAfter=6,
+                                             leftIndent=20)
+                story.append(Paragraph(f"<b>{field.replace('_', ' ').title()}:</b> {filled_values[field]}",
+                                       field_style))
+        story.append(Spacer(1, 10))
+    remaining_fields = {k: v for k, v in filled_values.items()
+                        if k not in [field for fields in categories.values() for field in fields]}
+    if remaining_fields:
+        story.append(Paragraph("Additional Information", category_style))
+        for field, value in remaining_fields.items():
+            if value:
+                field_style = ParagraphStyle('FieldStyle', parent=styles['Normal'], fontSize=10, spaceAfter=6,
+                                             leftIndent=20)
+                story.append(Paragraph(f"<b>{field.replace('_', ' ').title()}:</b> {value}", field_style))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def docs_per_second(fn, docs: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(docs):
+        fn()
+    return docs / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--fields", type=int, default=len(FULL_PROFILE),
+                        help="filled values per document; past the profile's fields they are uncategorised")
+    args = parser.parse_args()
+
+    values = list(FULL_PROFILE.items())
+    filled_values = {f"{name}_{i // len(values)}" if i >= len(values) else name: value
+                     for i, (name, value) in ((i, values[i % len(values)]) for i in range(args.fields))}
+    template_data = {"filled_values": filled_values}
+
+    rl_config.invariant = 1
+    try:
+        before, after = legacy_fill(template_data), PDFService.fill_pdf_using_template(template_data, b"", {})
+    finally:
+        rl_config.invariant = 0
+    if before != after:
+        raise SystemExit("The cached renderer's output differs from the per-request build")
+
+    legacy = docs_per_second(lambda: legacy_fill(template_data), args.docs)
+    cached = docs_per_second(lambda: PDFService.fill_pdf_using_template(template_data, b"", {}), args.docs)
+    print(f"{args.fields} fields, identical output ({len(after)} bytes)")
+    print(f"  per-request build  {legacy:8.1f} docs/s")
+    print(f"  cached renderer    {cached:8.1f} docs/s  ({cached / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
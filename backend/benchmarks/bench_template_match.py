@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Match blank tenders to stored templates: the LSH TemplateIndex against scanning every stored page.
+
+Builds synthetic templates from one procuring entity: every template
+shares a pool of boilerplate pages and has its own pages besides. Each
+query is a stored template with some pages dropped from the front (an
+addendum) and a few words changed on every page, signed on a sample of its
+pages. Reports the lookup time per query and whether the right template
+and page offset came back.
+
+Usage: python -m benchmarks.bench_template_match [--templates 100,1000] [--pages 40] [--queries 50]
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+from template_index import MIN_SIMILARITY, SAMPLE_PAGES, TemplateIndex, page_signature, sample_pages, similarity
+
+WORDS_PER_PAGE = 150
+SHARED_PAGES = 20
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_templates(count: int, pages: int, seed: int = 7) -> Dict[str, List[List[str]]]:
+    """Template id -> page word lists; about half of each template's pages are shared boilerplate"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(5000, rng)
+    shared = [[rng.choice(vocabulary) for _ in range(WORDS_PER_PAGE)] for _ in range(SHARED_PAGES)]
+    templates = {}
+    for n in range(count):
+        template_pages = []
+        for _ in range(pages):
+            if rng.random() < 0.5:
+                template_pages.append(rng.choice(shared))
+            else:
+                template_pages.append([rng.choice(vocabulary) for _ in range(WORDS_PER_PAGE)])
+        templates[f"template-{n:05d}"] = template_pages
+    return templates
+
+
+def make_query(pages: List[List[str]], rng: random.Random) -> Tuple[Dict[int, object], int]:
+    """Sampled signatures of an edited copy of a template's pages, and the pages dropped from its front"""
+    dropped = rng.randint(0, 3)
+    kept = pages[dropped:]
+    signatures = {}
+    for page in sample_pages(len(kept), SAMPLE_PAGES):
+        words = list(kept[page - 1])
+        for position in rng.sample(range(len(words)), 3):
+            words[position] = "addendum"
+        signatures[page] = page_signature(" ".join(words))
+    return signatures, dropped
+
+
+def scan_match(stored: Dict[Tuple[str, int], object], signatures: Dict[int, object]) -> Optional[Tuple[str, int]]:
+    """The vote TemplateIndex.match takes, over every stored page"""
+    votes: Dict[Tuple[str, int], float] = {}
+    for page, signature in signatures.items():
+        best: Dict[Tuple[str, int], float] = {}
+        for (template_id, stored_page), stored_signature in stored.items():
+            score = similarity(signature, stored_signature)
+            key = (template_id, stored_page - page)
+            if score >= MIN_SIMILARITY and score > best.get(key, 0.0):
+                best[key] = score
+        for key, score in best.items():
+            votes[key] = votes.get(key, 0.0) + score
+    return max(votes, key=votes.get) if votes else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", default="100,1000")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--scan-queries", type=int, default=3, help="queries timed with the full scan")
+    args = parser.parse_args()
+
+    print(f"{'templates':>9} {'pages':>7} | {'index p50':>9} {'max':>8} {'correct':>8} | {'scan':>9} {'correct':>7}")
+    for count in (int(n) for n in args.templates.split(",")):
+        templates = make_templates(count, args.pages)
+        stored = {}
+        index = TemplateIndex()
+        for template_id, pages in templates.items():
+            signatures = {n: page_signature(" ".join(words)) for n, words in enumerate(pages, start=1)}
+            index.add(template_id, signatures)
+            stored.update({(template_id, n): signature for n, signature in signatures.items()})
+
+        rng = random.Random(11)
+        ids = sorted(templates)
+        timings, correct, scan_timings, scan_correct = [], 0, [], 0
+        for q in range(args.queries):
+            template_id = rng.choice(ids)
+            signatures, dropped = make_query(templates[template_id], rng)
+            start = time.perf_counter()
+            match = index.match(signatures)
+            timings.append(time.perf_counter() - start)
+            correct += match is not None and (match.template_id, match.page_offset) == (template_id, dropped)
+            if q < args.scan_queries:
+                start = time.perf_counter()
+                scanned = scan_match(stored, signatures)
+                scan_timings.append(time.perf_counter() - start)
+                scan_correct += scanned == (template_id, dropped)
+
+        print(f"{count:>9} {len(stored):>7} | {statistics.median(timings) * 1000:7.2f}ms {max(timings) * 1000:6.2f}ms"
+              f" {correct:>4}/{args.queries:<3} | {statistics.median(scan_timings) * 1000:7.0f}ms"
+              f" {scan_correct:>3}/{len(scan_timings)}")
+
+
+if __name__ == "__main__":
+    main()
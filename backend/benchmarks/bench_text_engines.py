@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Text engines compared: pages per second and field-extraction agreement.
+
+Generates a corpus of filled tenders and extracts every page with each
+engine from a cold cache. The fields found in each document's text by the
+field extractor are then compared: agreement is the share of fields (found
+by either engine) on which both engines return the same value, and
+"correct" counts the values that equal the profile the forms were filled
+with.
+
+Usage: python -m benchmarks.bench_text_engines [--documents 4] [--pages 60]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.corpus import SAMPLE_PROFILE, make_tender_pdf
+from field_extractor import DEFAULT_EXTRACTOR
+from pdf_cache import DOCUMENT_CACHE
+from pdf_service import PDFService
+from text_engines import TEXT_ENGINES
+
+
+def extract_fields(pdf_path: str, engine: str) -> Dict[str, str]:
+    doc = PDFService._load_document(pdf_path, engine=engine)
+    return DEFAULT_EXTRACTOR.extract(" ".join(doc.pages[n].text for n in sorted(doc.pages)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for n in range(args.documents):
+            path = os.path.join(tmp_dir, f"tender{n}.pdf")
+            make_tender_pdf(path, args.pages, profile=SAMPLE_PROFILE, seed=n)
+            paths.append(path)
+
+        seconds: Dict[str, float] = {}
+        fields: Dict[str, List[Dict[str, str]]] = {}
+        for engine in TEXT_ENGINES:
+            DOCUMENT_CACHE.clear()
+            start = time.perf_counter()
+            for path in paths:
+                PDFService._load_document(path, engine=engine)
+            seconds[engine] = time.perf_counter() - start
+            # Served from the cache just filled, so this is not timed twice
+            fields[engine] = [extract_fields(path, engine) for path in paths]
+
+    total_pages = args.documents * args.pages
+    print(f"{args.documents} documents x {args.pages} pages")
+    for engine in TEXT_ENGINES:
+        correct = sum(
+            1 for found in fields[engine] for name, value in SAMPLE_PROFILE.items() if found.get(name) == value
+        )
+        print(f"  {engine:<11} {seconds[engine]:7.2f} s  {total_pages / seconds[engine]:8.1f} pages/s"
+              f"  correct {correct}/{len(SAMPLE_PROFILE) * args.documents}")
+
+    baseline, *others = TEXT_ENGINES
+    for engine in others:
+        agreed = compared = 0
+        for baseline_fields, engine_fields in zip(fields[baseline], fields[engine]):
+            names = set(baseline_fields) | set(engine_fields)
+            compared += len(names)
+            agreed += sum(1 for name in names if baseline_fields.get(name) == engine_fields.get(name))
+        rate = 100.0 * agreed / compared if compared else 100.0
+        print(f"  {engine} vs {baseline}: {seconds[baseline] / seconds[engine]:.1f}x faster,"
+              f" field agreement {rate:.1f}% ({agreed}/{compared})")
+
+
+if __name__ == "__main__":
+    main()
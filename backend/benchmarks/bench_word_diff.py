@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Positional word diff: the grid index in word_diff against the all-pairs loop.
+
+Builds dense synthetic pages (annex tables of numbers) and a filled copy
+with some words changed, nudged or added, then finds the new words both
+ways and checks they agree.
+
+Usage: python -m benchmarks.bench_word_diff [--words 500,2000,8000] [--changed 40]
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from word_diff import TOLERANCE, new_words
+
+
+def make_page(words: int, changed: int, seed: int = 7):
+    rng = random.Random(seed)
+    columns = 12
+    blank = [
+        {"text": str(rng.randrange(1000)), "x0": 40 + (n % columns) * 45.0, "top": 40 + (n // columns) * 11.0}
+        for n in range(words)
+    ]
+    filled = [dict(w) for w in blank]
+    for n in rng.sample(range(words), min(words, changed)):
+        filled[n]["text"] = f"F{n}"
+    # Sub-tolerance jitter must not count as a difference
+    for w in rng.sample(filled, min(words, changed)):
+        w["x0"] += rng.uniform(-2, 2)
+    filled.extend({"text": f"NEW{n}", "x0": rng.uniform(40, 560), "top": rng.uniform(40, 800)}
+                  for n in range(changed))
+    return filled, blank
+
+
+def all_pairs(filled: List[Dict], blank: List[Dict]) -> List[Dict]:
+    """The loop from analyze_pdfs.compare_pdfs"""
+    result = []
+    for fw in filled:
+        found = False
+        for bw in blank:
+            if abs(fw["x0"] - bw["x0"]) < TOLERANCE and abs(fw["top"] - bw["top"]) < TOLERANCE:
+                if fw["text"] == bw["text"]:
+                    found = True
+                    break
+        if not found and fw["text"].strip():
+            result.append(fw)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", default="500,2000,8000")
+    parser.add_argument("--changed", type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'words':>6} | {'all pairs':>10} | {'grid':>8} | {'new':>5} | speedup")
+    for count in (int(n) for n in args.words.split(",")):
+        filled, blank = make_page(count, args.changed)
+        start = time.perf_counter()
+        expected = all_pairs(filled, blank)
+        pairs_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        found = new_words(filled, blank)
+        grid_seconds = time.perf_counter() - start
+        if found != expected:
+            raise SystemExit(f"Grid diff disagrees with the all-pairs loop at {count} words")
+        print(f"{count:>6} | {pairs_seconds * 1000:8.1f}ms | {grid_seconds * 1000:6.2f}ms | {len(found):>5}"
+              f" | {pairs_seconds / grid_seconds:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
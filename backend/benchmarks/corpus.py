@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Synthetic tender PDFs for the benchmarks (the real KURA tenders are private).
+
+Usage: python -m benchmarks.corpus OUT_DIR [--pages 100] [--form-density 0.125]
+       [--placeholders 7] [--filled 7] [--pairs 1]
+"""
+import argparse
+import os
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from pdf_service import PDFField
+
+BOILERPLATE = [
+    "The tenderer shall submit the bid in a sealed envelope clearly marked",
+    "All prices shall be quoted in Kenya Shillings inclusive of all taxes",
+    "The procuring entity reserves the right to accept or reject any tender",
+    "Bills of quantities shall be read together with the specifications",
+    "Works shall be executed in accordance with the general conditions",
+    "Tender security shall remain valid for thirty days beyond validity",
+    "The contractor shall maintain the works during the defects liability period",
+    "Payments shall be made within thirty days of certification by the engineer",
+]
+
+FORM_LABELS = [
+    ("company_name", "Name of Tenderer"),
+    ("registration_number", "Registration No."),
+    ("contact_person", "Contact Person"),
+    ("phone", "Telephone"),
+    ("email", "Email"),
+    ("address", "Postal Address"),
+    ("tax_id", "Tax PIN"),
+]
+
+SAMPLE_PROFILE: Dict[str, str] = {
+    "company_name": "Mbale Roadworks Ltd",
+    "registration_number": "CPR/2019/4411",
+    "contact_person": "Jane Wanjiru",
+    "phone": "+254 700 123456",
+    "email": "tenders@mbale-roadworks.co.ke",
+    "address": "12 Moi Avenue, Nairobi",
+    "tax_id": "P051234567X",
+}
+
+
+# Labels of every profile field, for denser generated forms
+PROFILE_LABELS = FORM_LABELS + [
+    ("directors", "Directors"),
+    ("signature", "Signature"),
+    ("annual_turnover", "Annual Turnover"),
+    ("bank_reference", "Bank Reference"),
+    ("credit_facility", "Credit Facility"),
+    ("financial_capacity", "Financial Capacity"),
+    ("bank_guarantee", "Bank Guarantee"),
+    ("insurance", "Insurance"),
+    ("similar_projects", "Similar Projects"),
+    ("project_value", "Project Value"),
+    ("completion_date", "Completion Date"),
+    ("client_reference", "Client Reference"),
+    ("equipment", "Equipment"),
+    ("personnel", "Key Personnel"),
+    ("methodology", "Methodology"),
+    ("timeline", "Work Programme"),
+]
+
+FULL_PROFILE: Dict[str, str] = {
+    **SAMPLE_PROFILE,
+    "directors": "Jane Wanjiru, Peter Otieno",
+    "signature": "Jane Wanjiru",
+    "annual_turnover": "150,000,000",
+    "bank_reference": "Equity Bank, Moi Avenue branch",
+    "credit_facility": "KES 20,000,000 overdraft",
+    "financial_capacity": "KES 60,000,000",
+    "bank_guarantee": "Ten percent of the contract sum",
+    "insurance": "Contractors all risk cover",
+    "similar_projects": "Mbale-Kakamega road rehabilitation",
+    "project_value": "42,500,000",
+    "completion_date": "2023-11-30",
+    "client_reference": "County Government of Vihiga",
+    "equipment": "Two graders, one paver, three tippers",
+    "personnel": "Eng. Peter Otieno, site agent",
+    "methodology": "Phased works with traffic diversion",
+    "timeline": "Eighteen months",
+}
+
+
+def make_tender_pdf(path: str, pages: int, form_pages: Optional[range] = None,
+                    profile: Optional[Dict[str, str]] = None, seed: int = 7,
+                    labels: Sequence[Tuple[str, str]] = tuple(FORM_LABELS)):
+    """Write a tender of boilerplate pages; form_pages (1-based) carry a
+    labelled placeholder per entry of ``labels``, filled from ``profile``
+    when one is given (fields it lacks stay blank)."""
+    rng = random.Random(seed)
+    form_pages = form_pages if form_pages is not None else range(pages // 4, pages // 4 + pages // 8 + 1)
+    c = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for page_num in range(1, pages + 1):
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(72, height - 60, "KENYA URBAN ROADS AUTHORITY")
+        c.setFont("Helvetica", 9)
+        c.drawString(72, height - 76, f"TENDER NO: KURA/RMLF/WE/127/2024-2025    Page {page_num}")
+        y = height - 110
+        if page_num in form_pages:
+            for field_name, label in labels:
+                c.drawString(72, y, f"{label}:")
+                if profile and field_name in profile:
+                    c.drawString(200, y, profile[field_name])
+                else:
+                    c.drawString(200, y, "_" * 40)
+                y -= 22
+        while y > 72:
+            c.drawString(72, y, rng.choice(BOILERPLATE))
+            y -= 14
+        c.showPage()
+    c.save()
+
+
+def form_fields(form_pages: range) -> List[PDFField]:
+    """Field positions of the placeholders make_tender_pdf draws on form_pages"""
+    height = A4[1]
+    fields = []
+    for page_num in form_pages:
+        for row, (field_name, _) in enumerate(FORM_LABELS):
+            baseline = height - 110 - row * 22
+            fields.append(PDFField(name=field_name, x=200, y=height - baseline - 10, width=250, height=12,
+                                   page=page_num))
+    return fields
+
+
+def form_page_range(pages: int, form_density: float = 0.125) -> range:
+    """1-based form pages of a make_tender_pair tender: that share of its pages, from a quarter of the way in"""
+    form_count = max(1, min(pages, round(pages * form_density)))
+    first_form = max(1, min(pages // 4, pages - form_count + 1))
+    return range(first_form, first_form + form_count)
+
+
+def make_tender_pair(directory: str, pages: int = 100, form_density: float = 0.125, placeholders: int = 7,
+                     filled_fields: int = 7, seed: int = 7, name: str = "tender") -> Tuple[str, str]:
+    """Write a blank tender and a filled copy of it; returns (filled path, blank path).
+
+    form_density is the share of pages in the (contiguous) form section,
+    placeholders the labelled placeholders on each form page and
+    filled_fields how many of those fields the filled copy fills in.
+    """
+    form_pages = form_page_range(pages, form_density)
+    labels = [PROFILE_LABELS[i % len(PROFILE_LABELS)] for i in range(placeholders)]
+    profile = {field_name: FULL_PROFILE[field_name] for field_name, _ in labels[:filled_fields]}
+
+    filled_path = os.path.join(directory, f"{name}_filled.pdf")
+    blank_path = os.path.join(directory, f"{name}_blank.pdf")
+    make_tender_pdf(filled_path, pages, form_pages, profile=profile, seed=seed, labels=labels)
+    make_tender_pdf(blank_path, pages, form_pages, seed=seed, labels=labels)
+    return filled_path, blank_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic blank and filled tender pairs")
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--form-density", type=float, default=0.125, help="share of pages that are form pages")
+    parser.add_argument("--placeholders", type=int, default=len(FORM_LABELS), help="placeholders per form page")
+    parser.add_argument("--filled", type=int, default=len(FORM_LABELS), help="fields filled in the filled copy")
+    parser.add_argument("--pairs", type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for n in range(args.pairs):
+        filled_path, blank_path = make_tender_pair(
+            args.out_dir, args.pages, args.form_density, args.placeholders, args.filled, seed=7 + n,
+            name=f"tender_{n + 1:03d}"
+        )
+        print(f"{filled_path}  {blank_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""Time every PDFService method and API endpoint on a synthetic tender, against a saved baseline.
+
+The corpus is a blank and filled tender pair from benchmarks.corpus; a copy
+of field_mapping.json whose pages are the corpus's form pages is compiled
+for the run, so methods and endpoints use their default page ranges. The
+cases run in a fresh process configured for the corpus; endpoints go
+through the in-process test client with the inline executor, so the PDF
+work is timed in that process too. Caches are cleared before every
+iteration: the numbers are for a PDF the service has not seen yet.
+
+Each case reports p50 and p95 latency, throughput (calls per second over
+the timed iterations) and peak memory (tracemalloc's peak of Python
+allocations during one more call). With --save the results become the
+baseline; otherwise they are checked against it and the run exits 1 when a
+case's latency or peak memory grew past --threshold (and past the
+absolute floors that keep fast cases from failing on noise).
+
+The service logs at --log-level (WARNING by default, as the baseline was
+recorded) to /dev/null through its usual queue and writer thread; running
+at INFO or DEBUG against the baseline shows what each level costs.
+
+Usage: python -m benchmarks.harness [--pages 20] [--iterations 5] [--only fill]
+       [--baseline benchmarks/baseline.json] [--save] [--threshold 0.25] [--log-level WARNING]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import FULL_PROFILE, PROFILE_LABELS, form_page_range, make_tender_pair
+from settings import settings
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Growth below these never counts as a regression, whatever the ratio
+MIN_REGRESSION_MS = 5.0
+MIN_REGRESSION_KB = 256
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def measure(case: Case, iterations: int, reset: Callable[[], None]) -> Dict[str, float]:
+    """One untimed warm-up call, iterations timed calls, then one call under tracemalloc"""
+    reset()
+    case.run()
+    timings = []
+    for _ in range(iterations):
+        reset()
+        start = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - start)
+
+    reset()
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "ops_per_s": round(len(timings) / sum(timings), 3),
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def service_cases(filled: str, blank: str, form_pages: List[int], profile: Dict[str, str],
+                  scratch_dir: str) -> List[Case]:
+    """A case for every public PDFService method"""
+    from pdf_service import PDFService, TenderInfo
+
+    tender_info = TenderInfo(tender_name="Routine maintenance of Mbale roads",
+                             tender_number="KURA/RMLF/WE/127/2024-2025", organization="Kenya Urban Roads Authority")
+    filled_text = {str(n): text for n, text in PDFService.extract_page_texts(filled, form_pages).items()}
+    blank_text = {str(n): text for n, text in PDFService.extract_page_texts(blank, form_pages).items()}
+    template = PDFService.compare_pdfs_and_extract_template(filled, blank)
+    output_path = os.path.join(scratch_dir, "filled_output.pdf")
+
+    cases = [
+        Case("page_count", lambda: PDFService.page_count(blank)),
+        Case("extract_page_texts", lambda: PDFService.extract_page_texts(filled, form_pages)),
+        Case("page_fingerprints", lambda: PDFService.page_fingerprints(blank)),
+        Case("page_signatures", lambda: PDFService.page_signatures(blank)),
+        Case("cache_stats", PDFService.cache_stats),
+        Case("extract_tender_info", lambda: PDFService.extract_tender_info(blank)),
+        Case("extract_data_from_filled_pdf", lambda: PDFService.extract_data_from_filled_pdf(filled)),
+        Case("extract_data_from_text", lambda: PDFService.extract_data_from_text(filled_text)),
+        Case("compare_pdfs_and_extract_template", lambda: PDFService.compare_pdfs_and_extract_template(filled, blank)),
+        Case("fill_pdf_using_template", lambda: PDFService.fill_pdf_using_template(template, blank, profile)),
+        Case("get_field_coordinates", lambda: PDFService.get_field_coordinates(blank)),
+        Case("compare_words", lambda: PDFService.compare_words(filled, blank, form_pages)),
+        Case("filled_regions", lambda: PDFService.filled_regions(filled, blank, form_pages)),
+        Case("fill_pdf", lambda: PDFService.fill_pdf(blank, profile, tender_info)),
+        Case("fill_pdf_to_file", lambda: PDFService.fill_pdf_to_file(blank, profile, tender_info, output_path)),
+        Case("validate_profile_data", lambda: PDFService.validate_profile_data(profile)),
+        Case("compare_pdfs_and_extract_differences",
+             lambda: PDFService.compare_pdfs_and_extract_differences(filled, blank)),
+        Case("diff_page_texts", lambda: PDFService.diff_page_texts(filled_text, blank_text)),
+    ]
+
+    public = {name for name, attr in vars(PDFService).items()
+              if isinstance(attr, staticmethod) and not name.startswith("_")}
+    missing = public - {case.name for case in cases}
+    if missing:
+        raise SystemExit(f"No benchmark case for PDFService.{', PDFService.'.join(sorted(missing))}")
+    return [Case(f"PDFService.{case.name}", case.run) for case in cases]
+
+
+def endpoint_cases(client, filled: str, blank: str, profile: Dict[str, str]) -> List[Case]:
+    """A case for every API endpoint, each checked for a successful response"""
+    with open(filled, "rb") as f:
+        filled_bytes = f.read()
+    with open(blank, "rb") as f:
+        blank_bytes = f.read()
+
+    def call(method: str, url: str, files: Optional[Dict[str, bytes]] = None, expect: int = 200, **kwargs):
+        if files:
+            kwargs["files"] = {field: (f"{field}.pdf", content, "application/pdf") for field, content in files.items()}
+        response = client.request(method, url, **kwargs)
+        if response.status_code != expect:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    pair = {"filled_pdf": filled_bytes, "blank_pdf": blank_bytes}
+    profile_json = json.dumps(profile)
+    created = call("POST", "/compare-pdfs-and-create-template", pair).json()
+    template_id = created["template_id"]
+    template_json = json.dumps({key: created["template"][key] for key in ("filled_values", "field_mappings",
+                                                                          "text_engine")})
+
+    def job(url: str, files: Dict[str, bytes]):
+        job_id = call("POST", url, files, expect=202).json()["job_id"]
+        while call("GET", f"/jobs/{job_id}").json()["status"] not in ("succeeded", "failed"):
+            time.sleep(0.005)
+        return call("GET", f"/jobs/{job_id}/result")
+
+    return [
+        Case("GET /", lambda: call("GET", "/")),
+        Case("POST /extract-tender-info", lambda: call("POST", "/extract-tender-info", {"file": blank_bytes})),
+        Case("POST /fill-pdf", lambda: call("POST", "/fill-pdf", {"template_file": blank_bytes},
+                                            params={"profile_data": profile_json})),
+        Case("POST /fill-pdf?template_id", lambda: call("POST", "/fill-pdf", {"template_file": blank_bytes},
+                                                        params={"profile_data": profile_json,
+                                                                "template_id": template_id})),
+        Case("POST /fill-pdf-batch", lambda: call("POST", "/fill-pdf-batch", {"template_file": blank_bytes},
+                                                  data={"profiles": json.dumps([profile] * 4)})),
+        Case("POST /field-coordinates", lambda: call("POST", "/field-coordinates", {"template_file": blank_bytes})),
+        Case("POST /compare-pdfs-and-create-template", lambda: call("POST", "/compare-pdfs-and-create-template", pair)),
+        Case("POST /templates/match", lambda: call("POST", "/templates/match", {"blank_pdf": blank_bytes})),
+        Case("POST /fill-pdf-using-template", lambda: call("POST", "/fill-pdf-using-template", {"blank_pdf": blank_bytes},
+                                                           params={"template_data": template_json,
+                                                                   "profile_data": profile_json})),
+        Case("POST /fill-pdf-using-template?template_id",
+             lambda: call("POST", "/fill-pdf-using-template", {"blank_pdf": blank_bytes},
+                          params={"template_id": template_id, "profile_data": profile_json})),
+        Case("POST /extract-data-from-filled-pdf",
+             lambda: call("POST", "/extract-data-from-filled-pdf", {"filled_pdf": filled_bytes})),
+        Case("POST /compare-pdfs-and-extract-differences",
+             lambda: call("POST", "/compare-pdfs-and-extract-differences", pair)),
+        Case("POST /jobs/compare-pdfs-and-extract-differences",
+             lambda: job("/jobs/compare-pdfs-and-extract-differences", pair)),
+        Case("POST /jobs/extract-data-from-filled-pdf",
+             lambda: job("/jobs/extract-data-from-filled-pdf", {"filled_pdf": filled_bytes})),
+        Case("GET /cache/stats", lambda: call("GET", "/cache/stats")),
+        Case("GET /executor/stats", lambda: call("GET", "/executor/stats")),
+        Case("GET /metrics", lambda: call("GET", "/metrics")),
+        Case("GET /profiles", lambda: call("GET", "/profiles")),
+        Case("POST /validate-profile", lambda: call("POST", "/validate-profile", json=profile)),
+    ]
+
+
+def run_child(args, tmp_dir: str):
+    """Measure every case on the corpus in tmp_dir; the parent has set this process's environment"""
+    from fastapi.testclient import TestClient
+    from logs import configure_logging, stop_logging
+    from main import app
+    from pdf_cache import DOCUMENT_CACHE
+    from pdf_service import PDFService, _TEMPLATE_READERS
+
+    def reset():
+        DOCUMENT_CACHE.clear()
+        _TEMPLATE_READERS.clear()
+
+    form_pages = list(form_page_range(args.pages, args.form_density))
+    filled = os.path.join(tmp_dir, "tender_filled.pdf")
+    blank = os.path.join(tmp_dir, "tender_blank.pdf")
+    required = PDFService.validate_profile_data({})[1]
+    profile = {field: FULL_PROFILE.get(field, "n/a") for field in required}
+
+    results = {}
+    with TestClient(app) as client, open(os.devnull, "w") as devnull:
+        configure_logging(args.log_level, devnull)
+        cases = service_cases(filled, blank, form_pages, profile, tmp_dir) + endpoint_cases(
+            client, filled, blank, profile)
+        for case in cases:
+            if args.only and args.only not in case.name:
+                continue
+            result = measure(case, args.iterations, reset)
+            results[case.name] = result
+            print(f"{case.name:<52} p50 {result['p50_ms']:9.1f} ms  p95 {result['p95_ms']:9.1f} ms"
+                  f"  {result['ops_per_s']:8.2f}/s  peak {result['peak_kb'] / 1024:7.1f} MB", flush=True)
+        stop_logging()
+
+    with open(os.path.join(tmp_dir, "results.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+
+def run_cases(args, tmp_dir: str) -> Dict[str, Dict[str, float]]:
+    """Write the corpus and a field mapping for it to tmp_dir, then measure in a fresh process"""
+    form_pages = form_page_range(args.pages, args.form_density)
+    make_tender_pair(tmp_dir, args.pages, args.form_density, args.placeholders, args.placeholders, seed=7)
+    with open(settings.field_mapping_path, encoding="utf-8") as f:
+        mapping = json.load(f)
+    mapping["pages"] = f"{form_pages[0]}-{form_pages[-1]}"
+    mapping_path = os.path.join(tmp_dir, "field_mapping.json")
+    with open(mapping_path, "w", encoding="utf-8") as f:
+        json.dump(mapping, f)
+
+    # Everything the service writes stays in tmp_dir
+    env = {
+        **os.environ,
+        "AUTO_TENDER_EXECUTOR": "inline",
+        "AUTO_TENDER_FIELD_MAPPING": mapping_path,
+        "AUTO_TENDER_COMPILED_TEMPLATE": os.path.join(tmp_dir, "field_mapping.bin"),
+        "AUTO_TENDER_TEMPLATE_STORE": os.path.join(tmp_dir, "templates.sqlite3"),
+        "AUTO_TENDER_SCRATCH_DIR": os.path.join(tmp_dir, "scratch"),
+        "AUTO_TENDER_UPLOAD_DIR": os.path.join(tmp_dir, "uploads"),
+    }
+    env.pop("AUTO_TENDER_CACHE_DIR", None)
+    os.makedirs(env["AUTO_TENDER_UPLOAD_DIR"])
+    subprocess.run([sys.executable, "-m", "benchmarks.harness", *sys.argv[1:], "--child", tmp_dir],
+                   env=env, check=True)
+    with open(os.path.join(tmp_dir, "results.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regressions(baseline: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]],
+                threshold: float) -> List[str]:
+    """Cases whose latency or peak memory grew past threshold (and the absolute floors) since the baseline"""
+    problems = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if result[metric] > before[metric] * (1 + threshold) and result[metric] - before[metric] > MIN_REGRESSION_MS:
+                problems.append(f"{name}: {metric} {before[metric]:.1f} -> {result[metric]:.1f}")
+        if (result["peak_kb"] > before["peak_kb"] * (1 + threshold)
+                and result["peak_kb"] - before["peak_kb"] > MIN_REGRESSION_KB):
+            problems.append(f"{name}: peak_kb {before['peak_kb']} -> {result['peak_kb']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--form-density", type=float, default=0.25)
+    parser.add_argument("--placeholders", type=int, default=len(PROFILE_LABELS),
+                        help="placeholders per form page, all of them filled in the filled copy")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--only", help="run only the cases whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed growth, as a fraction")
+    parser.add_argument("--log-level", default="WARNING", help="level the service logs at during the run")
+    parser.add_argument("--child", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args, args.child)
+        return
+
+    corpus = {"pages": args.pages, "form_density": args.form_density, "placeholders": args.placeholders}
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["corpus"] != corpus:
+            if not args.save:
+                sys.exit(f"The baseline was recorded on {baseline['meta']['corpus']}, not {corpus}")
+            baseline = None
+    elif not args.save:
+        print(f"No baseline at {args.baseline}; its cases are only reported (--save records one)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = run_cases(args, tmp_dir)
+
+    if args.save:
+        # A partial run (--only) updates its cases of a baseline for the same corpus
+        cases = {**baseline["cases"], **results} if args.only and baseline is not None else results
+        report = {
+            "meta": {
+                "corpus": corpus,
+                "iterations": args.iterations,
+                "log_level": args.log_level,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "cases": cases,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if baseline is None:
+        return
+    problems = regressions(baseline["cases"], results, args.threshold)
+    if problems:
+        print(f"{len(problems)} regression(s) past {args.threshold:.0%} of {args.baseline}:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"No regressions past {args.threshold:.0%} of {args.baseline}")
+
+if __name__ == "__main__":
+    main()
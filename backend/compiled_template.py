@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Compiled template: the field definitions of field_mapping.json and
+profile_template.json in one compact, versioned, memory-mappable file.
+
+Layout (little-endian):
+
+    header    magic "ATPL", format version u16, reserved u16,
+              field count u32, page count u32,
+              string table offset u32, string table size u32
+    meta      template_id, template_name, text_engine, leaders (string refs)
+    pages     page count x u16, padded to 4 bytes
+    fields    field count x FIELD records
+    strings   UTF-8, deduplicated
+
+A string ref is (offset into the string table u32, length u32). Each
+FIELD record holds string refs of its id, name, category, type and
+placeholder, then page u16 (0 = none), flags u8, a pad byte and the box
+x, y, width, height as f32 (NaN = none).
+
+Build it with ``python compiled_template.py``; the backend also rebuilds it
+when either JSON source is newer.
+"""
+import argparse
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+from field_locator import DEFAULT_LEADERS, FieldLocator, parse_page_range
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ATPL"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIIII")
+_META = struct.Struct("<" + "II" * 4)
+_FIELD = struct.Struct("<" + "II" * 5 + "HBxffff")
+
+# Field flags
+REQUIRED = 1
+PROFILE = 2  # a company profile field (profile_template.json), as opposed to document info
+
+
+class TemplateFormatError(ValueError):
+    """Raised for a compiled template that is truncated, foreign or of another format version"""
+
+
+@dataclass
+class FieldSpec:
+    """One field of the compiled template"""
+    field_id: str
+    name: str
+    category: str
+    type: str
+    placeholder: str
+    required: bool
+    profile: bool
+    page: Optional[int] = None  # 1-based
+    box: Optional[Tuple[float, float, float, float]] = None  # x, y, width, height in points from the top-left
+
+
+def _leaders(placeholders: List[str]) -> str:
+    """Leader characters of the placeholders that are pure runs (underscores, dots, ellipses)"""
+    leaders = set()
+    for placeholder in placeholders:
+        placeholder = placeholder.replace(" ", "")
+        if placeholder and not any(c.isalnum() for c in placeholder):
+            leaders.update(placeholder)
+    return "".join(sorted(leaders)) or DEFAULT_LEADERS
+
+
+def compile_template(mapping: Dict, profile: Optional[Dict] = None) -> bytes:
+    """Compile a field mapping (field_mapping.json) and profile template (profile_template.json).
+
+    Profile fields get the PROFILE flag and their profile category; profile
+    fields the mapping lacks are added as required text fields.
+    """
+    profile = profile or {}
+    profile_category = {name: category for category, fields in profile.items() for name in fields}
+
+    fields: List[FieldSpec] = []
+    for field_id, definition in mapping.get("fields", {}).items():
+        name = definition["name"]
+        box = definition.get("box")
+        fields.append(FieldSpec(
+            field_id=field_id,
+            name=name,
+            category=profile_category.get(name, definition.get("category", "")),
+            type=definition.get("type", "text"),
+            placeholder=definition.get("placeholder", ""),
+            required=bool(definition.get("required", False)),
+            profile=name in profile_category,
+            page=definition.get("page"),
+            box=tuple(box) if box else None
+        ))
+    mapped = {spec.name for spec in fields}
+    for name, category in profile_category.items():
+        if name not in mapped:
+            fields.append(FieldSpec(field_id=name, name=name, category=category, type="text",
+                                    placeholder="", required=True, profile=True))
+
+    pages = parse_page_range(mapping.get("pages")) or []
+
+    strings = bytearray()
+    offsets: Dict[str, int] = {}
+
+    def ref(text: Optional[str]) -> Tuple[int, int]:
+        data = (text or "").encode("utf-8")
+        if text not in offsets:
+            offsets[text] = len(strings)
+            strings.extend(data)
+        return offsets[text], len(data)
+
+    meta = _META.pack(*ref(mapping.get("template_id")), *ref(mapping.get("template_name")),
+                      *ref(mapping.get("text_engine")),
+                      *ref(_leaders([spec.placeholder for spec in fields])))
+    page_table = struct.pack(f"<{len(pages)}H", *pages)
+    page_table += b"\0" * (-len(page_table) % 4)
+    records = b"".join(
+        _FIELD.pack(
+            *ref(spec.field_id), *ref(spec.name), *ref(spec.category), *ref(spec.type), *ref(spec.placeholder),
+            spec.page or 0,
+            (REQUIRED if spec.required else 0) | (PROFILE if spec.profile else 0),
+            *(spec.box or (math.nan,) * 4)
+        )
+        for spec in fields
+    )
+    strings_offset = _HEADER.size + len(meta) + len(page_table) + len(records)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(fields), len(pages), strings_offset, len(strings))
+    return header + meta + page_table + records + bytes(strings)
+
+
+def compile_sources(mapping_path: str, profile_path: Optional[str]) -> bytes:
+    """Compile the JSON sources in memory"""
+    with open(mapping_path, encoding="utf-8") as f:
+        mapping = json.load(f)
+    profile = None
+    if profile_path and os.path.exists(profile_path):
+        with open(profile_path, encoding="utf-8") as f:
+            profile = json.load(f)
+    return compile_template(mapping, profile)
+
+
+def compile_files(mapping_path: str, profile_path: Optional[str], output_path: str) -> int:
+    """Compile the JSON sources into output_path, replacing it atomically; returns its size"""
+    data = compile_sources(mapping_path, profile_path)
+
+    # Readers map the file, so it is never rewritten in place
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return len(data)
+
+
+class CompiledTemplate:
+    """Read-only view of a compiled template.
+
+    Fields are decoded from the buffer (usually a shared memory map) on
+    first use; the buffer itself is never copied.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if len(buffer) < _HEADER.size:
+            raise TemplateFormatError("Compiled template is truncated")
+        magic, version, _, self.field_count, page_count, strings_offset, strings_size = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise TemplateFormatError("Not a compiled template")
+        if version != FORMAT_VERSION:
+            raise TemplateFormatError(f"Compiled template format {version} is not supported (expected {FORMAT_VERSION})")
+        self._pages_offset = _HEADER.size + _META.size
+        self._fields_offset = self._pages_offset + page_count * 2 + (-page_count * 2 % 4)
+        self._page_count = page_count
+        self._strings_offset = strings_offset
+        if strings_offset + strings_size > len(buffer) or self._fields_offset + self.field_count * _FIELD.size > strings_offset:
+            raise TemplateFormatError("Compiled template is truncated")
+
+        meta = _META.unpack_from(buffer, _HEADER.size)
+        self.template_id, self.template_name, text_engine, self.leaders = (
+            self._string(meta[i], meta[i + 1]) for i in range(0, 8, 2)
+        )
+        self.text_engine = text_engine or None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return bytes(self._buffer[start:start + length]).decode("utf-8")
+
+    @cached_property
+    def pages(self) -> List[int]:
+        """Pages of the form section, 1-based"""
+        return list(struct.unpack_from(f"<{self._page_count}H", self._buffer, self._pages_offset))
+
+    def field(self, index: int) -> FieldSpec:
+        values = _FIELD.unpack_from(self._buffer, self._fields_offset + index * _FIELD.size)
+        strings = [self._string(values[i], values[i + 1]) for i in range(0, 10, 2)]
+        page, flags, *box = values[10:]
+        return FieldSpec(
+            *strings,
+            required=bool(flags & REQUIRED),
+            profile=bool(flags & PROFILE),
+            page=page or None,
+            box=None if math.isnan(box[0]) else tuple(box)
+        )
+
+    @cached_property
+    def fields(self) -> List[FieldSpec]:
+        return [self.field(i) for i in range(self.field_count)]
+
+    @cached_property
+    def profile_fields(self) -> List[FieldSpec]:
+        """Company profile fields, in mapping order"""
+        return [spec for spec in self.fields if spec.profile]
+
+    @cached_property
+    def required_profile_fields(self) -> List[str]:
+        return [spec.name for spec in self.profile_fields if spec.required]
+
+    @cached_property
+    def locator(self) -> FieldLocator:
+        """Placeholder locator for this template's leader characters and form pages"""
+        return FieldLocator(self.leaders, self.pages or None)
+
+    @cached_property
+    def categories(self) -> Dict[str, List[str]]:
+        """Profile category -> its field names, in order"""
+        categories: Dict[str, List[str]] = {}
+        for spec in self.profile_fields:
+            categories.setdefault(spec.category, []).append(spec.name)
+        return categories
+
+
+class CompiledTemplateFile:
+    """The compiled template file, memory-mapped and reloaded when it changes.
+
+    Every process maps the same file read-only, so the pages are shared
+    through the page cache. ``current`` checks the file (and its JSON
+    sources) at most every ``check_interval`` seconds; when a source is
+    newer the file is recompiled first. A replaced file is mapped afresh
+    while callers still holding the old template keep a valid view.
+    """
+
+    def __init__(self, path: str, mapping_path: Optional[str], profile_path: Optional[str],
+                 check_interval: float = 2.0):
+        self.path = path
+        self.mapping_path = mapping_path
+        self.profile_path = profile_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._template: Optional[CompiledTemplate] = None
+        self._signature = None
+        self._checked = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "CompiledTemplateFile":
+        return cls(settings.compiled_template_path, settings.field_mapping_path, settings.profile_template_path,
+                   settings.template_reload_interval)
+
+    @staticmethod
+    def _mtime(path: Optional[str]) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except (TypeError, OSError):
+            return 0
+
+    def _stale(self) -> bool:
+        """Whether a JSON source is newer than the compiled file (or the file is missing)"""
+        compiled = self._mtime(self.path)
+        return compiled == 0 or max(self._mtime(self.mapping_path), self._mtime(self.profile_path)) > compiled
+
+    def _file_signature(self) -> Tuple:
+        """Identity of the compiled file and modification times of its sources"""
+        try:
+            stat = os.stat(self.path)
+            compiled = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            compiled = None
+        return compiled, self._mtime(self.mapping_path), self._mtime(self.profile_path)
+
+    def _load(self) -> CompiledTemplate:
+        """Map the compiled file, recompiling it first when a source is newer.
+
+        When the file cannot be written or read, the JSON sources are
+        compiled into this process's memory instead; without them the
+        error is raised.
+        """
+        if self._stale() and self._mtime(self.mapping_path):
+            try:
+                size = compile_files(self.mapping_path, self.profile_path, self.path)
+            except OSError as e:
+                return self._compile_in_memory(e)
+            logger.info("Compiled %s into %s (%d bytes)", self.mapping_path, self.path, size)
+        try:
+            with open(self.path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return CompiledTemplate(buffer)
+        except (OSError, ValueError) as e:
+            if not self._mtime(self.mapping_path):
+                raise
+            return self._compile_in_memory(e)
+
+    def _compile_in_memory(self, error: Exception) -> CompiledTemplate:
+        data = compile_sources(self.mapping_path, self.profile_path)
+        logger.warning("Compiled template %s not usable (%s); serving %s compiled in memory (%d bytes)",
+                       self.path, error, self.mapping_path, len(data))
+        return CompiledTemplate(data)
+
+    def _changed(self) -> bool:
+        return self._file_signature() != self._signature
+
+    def current(self) -> CompiledTemplate:
+        """The compiled template, reloaded if the file or its sources changed since the last check"""
+        now = time.monotonic()
+        if self._template is not None and now - self._checked < self.check_interval:
+            return self._template
+        with self._lock:
+            if self._template is None or (now - self._checked >= self.check_interval and self._changed()):
+                try:
+                    self._template = self._load()
+                except (OSError, ValueError) as e:
+                    # Without any field definitions, validation and field mapping would pass
+                    # everything silently, so a first load fails loudly instead
+                    if self._template is None:
+                        logger.error("Compiled template not loaded: %s", e)
+                        raise
+                    # Not retried until the file or a source changes again
+                    logger.warning("Compiled template not reloaded (%s); keeping the previous one", e)
+                self._signature = self._file_signature()
+            self._checked = now
+            return self._template
+
+
+COMPILED_TEMPLATE = CompiledTemplateFile.from_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile field_mapping.json and profile_template.json")
+    parser.add_argument("--mapping", default=settings.field_mapping_path)
+    parser.add_argument("--profile", default=settings.profile_template_path)
+    parser.add_argument("-o", "--output", default=settings.compiled_template_path)
+    args = parser.parse_args()
+
+    size = compile_files(args.mapping, args.profile, args.output)
+    with open(args.output, "rb") as f:
+        template = CompiledTemplate(f.read())
+    print(f"{args.output}: {size} bytes, format {FORMAT_VERSION}, {template.field_count} fields "
+          f"({len(template.profile_fields)} profile), pages {template.pages[:1]}..{template.pages[-1:]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import asyncio
+import multiprocessing
+import resource
+import threading
+import zlib
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logs import configure_logging, current_request_id, request_context
+from metrics import record_task, run_measured
+from profiling import active_profile, run_profiled
+from settings import settings
+from warmup import warm_up, worker_report
+
+
+class QueueFullError(Exception):
+    """Raised when the executor already has its maximum number of pending tasks"""
+
+
+class TaskTimeoutError(Exception):
+    """Raised when a task does not finish within its timeout"""
+
+
+def _init_worker(limit_bytes: int, warmup: bool):
+    """Process-pool initializer: set up logging, cap the worker's address
+    space so one oversized document raises MemoryError instead of exhausting
+    the pod, and warm the worker up so its first task is not a cold one"""
+    configure_logging()
+    if limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    if warmup:
+        warm_up()
+
+
+def _run_task(request_id: Optional[str], profiled: bool, fn: Callable, *args):
+    """Worker side of PDFExecutor.run: fn's log lines carry the request's id,
+    its phases are timed and, for a profiled request, it runs under cProfile"""
+    with request_context(request_id):
+        return run_profiled(fn, *args) if profiled else run_measured(fn, *args)
+
+
+class PDFExecutor:
+    """Runs CPU-bound PDFService calls outside the asyncio event loop.
+
+    In ``process`` mode there is one single-worker process pool per core.
+    Tasks given an ``affinity`` key (the document hash) always land on the
+    same worker, so that worker's parsed-document cache stays warm for
+    repeat uploads; other tasks go to the least busy worker. ``thread`` and
+    ``inline`` modes exist for development and in-process benchmarks.
+
+    Each worker runs one task at a time, so ``memory_limit`` (an address
+    space cap applied to every worker process) is also a per-task ceiling.
+    The number of submitted-but-unfinished tasks is bounded by
+    ``max_pending``; ``run`` raises QueueFullError instead of queueing more.
+    A timed-out task that is still queued is cancelled; one that is already
+    running finishes in the background but no longer holds up the request.
+    With ``warmup`` every worker process, replacements included, runs
+    warmup.warm_up before its first task.
+    """
+
+    def __init__(self, mode: str = "process", workers: int = 1, max_pending: int = 0,
+                 timeout: Optional[float] = None, memory_limit: int = 0, warmup: bool = False):
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.warmup = warmup
+        self._pools: List[Optional[Executor]] = []
+        self._inflight: List[int] = []
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @classmethod
+    def from_settings(cls) -> "PDFExecutor":
+        return cls(
+            mode=settings.executor_mode,
+            workers=settings.executor_workers,
+            max_pending=settings.executor_max_pending,
+            timeout=settings.task_timeout,
+            memory_limit=settings.worker_memory_bytes,
+            warmup=settings.warmup,
+        )
+
+    def start(self):
+        if self._pools:
+            return
+        if self.mode == "process":
+            self._pools = [self._new_process_pool() for _ in range(self.workers)]
+        elif self.mode == "thread":
+            self._pools = [ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf")]
+        else:
+            self._pools = [None]
+        self._inflight = [0] * len(self._pools)
+
+    async def start_workers(self) -> List[Optional[Dict[str, Any]]]:
+        """Start the workers now rather than on the first task, and wait until they are warm.
+
+        Returns each worker's warm-up report (None when warm-up is off).
+        In thread and inline mode the warm-up runs once, in this process.
+        """
+        self.start()
+        if self.mode != "process":
+            if not self.warmup:
+                return [None]
+            if self.mode == "thread":
+                return [await asyncio.wrap_future(self._pools[0].submit(warm_up))]
+            return [warm_up()]
+        # A pool spawns its worker, which runs the initializer, on its first task
+        return list(await asyncio.gather(*(asyncio.wrap_future(pool.submit(worker_report))
+                                           for pool in self._pools)))
+
+    def shutdown(self):
+        for pool in self._pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = []
+        self._inflight = []
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    async def run(self, fn: Callable, *args, affinity: Optional[str] = None,
+                  timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` on a worker and await its result.
+
+        The worker times the task's phases (see metrics) and they are added
+        to the calling request's; inline tasks record into it directly. When
+        the request is being profiled (see profiling), the worker also runs
+        the task under cProfile and its stats join the request's profile.
+        Log lines of the task carry the request's id (see logs).
+        """
+        if not self._pools:
+            self.start()
+        profile = active_profile()
+        if self.mode == "inline":
+            if profile is None:
+                return fn(*args)
+            result, task_metrics, stats = run_profiled(fn, *args)
+            record_task(task_metrics)
+            profile.add(stats)
+            return result
+
+        slot = self._acquire(affinity)
+        try:
+            pool, future = self._submit(slot, current_request_id(), profile is not None, fn, *args)
+        except BaseException:
+            self._release(slot)
+            raise
+        future.add_done_callback(lambda _: self._release(slot))
+
+        try:
+            result, task_metrics, *stats = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                                 timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise TaskTimeoutError(f"{getattr(fn, '__name__', 'task')} timed out") from None
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace it for later tasks
+            self._replace_pool(slot, pool)
+            raise
+        self.completed += 1
+        record_task(task_metrics)
+        if stats:
+            profile.add(stats[0])
+        return result
+
+    def _new_process_pool(self) -> ProcessPoolExecutor:
+        # spawn avoids forking a process that already runs the event loop and its threads
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit, self.warmup),
+        )
+
+    def _submit(self, slot: int, *task) -> Tuple[Executor, Future]:
+        """Submit a task to a slot's pool; returns the pool with the future.
+
+        A pool whose worker died while idle only reports it here, so it is
+        replaced and the task submitted once more, to the new pool.
+        """
+        pool = self._pools[slot]
+        try:
+            return pool, pool.submit(_run_task, *task)
+        except BrokenProcessPool:
+            pool = self._replace_pool(slot, pool)
+            return pool, pool.submit(_run_task, *task)
+
+    def _replace_pool(self, slot: int, broken: Executor) -> Executor:
+        """Replace the slot's pool if it is still ``broken``; returns the slot's current pool.
+
+        Every task of a dead worker fails, so several callers replace the
+        same pool: only the first swaps it, and a replacement (with tasks
+        already submitted to it) is never shut down by a later one.
+        """
+        with self._lock:
+            if slot >= len(self._pools):
+                return broken  # shut down meanwhile
+            if self._pools[slot] is not broken:
+                return self._pools[slot]
+            self._pools[slot] = self._new_process_pool()
+            current = self._pools[slot]
+        broken.shutdown(wait=False, cancel_futures=True)
+        return current
+
+    def _acquire(self, affinity: Optional[str]) -> int:
+        with self._lock:
+            if sum(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self.max_pending} PDF tasks already pending")
+            if affinity is not None and len(self._pools) > 1:
+                slot = zlib.crc32(affinity.encode()) % len(self._pools)
+            else:
+                slot = min(range(len(self._pools)), key=self._inflight.__getitem__)
+            self._inflight[slot] += 1
+            return slot
+
+    def _release(self, slot: int):
+        with self._lock:
+            if slot < len(self._inflight):
+                self._inflight[slot] -= 1
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+import re
+from typing import Dict, List, Tuple
+
+# Label/value patterns for each profile field, in priority order. For every
+# field the first pattern that matches anywhere in the document wins, and its
+# leftmost match provides the value.
+FIELD_PATTERNS: Dict[str, List[str]] = {
+    'company_name': [
+        r'Company[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
+        r'Firm[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
+        r'Organization[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
+        r'Name[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
+        r'Business[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
+    ],
+    'registration_number': [
+        r'Registration[:\s]+([A-Z0-9/-]+)',
+        r'Reg[.\s]+No[.:\s]+([A-Z0-9/-]+)',
+        r'Company[:\s]+No[.:\s]+([A-Z0-9/-]+)',
+        r'Reg[:\s]+([A-Z0-9/-]+)',
+        r'Number[:\s]+([A-Z0-9/-]+)',
+    ],
+    'contact_person': [
+        r'Contact[:\s]+([A-Za-z\s]+)',
+        r'Person[:\s]+([A-Za-z\s]+)',
+        r'Representative[:\s]+([A-Za-z\s]+)',
+        r'Director[:\s]+([A-Za-z\s]+)',
+        r'Manager[:\s]+([A-Za-z\s]+)',
+    ],
+    'phone': [
+        r'Phone[:\s]+([+\d\s-]+)',
+        r'Tel[.:\s]+([+\d\s-]+)',
+        r'Mobile[:\s]+([+\d\s-]+)',
+        r'Telephone[:\s]+([+\d\s-]+)',
+        r'Call[:\s]+([+\d\s-]+)',
+    ],
+    'email': [
+        r'Email[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+        r'E-mail[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+        r'Mail[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
+    ],
+    'address': [
+        r'Address[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
+        r'Location[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
+        r'Street[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
+        r'Office[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
+    ],
+    'annual_turnover': [
+        r'Turnover[:\s]+([0-9,]+)',
+        r'Revenue[:\s]+([0-9,]+)',
+        r'Annual[:\s]+([0-9,]+)',
+        r'Income[:\s]+([0-9,]+)',
+    ],
+    'tax_id': [
+        r'Tax[:\s]+([A-Z0-9/-]+)',
+        r'VAT[:\s]+([A-Z0-9/-]+)',
+        r'PIN[:\s]+([A-Z0-9/-]+)',
+        r'Tax ID[:\s]+([A-Z0-9/-]+)',
+    ],
+    'directors': [
+        r'Director[:\s]+([A-Za-z\s,]+)',
+        r'Directors[:\s]+([A-Za-z\s,]+)',
+        r'Board[:\s]+([A-Za-z\s,]+)',
+        r'Management[:\s]+([A-Za-z\s,]+)',
+    ],
+    'signature': [
+        r'Signature[:\s]+([A-Za-z\s]+)',
+        r'Signed[:\s]+([A-Za-z\s]+)',
+        r'Authorized[:\s]+([A-Za-z\s]+)',
+    ],
+    'bank_reference': [
+        r'Bank[:\s]+([A-Za-z\s,.-]+)',
+        r'Reference[:\s]+([A-Za-z\s,.-]+)',
+        r'Banking[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'credit_facility': [
+        r'Credit[:\s]+([A-Za-z\s,.-]+)',
+        r'Facility[:\s]+([A-Za-z\s,.-]+)',
+        r'Loan[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'financial_capacity': [
+        r'Capacity[:\s]+([A-Za-z\s,.-]+)',
+        r'Financial[:\s]+([A-Za-z\s,.-]+)',
+        r'Capability[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'bank_guarantee': [
+        r'Guarantee[:\s]+([A-Za-z\s,.-]+)',
+        r'Bank Guarantee[:\s]+([A-Za-z\s,.-]+)',
+        r'Security[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'insurance': [
+        r'Insurance[:\s]+([A-Za-z\s,.-]+)',
+        r'Coverage[:\s]+([A-Za-z\s,.-]+)',
+        r'Policy[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'similar_projects': [
+        r'Projects[:\s]+([A-Za-z\s,.-]+)',
+        r'Experience[:\s]+([A-Za-z\s,.-]+)',
+        r'Previous[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'project_value': [
+        r'Value[:\s]+([0-9,]+)',
+        r'Project Value[:\s]+([0-9,]+)',
+        r'Cost[:\s]+([0-9,]+)',
+    ],
+    'completion_date': [
+        r'Completion[:\s]+([0-9/-]+)',
+        r'Finished[:\s]+([0-9/-]+)',
+        r'Date[:\s]+([0-9/-]+)',
+    ],
+    'client_reference': [
+        r'Client[:\s]+([A-Za-z\s,.-]+)',
+        r'Reference[:\s]+([A-Za-z\s,.-]+)',
+        r'Customer[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'equipment': [
+        r'Equipment[:\s]+([A-Za-z\s,.-]+)',
+        r'Machinery[:\s]+([A-Za-z\s,.-]+)',
+        r'Tools[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'personnel': [
+        r'Personnel[:\s]+([A-Za-z\s,.-]+)',
+        r'Staff[:\s]+([A-Za-z\s,.-]+)',
+        r'Employees[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'methodology': [
+        r'Methodology[:\s]+([A-Za-z\s,.-]+)',
+        r'Approach[:\s]+([A-Za-z\s,.-]+)',
+        r'Method[:\s]+([A-Za-z\s,.-]+)',
+    ],
+    'timeline': [
+        r'Timeline[:\s]+([A-Za-z\s,.-]+)',
+        r'Schedule[:\s]+([A-Za-z\s,.-]+)',
+        r'Duration[:\s]+([A-Za-z\s,.-]+)',
+    ],
+}
+
+# Pattern helpers, also used by line_classifier for its keyword rules
+_REGEX_META = set('\\[](){}.*+?^$|')
+
+
+def literal_prefix(pattern: str) -> str:
+    """Return the leading literal text of a pattern (its label)"""
+    for i, ch in enumerate(pattern):
+        if ch in _REGEX_META:
+            return pattern[:i]
+    return pattern
+
+
+def trie_regex(words: List[str]) -> str:
+    """Build a prefix-factored alternation, which ``re`` scans far faster than a flat one"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if '' in node else body
+
+    return build(trie)
+
+
+class FieldExtractor:
+    """Precompiled, single-pass label/value extractor.
+
+    Every pattern starts with a literal label such as ``Company`` or ``Tax ID``.
+    All labels are compiled into one trie-shaped regex that walks the text
+    once, stopping only where some label starts. At each stop just the
+    patterns anchored on the labels found there are tried with ``match``, so
+    the result is the same as running ``re.search`` for every pattern in
+    priority order, without rescanning the document per pattern.
+    """
+
+    def __init__(self, field_patterns: Dict[str, List[str]]):
+        self.fields = list(field_patterns)
+        # label (lowercase) -> [(field, priority, compiled pattern)]
+        by_label: Dict[str, List[Tuple[str, int, re.Pattern]]] = {}
+        for field_name, patterns in field_patterns.items():
+            for priority, pattern in enumerate(patterns):
+                label = literal_prefix(pattern)
+                if not label:
+                    raise ValueError(f"Pattern for {field_name} has no literal label: {pattern!r}")
+                by_label.setdefault(label.lower(), []).append(
+                    (field_name, priority, re.compile(pattern, re.IGNORECASE))
+                )
+
+        # The trie regex is greedy, so a hit reports the longest label at that
+        # position; every shorter label matching there is one of its prefixes.
+        self._candidates: Dict[str, List[Tuple[str, int, re.Pattern]]] = {}
+        for label in by_label:
+            candidates = [c for other in by_label if label.startswith(other) for c in by_label[other]]
+            candidates.sort(key=lambda candidate: candidate[1])
+            self._candidates[label] = candidates
+
+        label_regex = trie_regex(list(by_label))
+        # ASCII text is lowercased once and scanned case-sensitively; anything
+        # else uses the case-insensitive form to keep re.IGNORECASE semantics.
+        self._label_regex = re.compile(label_regex)
+        self._label_regex_ci = re.compile(label_regex, re.IGNORECASE)
+
+    def _label_candidates(self, label: str) -> List[Tuple[str, int, re.Pattern]]:
+        candidates = self._candidates.get(label.lower())
+        if candidates is None:
+            # Non-ASCII case folding (e.g. KELVIN SIGN for "k")
+            candidates = next(c for key, c in self._candidates.items()
+                              if len(key) == len(label) and re.fullmatch(re.escape(key), label, re.IGNORECASE))
+        return candidates
+
+    def extract(self, text: str) -> Dict[str, str]:
+        """Return the first-priority match for every field found in ``text``"""
+        if text.isascii():
+            search = self._label_regex.search
+            haystack = text.lower()
+        else:
+            search = self._label_regex_ci.search
+            haystack = text
+
+        best: Dict[str, Tuple[int, str]] = {}
+        complete = 0
+        pos = 0
+        while complete < len(self.fields):
+            hit = search(haystack, pos)
+            if hit is None:
+                break
+            start = hit.start()
+            for field_name, priority, pattern in self._label_candidates(hit.group()):
+                found = best.get(field_name)
+                if found is not None and found[0] <= priority:
+                    continue
+                match = pattern.match(text, start)
+                if match:
+                    best[field_name] = (priority, match.group(1).strip())
+                    if priority == 0:
+                        complete += 1
+            # Labels may overlap ("Telephone" contains "Phone"), so resume the
+            # scan one character later rather than after the whole label.
+            pos = start + 1
+
+        return {field_name: best[field_name][1] for field_name in self.fields if field_name in best}
+
+    def extract_pages(self, text_content: Dict[str, str]) -> Dict[str, str]:
+        """Extract fields from page texts joined in page order"""
+        return self.extract(" ".join(text_content.values()))
+
+
+# Compiled once at import and shared by every request
+DEFAULT_EXTRACTOR = FieldExtractor(FIELD_PATTERNS)
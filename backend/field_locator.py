@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import re
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from line_classifier import LineClassifier
+
+# Leader characters used when the field mapping has no placeholder runs
+DEFAULT_LEADERS = "_.…"
+
+# A run counts as a placeholder once it is this long, counting "…" as three dots
+MIN_RUN_LENGTH = 3
+# Runs of plain dots must be longer, so an ordinary "..." is not a field
+MIN_DOT_RUN_LENGTH = 4
+
+# Vertical distance (points) within which characters share a line
+LINE_TOLERANCE = 2.0
+
+# Label keywords -> profile field, in priority order (first match wins)
+LABEL_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ('tender_name', ('name and description of tender', 'tender name', 'name of tender')),
+    ('tender_number', ('tender no', 'tender number', 'request for tender no')),
+    ('completion_date', ('completion date', 'date of completion')),
+    ('company_name', ("tenderer's name", 'name of tenderer', 'name of firm', 'company name',
+                      'name of company', 'name of bidder', "bidder's name")),
+    ('registration_number', ('registration no', 'registration number', 'incorporation no')),
+    ('contact_person', ('contact person', 'authorized representative', 'authorised representative')),
+    ('email', ('e-mail', 'email')),
+    ('phone', ('telephone', 'phone', 'tel', 'mobile')),
+    ('address', ('address',)),
+    ('tax_id', ('pin', 'tax')),
+    ('directors', ('director', 'directors')),
+    ('signature', ('signature', 'signed')),
+    ('annual_turnover', ('turnover',)),
+    ('bank_guarantee', ('bank guarantee', 'guarantee')),
+    ('bank_reference', ('bank reference', 'name of bank', 'bankers')),
+    ('credit_facility', ('credit facility', 'credit line', 'line of credit')),
+    ('financial_capacity', ('financial capacity', 'financial resources')),
+    ('insurance', ('insurance',)),
+    ('similar_projects', ('similar projects', 'similar works', 'similar contracts')),
+    ('project_value', ('contract value', 'project value', 'contract sum', 'contract amount')),
+    ('client_reference', ('client reference', 'name of client', 'name of employer')),
+    ('equipment', ('equipment',)),
+    ('personnel', ('personnel', 'name of candidate', 'key staff')),
+    ('methodology', ('methodology',)),
+    ('timeline', ('timeline', 'work programme', 'work plan', 'programme of works')),
+    ('date', ('date',)),
+]
+
+
+def _normalize_label(label: str) -> str:
+    label = label.lower().replace('’', "'").replace('‘', "'")
+    return re.sub(r'\s+', ' ', label).strip(' :-\t')
+
+
+def parse_page_range(pages: Optional[str]) -> Optional[List[int]]:
+    """ "47-90" or "3,5,10-12" -> sorted, de-duplicated 1-based page numbers (None when empty).
+
+    Raises ValueError for malformed ranges and page numbers below 1.
+    """
+    if not pages or not str(pages).strip():
+        return None
+    numbers = set()
+    for part in str(pages).split(","):
+        first, _, last = part.strip().partition("-")
+        first_page, last_page = int(first), int(last or first)
+        if first_page < 1 or last_page < first_page:
+            raise ValueError(f"Invalid page range: {part.strip()}")
+        numbers.update(range(first_page, last_page + 1))
+    return sorted(numbers)
+
+
+_TEXT = itemgetter("text")
+_TOP = itemgetter("top")
+_BOTTOM = itemgetter("bottom")
+
+
+class FieldLocator:
+    """Finds placeholder runs (underscores, dot or ellipsis leaders) in a page's characters.
+
+    The page's characters are joined into one string and the runs are found
+    with a single regex scan over it; only the characters of each run and
+    its label are visited individually. Each run is named after the label
+    text in front of it (or on the line above) via LABEL_KEYWORDS.
+    """
+
+    def __init__(self, leaders: str = DEFAULT_LEADERS, pages: Optional[List[int]] = None,
+                 label_keywords: Sequence[Tuple[str, Sequence[str]]] = tuple(LABEL_KEYWORDS)):
+        self.leaders = leaders
+        self.pages = pages
+        self._run_pattern = re.compile(f"[{re.escape(leaders)}]{{2,}}")
+        self._strip_leaders = re.compile(f"[{re.escape(leaders)}]+")
+        self._labels = LineClassifier([
+            (field_name, '|'.join(rf'\b{re.escape(keyword)}\b' for keyword in keywords))
+            for field_name, keywords in label_keywords
+        ])
+
+    def find_placeholders(self, chars: List[Dict]) -> List[Dict]:
+        """Bounding boxes and labels of the placeholder runs among pdfplumber chars"""
+        text = "".join(map(_TEXT, chars))
+        if len(text) != len(chars):
+            # Some glyphs map to several characters; keep one per glyph so indexes line up
+            text = "".join([c["text"][:1] or "\0" for c in chars])
+
+        runs = []
+        floor = 0  # labels never reach back past the previous run
+        for match in self._run_pattern.finditer(text):
+            start, end = match.span()
+            if abs(chars[start]["top"] - chars[end - 1]["top"]) <= LINE_TOLERANCE:
+                segments = [(start, end)]
+            else:
+                segments = self._split_lines(chars, start, end)
+            for segment_start, segment_end in segments:
+                segment = text[segment_start:segment_end]
+                length = len(segment) + 2 * segment.count("…")
+                min_length = MIN_DOT_RUN_LENGTH if segment.count(".") == len(segment) else MIN_RUN_LENGTH
+                if length < min_length:
+                    continue
+                run_chars = chars[segment_start:segment_end]
+                runs.append({
+                    "x0": chars[segment_start]["x0"],
+                    "x1": chars[segment_end - 1]["x1"],
+                    "top": min(map(_TOP, run_chars)),
+                    "bottom": max(map(_BOTTOM, run_chars)),
+                    "label": self._label(text, chars, segment_start, floor),
+                })
+                floor = segment_end
+        return runs
+
+    @staticmethod
+    def _split_lines(chars: List[Dict], start: int, end: int) -> List[Tuple[int, int]]:
+        """Split a run that wraps onto following lines into one segment per line"""
+        segments = []
+        segment_start = start
+        for i in range(start + 1, end):
+            if abs(chars[i]["top"] - chars[i - 1]["top"]) > LINE_TOLERANCE or chars[i]["x0"] < chars[i - 1]["x0"]:
+                segments.append((segment_start, i))
+                segment_start = i
+        segments.append((segment_start, end))
+        return segments
+
+    def _label(self, text: str, chars: List[Dict], start: int, floor: int) -> str:
+        """Text before a run on its line, or the line above when the run starts a line"""
+        i = start - 1
+        line_top = chars[start]["top"]
+        while i >= floor and abs(chars[i]["top"] - line_top) <= LINE_TOLERANCE:
+            i -= 1
+        label = self._clean(text[i + 1:start])
+        if label or i < floor:
+            return label
+
+        # Skip spacing glyphs, which can sit off the baseline of the line above
+        while i >= floor and text[i].isspace():
+            i -= 1
+        if i < floor:
+            return ""
+        line_top = chars[i]["top"]
+        line_end = i + 1
+        while i >= floor and abs(chars[i]["top"] - line_top) <= LINE_TOLERANCE:
+            i -= 1
+        return self._clean(text[i + 1:line_end])
+
+    def _clean(self, label: str) -> str:
+        return _normalize_label(self._strip_leaders.sub(" ", label.replace("\0", "")))
+
+    def field_name(self, label: str) -> Optional[str]:
+        """Profile field a placeholder label refers to, if any"""
+        return self._labels.classify(_normalize_label(label))
+
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from executor import QueueFullError
+from metrics import track
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat() if value else None
+
+
+@dataclass
+class Job:
+    """A long PDF operation run in the background, polled by its id"""
+    id: str
+    kind: str
+    status: str = QUEUED
+    pages_done: int = 0
+    pages_total: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def expect_pages(self, count: int):
+        """Add pages to the total this job will process"""
+        self.pages_total += count
+
+    def complete_pages(self, count: int):
+        self.pages_done = min(self.pages_total, self.pages_done + count)
+
+    def to_dict(self, ttl: float) -> Dict[str, Any]:
+        percent = round(100.0 * self.pages_done / self.pages_total, 1) if self.pages_total else 0.0
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "percent": 100.0 if self.status == SUCCEEDED else percent,
+            "error": self.error,
+            "created_at": _timestamp(self.created_at),
+            "started_at": _timestamp(self.started_at),
+            "finished_at": _timestamp(self.finished_at),
+            "expires_at": _timestamp(self.finished_at + ttl) if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """In-memory job store with a bounded number of concurrently running jobs.
+
+    At most ``concurrency`` jobs run at once and at most ``max_queued``
+    unfinished jobs are accepted; ``submit`` raises QueueFullError beyond
+    that. Finished jobs keep their result for ``ttl`` seconds. Jobs live in
+    this process only, so a deployment with several server processes needs
+    sticky routing for the job endpoints.
+    """
+
+    def __init__(self, concurrency: int = 2, max_queued: int = 32, ttl: float = 3600.0):
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_settings(cls) -> "JobManager":
+        return cls(settings.job_concurrency, settings.job_max_queued, settings.job_ttl)
+
+    def unfinished(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]],
+               resources: Optional[AsyncExitStack] = None) -> Job:
+        """Queue work(job) and return the job at once.
+
+        resources (e.g. the job's spooled uploads) are closed when the job
+        ends, whether it succeeded, failed or was cancelled.
+        """
+        if self.unfinished() >= self.max_queued:
+            raise QueueFullError(f"{self.max_queued} jobs are already queued or running")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._execute(job, work, resources))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.finished and time.time() - job.finished_at > self.ttl:
+            self._jobs.pop(job_id, None)
+            return None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"concurrency": self.concurrency, "max_queued": self.max_queued, **counts}
+
+    def sweep(self) -> int:
+        """Forget finished jobs older than the TTL; returns how many were removed"""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    async def sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    async def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _execute(self, job: Job, work: Callable[[Job], Awaitable[Any]],
+                       resources: Optional[AsyncExitStack]):
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                try:
+                    # The job outlives its request, so its phases are recorded on their own
+                    with track(f"/jobs/{job.kind}"):
+                        job.result = await work(job)
+                    job.status = SUCCEEDED
+                except HTTPException as e:
+                    job.error, job.error_status = str(e.detail), e.status_code
+                    job.status = FAILED
+                except Exception as e:
+                    logger.exception("Job %s (%s) failed: %s", job.id, job.kind, e)
+                    job.error, job.error_status = str(e) or type(e).__name__, 500
+                    job.status = FAILED
+                finally:
+                    job.finished_at = time.time()
+        except asyncio.CancelledError:
+            # Cancelled at shutdown, running or still waiting for a slot
+            job.error, job.error_status = "Job cancelled: the server shut down", 503
+            job.status = FAILED
+            job.finished_at = job.finished_at or time.time()
+            raise
+        finally:
+            self._tasks.pop(job.id, None)
+            if resources is not None:
+                await resources.aclose()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from field_extractor import literal_prefix, trie_regex
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Keyword rules for differing lines -> profile field, in priority order: a
+# line belongs to the first rule whose pattern occurs anywhere in it
+DIFFERENCE_RULES: List[Tuple[str, str]] = [
+    ('company_name', r'company|firm|organization'),
+    ('registration_number', r'registration|reg\.?|no\.?'),
+    ('contact_person', r'contact|person|representative'),
+    ('phone', r'phone|tel|mobile'),
+    ('email', r'@|email|mail'),
+    ('address', r'address|location|street'),
+    ('annual_turnover', r'turnover|revenue|income'),
+    ('tax_id', r'tax|vat|pin'),
+    ('directors', r'director|board|management'),
+    ('signature', r'signature|signed|authorized'),
+    ('bank_reference', r'bank|reference|banking'),
+    ('credit_facility', r'credit|facility|loan'),
+    ('financial_capacity', r'capacity|capability'),
+    ('bank_guarantee', r'guarantee|security'),
+    ('insurance', r'insurance|coverage|policy'),
+    ('similar_projects', r'project|experience|previous'),
+    ('project_value', r'value|cost|amount'),
+    ('completion_date', r'completion|finished|date'),
+    ('client_reference', r'client|reference|customer'),
+    ('equipment', r'equipment|machinery|tools'),
+    ('personnel', r'personnel|staff|employees'),
+    ('methodology', r'methodology|approach|method'),
+    ('timeline', r'timeline|schedule|duration'),
+]
+
+
+_QUANTIFIERS = set('?*{')
+
+
+def _alternatives(pattern: str) -> List[str]:
+    """Split a pattern at its top-level |"""
+    parts, depth, start, i, in_class = [], 0, 0, 0, False
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 1
+        elif in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _required_prefix(alternative: str) -> str:
+    """Leading literal text every match of a (|-free) pattern starts with"""
+    while alternative.startswith('\\b'):
+        alternative = alternative[2:]  # a word boundary consumes nothing
+    prefix = literal_prefix(alternative)
+    if len(prefix) < len(alternative) and alternative[len(prefix)] in _QUANTIFIERS:
+        prefix = prefix[:-1]  # the quantifier makes the last character optional
+    return prefix
+
+
+class LineClassifier:
+    """Classifies lines with an ordered rule table in one scan per line.
+
+    The literal keywords the rules start with (e.g. "company", "reg" of
+    r"reg\.?") are compiled into one trie-shaped regex, as in
+    FieldExtractor. Scanning a line stops only where some keyword starts;
+    there the rules starting with that keyword (or a prefix of it) are
+    tried in priority order with ``match``. The lowest rule index found is
+    the first rule in the table that matches anywhere in the line, the
+    same answer as running ``re.search`` for every rule in turn. Matching
+    is case-insensitive. Rules with an alternative that starts with no
+    literal text are checked with a plain search instead.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, str]]):
+        self.rules = list(rules)
+        self.fields = [field_name for field_name, _ in self.rules]
+        self._compiled = [re.compile(pattern, re.IGNORECASE) for _, pattern in self.rules]
+
+        # keyword -> indexes of the rules with an alternative starting with it
+        by_keyword: Dict[str, Set[int]] = {}
+        self._unanchored: List[int] = []
+        for index, (_, pattern) in enumerate(self.rules):
+            prefixes = [_required_prefix(alternative).lower() for alternative in _alternatives(pattern)]
+            if not all(prefixes):
+                self._unanchored.append(index)
+                continue
+            for prefix in prefixes:
+                by_keyword.setdefault(prefix, set()).add(index)
+
+        # The trie regex is greedy, so a hit reports the longest keyword at that
+        # position; every shorter keyword starting there is one of its prefixes.
+        self._candidates: Dict[str, List[int]] = {
+            keyword: sorted({i for other in by_keyword if keyword.startswith(other) for i in by_keyword[other]})
+            for keyword in by_keyword
+        }
+        self._keywords = re.compile(trie_regex(list(by_keyword))) if by_keyword else None
+
+    @classmethod
+    def from_file(cls, rules_path: Optional[str], default_rules: Sequence[Tuple[str, str]]) -> "LineClassifier":
+        """Rules from a JSON file ({"rules": [{"field": ..., "pattern": ...}, ...]}), else default_rules"""
+        if not rules_path:
+            return cls(default_rules)
+        try:
+            with open(rules_path, encoding="utf-8") as f:
+                rules = [(rule["field"], rule["pattern"]) for rule in json.load(f)["rules"]]
+            return cls(rules)
+        except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+            logger.warning("Classifier rules not loaded from %s (%s); using the built-in rules", rules_path, e)
+            return cls(default_rules)
+
+    def classify(self, line: str) -> Optional[str]:
+        """Field of the first rule matching anywhere in line, or None"""
+        lowered = line.lower()
+        best = len(self.rules)
+        if self._keywords is not None:
+            search = self._keywords.search
+            match = search(lowered)
+            while match is not None:
+                position = match.start()
+                for index in self._candidates[match.group()]:
+                    if index >= best:
+                        break
+                    if self._compiled[index].match(lowered, position):
+                        best = index
+                        break
+                if best == 0:
+                    break
+                match = search(lowered, position + 1)
+        for index in self._unanchored:
+            if index >= best:
+                break
+            if self._compiled[index].search(lowered):
+                best = index
+        return self.fields[best] if best < len(self.rules) else None
+
+
+DIFFERENCE_CLASSIFIER = LineClassifier.from_file(settings.classifier_rules_path, DIFFERENCE_RULES)
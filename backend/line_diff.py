@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Edit distance beyond which two pages are treated as unrelated and their
+# differing middles are paired line by line instead of aligned; keeps the
+# O((N+M)D) search bounded on pages that share almost nothing
+MAX_EDITS = 1000
+
+# Runs of edits longer than this are paired by position rather than by similarity
+MAX_PAIRED_RUN = 64
+
+# (filled line index, filled line, blank line it replaces or "")
+LineChange = Tuple[int, str, str]
+
+
+def _hash_lines(blank_lines: Sequence[str], filled_lines: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """Replace each line by a small integer, equal for equal lines, so comparisons are int compares"""
+    ids: Dict[str, int] = {}
+    blank = [ids.setdefault(line, len(ids)) for line in blank_lines]
+    filled = [ids.setdefault(line, len(ids)) for line in filled_lines]
+    return blank, filled
+
+
+def _myers(a: List[int], b: List[int], max_edits: int) -> Optional[List[Tuple[int, int]]]:
+    """Shortest edit script from a to b (Myers, "An O(ND) Difference Algorithm", 1986).
+
+    Returns the matched (a index, b index) pairs in order, or None when more
+    than max_edits insertions and deletions are needed.
+    """
+    n, m = len(a), len(b)
+    limit = min(n + m, max_edits)
+    offset = limit + 1
+    v = [0] * (2 * limit + 3)
+    trace: List[List[int]] = []
+    for d in range(limit + 1):
+        # Furthest x reached on diagonals -d-1..d+1 after d-1 edits
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]      # insertion: step down from diagonal k+1
+            else:
+                x = v[offset + k - 1] + 1  # deletion: step right from diagonal k-1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[List[int]], n: int, m: int) -> List[Tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((x, y))
+    matches.reverse()
+    return matches
+
+
+def _match_in_order(short: Sequence[str], long: Sequence[str]) -> List[int]:
+    """For each line of short, in order, the index of the line of long sharing the longest prefix with it"""
+    matched = []
+    next_index = 0
+    for i, line in enumerate(short):
+        # Leave enough lines of long for the lines of short still to match
+        last = len(long) - (len(short) - i)
+        matched.append(max(range(next_index, last + 1),
+                           key=lambda j: (len(os.path.commonprefix([line, long[j]])), -j)))
+        next_index = matched[-1] + 1
+    return matched
+
+
+def _pair_run(blank_run: Sequence[str], filled_run: Sequence[str]) -> List[str]:
+    """The blank line each filled line of a run of edits replaces ("" for pure insertions).
+
+    Lines are paired in order by the longest shared prefix (a label such as
+    "Name:"), so lines inserted ahead of a filled-in field do not take its
+    blank line.
+    """
+    paired = [""] * len(filled_run)
+    if not blank_run:
+        return paired
+    if len(filled_run) > MAX_PAIRED_RUN or len(blank_run) > MAX_PAIRED_RUN:
+        for j in range(min(len(blank_run), len(filled_run))):
+            paired[j] = blank_run[j]
+    elif len(blank_run) <= len(filled_run):
+        for i, j in enumerate(_match_in_order(blank_run, filled_run)):
+            paired[j] = blank_run[i]
+    else:
+        for j, i in enumerate(_match_in_order(filled_run, blank_run)):
+            paired[j] = blank_run[i]
+    return paired
+
+
+def diff_lines(blank_lines: Sequence[str], filled_lines: Sequence[str],
+               max_edits: int = MAX_EDITS) -> List[LineChange]:
+    """Filled lines that were inserted or changed relative to the blank lines.
+
+    Lines are compared after stripping whitespace and aligned with a
+    shortest edit script, so a line inserted into the filled page shifts
+    nothing after it. Within each run of edits, changed filled lines are
+    paired in order with the blank lines they replace; lines that only
+    exist in the blank page are not reported.
+    """
+    blank_stripped = [line.strip() for line in blank_lines]
+    filled_stripped = [line.strip() for line in filled_lines]
+
+    # Common leading and trailing lines never need the edit search
+    start = 0
+    end_blank, end_filled = len(blank_stripped), len(filled_stripped)
+    while start < end_blank and start < end_filled and blank_stripped[start] == filled_stripped[start]:
+        start += 1
+    while end_blank > start and end_filled > start and blank_stripped[end_blank - 1] == filled_stripped[end_filled - 1]:
+        end_blank -= 1
+        end_filled -= 1
+
+    a, b = _hash_lines(blank_stripped[start:end_blank], filled_stripped[start:end_filled])
+    matches = _myers(a, b, max_edits)
+    if matches is None:
+        # Too different to align: pair the middles by position
+        return [
+            (start + j, filled_stripped[start + j], blank_stripped[start + j] if start + j < end_blank else "")
+            for j in range(len(b))
+        ]
+
+    changes: List[LineChange] = []
+    prev_a = prev_b = 0
+    for match_a, match_b in [*matches, (len(a), len(b))]:
+        # Blank lines prev_a..match_a were replaced by filled lines prev_b..match_b
+        if match_b > prev_b:
+            filled_run = filled_stripped[start + prev_b:start + match_b]
+            blank_run = blank_stripped[start + prev_a:start + match_a]
+            for j, (filled_line, blank_line) in enumerate(zip(filled_run, _pair_run(blank_run, filled_run))):
+                changes.append((start + prev_b + j, filled_line, blank_line))
+        prev_a, prev_b = match_a + 1, match_b + 1
+    return changes
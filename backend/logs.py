@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Structured logging: one JSON object per line, written off the request path.
+
+``configure_logging`` gives the root logger a QueueHandler; a QueueListener
+thread formats records as JSON and writes them to stderr, so a log call on
+the event loop or in a worker costs a level check and, when the level is
+enabled, an enqueue. Modules log through ``logging.getLogger(__name__)``
+with %-style arguments, which are only formatted for enabled levels;
+anything costly to compute for a debug line is guarded with
+``logger.isEnabledFor(logging.DEBUG)``.
+
+Every record carries the id of the request it was logged for.
+RequestContextMiddleware takes it from the X-Request-ID header (or makes
+one up) and returns it on the response; executor tasks pass it to the
+worker process or thread that runs them (see ``request_context``), so lines
+logged by PDFService in a worker are correlated with the request too.
+"""
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import queue
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import IO, Optional
+
+from settings import settings
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+_REQUEST_ID: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; any other attribute came from ``extra`` and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+# Libraries kept at WARNING when the service logs at DEBUG or INFO: pdfminer
+# alone logs every token it parses at DEBUG
+QUIET_LIBRARIES = ("pdfminer", "multipart", "PIL", "asyncio")
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+_HANDLER: Optional[logging.Handler] = None
+
+logger = logging.getLogger(__name__)
+
+
+def current_request_id() -> Optional[str]:
+    """Id of the request being handled, or None outside a request"""
+    return _REQUEST_ID.get()
+
+
+class request_context:
+    """Context manager making request_id the current request's id, e.g. in a worker running its task"""
+    __slots__ = ("request_id", "token")
+
+    def __init__(self, request_id: Optional[str]):
+        self.request_id = request_id
+
+    def __enter__(self):
+        self.token = _REQUEST_ID.set(self.request_id)
+        return self
+
+    def __exit__(self, *exc_info):
+        _REQUEST_ID.reset(self.token)
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one line of JSON: time, level, logger, message, request id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry["pid"] = record.process
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records stamped with the current request id; formatting is left to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default prepare formats the record (and its traceback) on the
+        # calling thread; here the queue never leaves the process, so only
+        # the message is rendered now, before its arguments can change
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = _REQUEST_ID.get()
+        return record
+
+
+def configure_logging(level: Optional[str] = None, stream: Optional[IO[str]] = None):
+    """Send all logging through a queue to a JSON writer thread (stderr by default).
+
+    Called once by the API process and by each worker process; calling it
+    again replaces the previous configuration.
+    """
+    global _LISTENER, _HANDLER
+    stop_logging()
+    # Skip the record attributes the JSON lines leave out, the caller's
+    # file and line above all, which cost a stack walk per record
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter())
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _HANDLER = _RequestQueueHandler(records)
+    _LISTENER = logging.handlers.QueueListener(records, output)
+    root = logging.getLogger()
+    root.addHandler(_HANDLER)
+    root.setLevel((level or settings.log_level).upper())
+    for name in QUIET_LIBRARIES:
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+    _LISTENER.start()
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _LISTENER, _HANDLER
+    if _HANDLER is not None:
+        logging.getLogger().removeHandler(_HANDLER)
+        _HANDLER = None
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+# Flush at exit; a multiprocessing finalizer also runs when a worker process
+# exits, which skips atexit handlers
+multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each request an id (X-Request-ID, sent or generated) and logging its outcome"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sent_id = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        request_id = sent_id if _VALID_REQUEST_ID.fullmatch(sent_id) else uuid.uuid4().hex
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (REQUEST_ID_HEADER, request_id.encode())]}
+            await send(message)
+
+        token = _REQUEST_ID.set(request_id)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("%s %s %d", scope["method"], scope["path"], status,
+                            extra={"method": scope["method"], "path": scope["path"], "status": status,
+                                   "duration_ms": round((time.perf_counter() - start) * 1000, 2)})
+            _REQUEST_ID.reset(token)
@@ -1,17 +1,58 @@
 #!/usr/bin/env python3
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import uvicorn
-import tempfile
+import asyncio
+import logging
 import os
-from typing import Dict, Any
+import re
+import time
+from contextlib import AsyncExitStack, contextmanager
+from dataclasses import asdict
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
 import json
 
-from pdf_service import PDFService, TenderInfo
+from compiled_template import COMPILED_TEMPLATE
+from executor import PDFExecutor, QueueFullError, TaskTimeoutError
+from jobs import Job, JobManager
+from logs import RequestContextMiddleware, configure_logging
+from metrics import REGISTRY, MetricsMiddleware
+from field_locator import parse_page_range
+from pdf_cache import DOCUMENT_CACHE
+from pdf_service import PDFField, PDFService, PageComparison, TenderInfo, default_compare_pages
+from profiling import ProfileStore, ProfilingMiddleware, authorized
+from scratch import ScratchArea, ScratchQuotaError
+from settings import settings
+from template_index import SAMPLE_PAGES, TemplateIndex
+from template_store import StoredTemplate, TemplateStore, field_pages
+from text_engines import resolve_engine
+from uploads import BodyLimitMiddleware, SpooledUpload, UploadTooLargeError, spooled_uploads
+from warmup import process_age
+from zip_stream import ZipStreamWriter
+import sharding
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Auto-Tender PDF Service", version="1.0.0")
 
+# CPU-bound PDF work runs here so the event loop stays responsive
+executor = PDFExecutor.from_settings()
+
+# Generated PDFs are written here and streamed back from disk
+scratch = ScratchArea.from_settings()
+
+# Long operations submitted through /jobs run in the background
+jobs = JobManager.from_settings()
+
+# Templates created from a filled/blank pair, which fills refer to by id
+templates = TemplateStore.from_settings()
+# Similarity index over the stored templates' blank pages, to match new blanks to them
+template_index = TemplateIndex.from_signatures(templates.page_signatures())
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -21,19 +62,229 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Oversized bodies are refused while they arrive, before Starlette spools them
+app.add_middleware(BodyLimitMiddleware)
+
+# Request counts, latencies, bytes and per-phase timings for /metrics
+app.add_middleware(MetricsMiddleware)
+REGISTRY.gauge("autotender_executor", "PDF executor queue depth and task outcomes", "stat",
+               lambda: {key: value for key, value in executor.stats().items() if isinstance(value, int)})
+REGISTRY.gauge("autotender_jobs", "Background jobs by status", "stat", jobs.stats)
+# Seconds from process start to the startup hook (boot) and to serving (ready), and of the slowest worker warm-up
+cold_start: Dict[str, float] = {}
+REGISTRY.gauge("autotender_cold_start_seconds", "Cold start of this API process", "stage", lambda: cold_start)
+
+# Opt-in profiling of requests sending X-Profile or sampled at random; not installed when off
+profiles = ProfileStore.from_settings()
+if settings.profile_token or settings.profile_sample_rate > 0:
+    app.add_middleware(ProfilingMiddleware, store=profiles, token=settings.profile_token,
+                       sample_rate=settings.profile_sample_rate)
+
+# Outermost: every request gets an id (X-Request-ID) that its log lines, in workers too, and profile carry
+app.add_middleware(RequestContextMiddleware)
+
+@app.on_event("startup")
+async def start_executor():
+    booted = process_age()
+    # Without field definitions nothing validates or maps: refuse to start rather than serve that
+    COMPILED_TEMPLATE.current()
+    # Drop cache entries a previous run spilled (possibly pickled by older code) before workers start
+    DOCUMENT_CACHE.clear_spilled()
+    # Workers start and warm up before the first request rather than during it
+    reports = [report for report in await executor.start_workers() if report]
+    ready = process_age()
+    if booted is not None and ready is not None:
+        cold_start.update(boot=booted, ready=ready)
+    if reports:
+        cold_start["warmup"] = max(report["total_ms"] for report in reports) / 1000
+    # Each worker logs its own warm-up steps
+    logger.info("Ready to serve", extra={"cold_start": cold_start})
+    app.state.scratch_sweeper = asyncio.create_task(scratch.sweep_forever(min(60.0, settings.scratch_ttl)))
+    app.state.job_sweeper = asyncio.create_task(jobs.sweep_forever(min(60.0, settings.job_ttl)))
+
+@app.on_event("shutdown")
+async def stop_executor():
+    app.state.scratch_sweeper.cancel()
+    app.state.job_sweeper.cancel()
+    await jobs.shutdown()
+    executor.shutdown()
+
+@contextmanager
+def executor_errors():
+    """Map upload caps, executor saturation, timeouts and worker memory limits to HTTP errors"""
+    try:
+        yield
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="PDF service is busy, please retry shortly")
+    except TaskTimeoutError:
+        raise HTTPException(status_code=504, detail="PDF processing timed out")
+    except MemoryError:
+        raise HTTPException(status_code=413, detail="Document needs more memory than a request may use")
+    except ScratchQuotaError as e:
+        raise HTTPException(status_code=507, detail=str(e))
+
+async def run_pdf_task(fn, *args, affinity: Optional[str] = None):
+    """Run a PDFService call on the executor"""
+    with executor_errors():
+        return await executor.run(fn, *args, affinity=affinity)
+
+def text_engine_option(engine: Optional[str]) -> str:
+    """Validate the text engine a request asked for (default: the template's or configured one)"""
+    try:
+        return resolve_engine(engine)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def extract_page_texts(upload: SpooledUpload, page_numbers: Optional[List[int]] = None,
+                             progress: Optional[Job] = None, engine: Optional[str] = None) -> Dict[int, str]:
+    """Extract page texts of an upload, sharded across workers when it is large"""
+    with executor_errors():
+        return await sharding.extract_page_texts(
+            executor, upload.path, upload.sha256, page_numbers, progress=progress, engine=engine
+        )
+
+async def extract_filled_data(filled: SpooledUpload, engine: Optional[str] = None,
+                              progress: Optional[Job] = None) -> Dict[str, Any]:
+    """Extract the filled-in values of a PDF (shared by the endpoint and its job)"""
+    logger.debug("Processing PDF: %s, size: %d bytes", filled.filename, filled.size)
+    
+    # Extract page texts (in parallel shards for large documents), then the data
+    page_texts = await extract_page_texts(filled, progress=progress, engine=engine)
+    text_content = {str(page_num): text for page_num, text in page_texts.items()}
+    extracted_data = await run_pdf_task(PDFService.extract_data_from_text, text_content)
+    
+    logger.debug("Extracted %d fields", len(extracted_data.filled_values))
+    
+    return {
+        "extracted_values": extracted_data.filled_values,
+        "pages_processed": len(extracted_data.text_content),
+        "fields_found": list(extracted_data.filled_values.keys())
+    }
+
+def compare_options(pages: Optional[str], mode: Optional[str]) -> Tuple[List[int], bool]:
+    """Validate the page range ("47-90,120") and mode ("full" or "first") of a comparison"""
+    try:
+        page_numbers = parse_page_range(pages) or default_compare_pages()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode not in (None, "full", "first"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'first'")
+    return page_numbers, mode == "first"
+
+async def compare_differences(filled: SpooledUpload, blank: SpooledUpload,
+                              page_numbers: Optional[List[int]] = None, first_difference: bool = False,
+                              engine: Optional[str] = None, progress: Optional[Job] = None) -> Dict[str, Any]:
+    """Diff the requested pages of a filled and a blank PDF (shared by the endpoint and its job).
+    
+    page_numbers are 1-based and default to default_compare_pages(); no other
+    page is parsed. Pages are skipped and chunked as PageComparison does (the
+    same as PDFService.compare_pdfs_and_extract_differences); here each
+    chunk is extracted in executor tasks, sharded when large.
+    """
+    logger.debug("Processing filled PDF: %s, size: %d bytes", filled.filename, filled.size)
+    logger.debug("Processing blank PDF: %s, size: %d bytes", blank.filename, blank.size)
+    
+    page_numbers = page_numbers or default_compare_pages()
+    filled_fingerprints, blank_fingerprints = await asyncio.gather(
+        run_pdf_task(PDFService.page_fingerprints, filled.path, page_numbers, affinity=filled.sha256),
+        run_pdf_task(PDFService.page_fingerprints, blank.path, page_numbers, affinity=blank.sha256)
+    )
+    comparison = PageComparison(page_numbers, filled_fingerprints, blank_fingerprints, first_difference)
+    logger.debug("Skipping %d pages with identical content", comparison.pages_skipped)
+    
+    if first_difference and progress is not None:
+        progress.expect_pages(2 * len(comparison.page_numbers))
+    
+    for chunk in comparison.chunks():
+        # Extract the pages of both PDFs concurrently, then diff them
+        chunk_progress = None if first_difference else progress
+        filled_pages, blank_pages = await asyncio.gather(
+            extract_page_texts(filled, chunk, chunk_progress, engine),
+            extract_page_texts(blank, chunk, chunk_progress, engine)
+        )
+        filled_text = {str(page_num): text for page_num, text in filled_pages.items()}
+        blank_text = {str(page_num): text for page_num, text in blank_pages.items()}
+        comparison.add(await run_pdf_task(PDFService.diff_page_texts, filled_text, blank_text, first_difference))
+        if first_difference and progress is not None:
+            progress.complete_pages(2 * len(chunk))
+    
+    response = comparison.result()
+    logger.debug("Found differences on %d pages", len(response['pages_compared']))
+    logger.debug("Extracted %d specific fields", len(response['filled_values']))
+    return response
+
+async def submit_upload_job(kind: str, operation, *files: UploadFile) -> Dict[str, Any]:
+    """Spool the uploads and queue operation(*uploads, progress=job) as a background job"""
+    resources = AsyncExitStack()
+    try:
+        with executor_errors():
+            uploads = await resources.enter_async_context(spooled_uploads(*files))
+            job = jobs.submit(kind, lambda job: operation(*uploads, progress=job), resources)
+    except BaseException:
+        await resources.aclose()
+        raise
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result"
+    }
+
+def parse_tender_info(tender_info: Optional[str]) -> TenderInfo:
+    """Tender info from its JSON string, with the demo tender as defaults"""
+    tender_dict = json.loads(tender_info) if tender_info else {}
+    return TenderInfo(
+        tender_name=tender_dict.get("tender_name", "Road Construction Project"),
+        tender_number=tender_dict.get("tender_number", "KURA/2024/001"),
+        organization=tender_dict.get("organization", "Kenya Urban Roads Authority"),
+        date=tender_dict.get("date")
+    )
+
+def stored_template(template_id: str) -> StoredTemplate:
+    """A stored template by id, or 404"""
+    stored = templates.get(template_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Template {template_id} not found")
+    return stored
+
+async def template_fields(template_id: Optional[str], upload: SpooledUpload) -> Optional[List[PDFField]]:
+    """Field positions of a stored template, once the upload is checked to be its blank PDF.
+    
+    Only the pages with fields are fingerprinted; any of them differing from
+    the blank the template was made from is a 409. Without an id, or for a
+    template with no fields, the fill locates the fields itself (None).
+    """
+    if not template_id:
+        return None
+    stored = stored_template(template_id)
+    if not stored.fields:
+        # Drawing no fields would return the blank unchanged
+        logger.info("Template %s has no fields; locating them in the upload", template_id)
+        return None
+    pages = sorted(stored.page_fingerprints)
+    if pages:
+        fingerprints = await run_pdf_task(PDFService.page_fingerprints, upload.path, pages, affinity=upload.sha256)
+        if fingerprints != stored.page_fingerprints:
+            raise HTTPException(status_code=409, detail="PDF does not match the blank PDF of this template")
+    return stored.fields
+
 @app.get("/")
 async def root():
     return {"message": "Auto-Tender PDF Service is running"}
 
 @app.post("/extract-tender-info")
-async def extract_tender_info(file: UploadFile = File(...)):
+async def extract_tender_info(file: UploadFile = File(...), engine: str = None):
     """Extract tender information from uploaded PDF"""
     try:
-        # Read the uploaded file
-        content = await file.read()
-        
-        # Extract tender information
-        tender_info = PDFService.extract_tender_info(content)
+        engine = text_engine_option(engine)
+        with executor_errors():
+            async with spooled_uploads(file) as (upload,):
+                # Extract tender information
+                tender_info = await run_pdf_task(
+                    PDFService.extract_tender_info, upload.path, engine, affinity=upload.sha256
+                )
         
         return {
             "tender_name": tender_info.tender_name,
@@ -41,6 +292,8 @@ async def extract_tender_info(file: UploadFile = File(...)):
             "organization": tender_info.organization,
             "date": tender_info.date
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting tender info: {str(e)}")
 
@@ -48,13 +301,11 @@ async def extract_tender_info(file: UploadFile = File(...)):
 async def fill_pdf(
     template_file: UploadFile = File(...),
     profile_data: str = None,  # JSON string
-    tender_info: str = None    # JSON string
+    tender_info: str = None,   # JSON string
+    template_id: str = None    # stored template whose field positions to fill
 ):
     """Fill PDF with profile data and tender information"""
     try:
-        # Read the template PDF
-        template_content = await template_file.read()
-        
         # Parse profile data
         if not profile_data:
             raise HTTPException(status_code=400, detail="Profile data is required")
@@ -62,13 +313,7 @@ async def fill_pdf(
         profile_dict = json.loads(profile_data)
         
         # Parse tender info
-        tender_dict = json.loads(tender_info) if tender_info else {}
-        tender_info_obj = TenderInfo(
-            tender_name=tender_dict.get("tender_name", "Road Construction Project"),
-            tender_number=tender_dict.get("tender_number", "KURA/2024/001"),
-            organization=tender_dict.get("organization", "Kenya Urban Roads Authority"),
-            date=tender_dict.get("date")
-        )
+        tender_info_obj = parse_tender_info(tender_info)
         
         # Validate profile data
         is_valid, missing_fields = PDFService.validate_profile_data(profile_dict)
@@ -78,66 +323,264 @@ async def fill_pdf(
                 detail=f"Profile data is incomplete. Missing fields: {', '.join(missing_fields)}"
             )
         
-        # Fill the PDF
-        filled_pdf_content = PDFService.fill_pdf(template_content, profile_dict, tender_info_obj)
-        
-        # Create temporary file for the filled PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(filled_pdf_content)
-            tmp_file_path = tmp_file.name
+        # Fill the PDF straight into a scratch file
+        with executor_errors():
+            output_path = scratch.allocate()
+            try:
+                async with spooled_uploads(template_file) as (template,):
+                    fields = await template_fields(template_id, template)
+                    await run_pdf_task(
+                        PDFService.fill_pdf_to_file, template.path, profile_dict, tender_info_obj, output_path,
+                        template.sha256, fields, affinity=template.sha256
+                    )
+            except BaseException:
+                scratch.release(output_path)
+                raise
         
-        # Return the filled PDF as a file response
+        # Stream the filled PDF from disk and delete it once sent
         return FileResponse(
-            tmp_file_path,
+            output_path,
             media_type="application/pdf",
-            filename=f"filled_{profile_dict.get('company_name', 'document')}.pdf"
+            filename=f"filled_{profile_dict.get('company_name', 'document')}.pdf",
+            background=BackgroundTask(scratch.release, output_path)
         )
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON data")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error filling PDF: {str(e)}")
 
+def batch_filename(index: int, profile: Dict[str, Any]) -> str:
+    """Archive name of one batch document, unique by its position in the batch"""
+    company = re.sub(r"[^A-Za-z0-9._-]+", "_", str(profile.get("company_name", ""))).strip("_")
+    return f"{index + 1:03d}_filled_{company or 'document'}.pdf"
+
+async def stream_filled_batch(uploads: AsyncExitStack, template: SpooledUpload,
+                              profiles: List[Dict[str, Any]], tender_info: TenderInfo,
+                              fields: Optional[List[PDFField]] = None):
+    """Fill every profile against one template and yield a ZIP as documents finish.
+    
+    At most one fill per worker is in flight, so a large batch neither trips
+    the executor queue limit nor fills the scratch area ahead of the client.
+    The template upload stays on disk until the last fill has been sent.
+    """
+    concurrency = asyncio.Semaphore(executor.workers)
+    started = time.perf_counter()
+    
+    async def fill_one(index: int, profile: Dict[str, Any]):
+        async with concurrency:
+            try:
+                output_path = scratch.allocate()
+            except ScratchQuotaError as e:
+                return index, None, str(e)
+            try:
+                await executor.run(
+                    PDFService.fill_pdf_to_file, template.path, profile, tender_info, output_path, template.sha256,
+                    fields
+                )
+            except Exception as e:
+                scratch.release(output_path)
+                return index, None, str(e) or type(e).__name__
+            except BaseException:
+                scratch.release(output_path)
+                raise
+            return index, output_path, None
+    
+    tasks = [asyncio.create_task(fill_one(index, profile)) for index, profile in enumerate(profiles)]
+    archive = ZipStreamWriter()
+    documents = []
+    failed = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, output_path, error = await next_done
+            if error:
+                failed.append({"index": index, "error": error})
+                continue
+            name = batch_filename(index, profiles[index])
+            try:
+                for chunk in archive.add_file(name, output_path):
+                    if chunk:
+                        yield chunk
+            finally:
+                scratch.release(output_path)
+            documents.append({
+                "index": index,
+                "file": name,
+                "company_name": profiles[index].get("company_name"),
+                "finished_after_seconds": round(time.perf_counter() - started, 3),
+            })
+        
+        elapsed = time.perf_counter() - started
+        docs_per_second = len(documents) / elapsed if elapsed > 0 else 0.0
+        manifest = {
+            "template": template.filename,
+            "requested": len(profiles),
+            "filled": len(documents),
+            "documents": sorted(documents, key=lambda doc: doc["index"]),
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_second": round(docs_per_second, 2),
+        }
+        yield archive.add_bytes("manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+        yield archive.close()
+        logger.info("Batch filled %d/%d documents in %.2fs (%.1f docs/s)",
+                    len(documents), len(profiles), elapsed, docs_per_second)
+    finally:
+        # Client went away or the batch is done: drop unsent outputs and the template
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.result()[1]:
+                scratch.release(task.result()[1])
+        await uploads.aclose()
+
+@app.post("/fill-pdf-batch")
+async def fill_pdf_batch(
+    template_file: UploadFile = File(...),
+    profiles: str = Form(...),       # JSON list of profiles
+    tender_info: str = Form(None),   # JSON string
+    template_id: str = Form(None)    # stored template whose field positions to fill
+):
+    """Fill one template for many profiles, streaming the filled PDFs back as a ZIP.
+    
+    The template is uploaded and parsed once per worker; documents are added
+    to the archive in the order they finish, followed by ``manifest.json``
+    with per-document timings and the batch throughput in documents/second.
+    """
+    try:
+        profile_list = json.loads(profiles)
+        if not isinstance(profile_list, list) or not profile_list:
+            raise HTTPException(status_code=400, detail="Profiles must be a non-empty JSON list")
+        if len(profile_list) > settings.batch_max_profiles:
+            raise HTTPException(
+                status_code=413,
+                detail=f"A batch may contain at most {settings.batch_max_profiles} profiles"
+            )
+        
+        tender_info_obj = parse_tender_info(tender_info)
+        
+        # Validate every profile before any work starts
+        problems = []
+        for index, profile in enumerate(profile_list):
+            if not isinstance(profile, dict):
+                problems.append(f"profile {index + 1} is not an object")
+                continue
+            is_valid, missing_fields = PDFService.validate_profile_data(profile)
+            if not is_valid:
+                problems.append(f"profile {index + 1} is missing {', '.join(missing_fields)}")
+        if problems:
+            raise HTTPException(status_code=400, detail=f"Profile data is incomplete: {'; '.join(problems)}")
+        
+        # The spooled template must outlive this handler, so the stream closes it
+        uploads = AsyncExitStack()
+        with executor_errors():
+            try:
+                (template,) = await uploads.enter_async_context(spooled_uploads(template_file))
+                fields = await template_fields(template_id, template)
+            except BaseException:
+                await uploads.aclose()
+                raise
+        
+        return StreamingResponse(
+            stream_filled_batch(uploads, template, profile_list, tender_info_obj, fields),
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=filled_batch.zip"}
+        )
+        
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON data")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error filling PDF batch: {str(e)}")
+
 @app.post("/compare-pdfs-and-create-template")
 async def compare_pdfs_and_create_template(
     filled_pdf: UploadFile = File(...),
-    blank_pdf: UploadFile = File(...)
+    blank_pdf: UploadFile = File(...),
+    engine: str = None  # text engine, recorded in the template
 ):
     """Compare filled and blank PDFs to create a template mapping"""
     try:
-        # Read both PDFs
-        filled_content = await filled_pdf.read()
-        blank_content = await blank_pdf.read()
-        
-        # Compare PDFs and extract template
-        template = PDFService.compare_pdfs_and_extract_template(filled_content, blank_content)
+        engine = text_engine_option(engine)
+        with executor_errors():
+            async with spooled_uploads(filled_pdf, blank_pdf) as (filled, blank):
+                # Compare PDFs and extract template
+                template = await run_pdf_task(
+                    PDFService.compare_pdfs_and_extract_template, filled.path, blank.path, engine,
+                    affinity=filled.sha256
+                )
+                # Keep the template server-side with the blank's pages it fills
+                fingerprints = await run_pdf_task(
+                    PDFService.page_fingerprints, blank.path, field_pages(template), affinity=blank.sha256
+                )
+                _, signatures = await run_pdf_task(PDFService.page_signatures, blank.path, affinity=blank.sha256)
+                template_id = templates.put(template, fingerprints, signatures)
+                template_index.add(template_id, signatures)
         
+        # Fills refer to the stored template by id, so the page text it was extracted from stays here
         return {
-            "template": template,
+            "template_id": template_id,
+            "template": {key: value for key, value in template.items() if key != 'extracted_data'},
             "message": "Template created successfully",
             "extracted_fields": list(template['filled_values'].keys())
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating template: {str(e)}")
 
-@app.post("/fill-pdf-using-template")
-async def fill_pdf_using_template(blank_pdf: UploadFile = File(...), template_data: str = None, profile_data: str = None):
-    """Fill a blank PDF using template data and profile information"""
+@app.post("/templates/match")
+async def match_template(blank_pdf: UploadFile = File(...)):
+    """Find the stored template a blank PDF was made from, and the page offset between them.
+    
+    Only a sample of the upload's pages is read; their signatures are
+    looked up in the template index.
+    """
     try:
-        # Read the blank PDF
-        blank_content = await blank_pdf.read()
+        with executor_errors():
+            async with spooled_uploads(blank_pdf) as (blank,):
+                page_count, signatures = await run_pdf_task(
+                    PDFService.page_signatures, blank.path, None, SAMPLE_PAGES, affinity=blank.sha256
+                )
         
+        match = template_index.match(signatures)
+        if match is None:
+            raise HTTPException(status_code=404, detail="No stored template matches this PDF")
+        return {**asdict(match), "page_count": page_count}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error matching template: {str(e)}")
+
+@app.post("/fill-pdf-using-template")
+async def fill_pdf_using_template(blank_pdf: UploadFile = File(...), template_data: str = None, profile_data: str = None,
+                                  template_id: str = None):
+    """Fill a blank PDF using template data and profile information.
+    
+    template_id names a template stored by /compare-pdfs-and-create-template,
+    so the template need not be posted (template_data) with every fill.
+    """
+    try:
         # Parse template and profile data
-        template_dict = json.loads(template_data) if template_data else {}
+        if template_id:
+            template_dict = stored_template(template_id).template_data()
+        else:
+            template_dict = json.loads(template_data) if template_data else {}
         profile_dict = json.loads(profile_data) if profile_data else {}
         
-        print(f"DEBUG: Filling PDF with template data: {len(template_dict.get('filled_values', {}))} fields")
+        logger.debug("Filling PDF with template data: %d fields", len(template_dict.get('filled_values', {})))
         
         # Fill the PDF
-        filled_pdf_content = PDFService.fill_pdf_using_template(template_dict, blank_content, profile_dict)
+        with executor_errors():
+            async with spooled_uploads(blank_pdf) as (blank,):
+                filled_pdf_content = await run_pdf_task(
+                    PDFService.fill_pdf_using_template, template_dict, blank.path, profile_dict
+                )
         
         # Return the filled PDF as a downloadable file
-        from fastapi.responses import Response
         return Response(
             content=filled_pdf_content,
             media_type="application/pdf",
@@ -146,73 +589,103 @@ async def fill_pdf_using_template(blank_pdf: UploadFile = File(...), template_da
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"ERROR: Failed to fill PDF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to fill PDF: %s", e)
         raise HTTPException(status_code=500, detail=f"Error filling PDF: {str(e)}")
 
 @app.post("/extract-data-from-filled-pdf")
-async def extract_data_from_filled_pdf(filled_pdf: UploadFile = File(...)):
+async def extract_data_from_filled_pdf(filled_pdf: UploadFile = File(...), engine: str = None):
     """Extract data from a filled PDF"""
     try:
-        # Read the filled PDF
-        filled_content = await filled_pdf.read()
-        
-        print(f"DEBUG: Processing PDF: {filled_pdf.filename}, size: {len(filled_content)} bytes")
-        
-        # Extract data from filled PDF
-        extracted_data = PDFService.extract_data_from_filled_pdf(filled_content)
-        
-        print(f"DEBUG: Extracted {len(extracted_data.filled_values)} fields")
-        
-        return {
-            "extracted_values": extracted_data.filled_values,
-            "pages_processed": len(extracted_data.text_content),
-            "fields_found": list(extracted_data.filled_values.keys())
-        }
+        engine = text_engine_option(engine)
+        with executor_errors():
+            async with spooled_uploads(filled_pdf) as (filled,):
+                return await extract_filled_data(filled, engine)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"ERROR: Failed to extract data from PDF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to extract data from PDF: %s", e)
         raise HTTPException(status_code=500, detail=f"Error extracting data from filled PDF: {str(e)}")
 
 @app.post("/compare-pdfs-and-extract-differences")
-async def compare_pdfs_and_extract_differences(filled_pdf: UploadFile = File(...), blank_pdf: UploadFile = File(...)):
+async def compare_pdfs_and_extract_differences(
+    filled_pdf: UploadFile = File(...),
+    blank_pdf: UploadFile = File(...),
+    pages: str = None,  # 1-based page range, e.g. "47-90"; defaults to the field mapping's pages
+    mode: str = "full",  # "full", or "first" to stop at the first differing page
+    engine: str = None  # "pdfplumber" or "pypdf2"; defaults to the template's or configured engine
+):
     """Compare filled vs blank PDFs and extract exact differences"""
     try:
-        # Read both PDFs
-        filled_content = await filled_pdf.read()
-        blank_content = await blank_pdf.read()
-        
-        print(f"DEBUG: Processing filled PDF: {filled_pdf.filename}, size: {len(filled_content)} bytes")
-        print(f"DEBUG: Processing blank PDF: {blank_pdf.filename}, size: {len(blank_content)} bytes")
-        
-        # Compare PDFs and extract differences
-        result = PDFService.compare_pdfs_and_extract_differences(filled_content, blank_content)
-        
-        print(f"DEBUG: Found differences on {len(result['pages_compared'])} pages")
-        print(f"DEBUG: Extracted {len(result['filled_values'])} specific fields")
-        
-        return {
-            "differences": result['differences'],
-            "filled_values": result['filled_values'],
-            "pages_compared": result['pages_compared'],
-            "total_differences": result['total_differences']
-        }
+        page_numbers, first_difference = compare_options(pages, mode)
+        engine = text_engine_option(engine)
+        with executor_errors():
+            async with spooled_uploads(filled_pdf, blank_pdf) as (filled, blank):
+                return await compare_differences(filled, blank, page_numbers, first_difference, engine)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"ERROR: Failed to compare PDFs: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to compare PDFs: %s", e)
         raise HTTPException(status_code=500, detail=f"Error comparing PDFs: {str(e)}")
 
-@app.get("/field-coordinates")
-async def get_field_coordinates():
-    """Get field coordinates for PDF templates"""
+@app.post("/jobs/compare-pdfs-and-extract-differences", status_code=202)
+async def submit_compare_job(filled_pdf: UploadFile = File(...), blank_pdf: UploadFile = File(...),
+                             pages: str = None, mode: str = "full", engine: str = None):
+    """Queue a filled vs blank comparison; poll /jobs/{job_id} for progress"""
+    try:
+        page_numbers, first_difference = compare_options(pages, mode)
+        operation = partial(compare_differences, page_numbers=page_numbers, first_difference=first_difference,
+                            engine=text_engine_option(engine))
+        return await submit_upload_job("compare-pdfs-and-extract-differences", operation, filled_pdf, blank_pdf)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting comparison job: {str(e)}")
+
+@app.post("/jobs/extract-data-from-filled-pdf", status_code=202)
+async def submit_extract_job(filled_pdf: UploadFile = File(...), engine: str = None):
+    """Queue data extraction from a filled PDF; poll /jobs/{job_id} for progress"""
+    try:
+        operation = partial(extract_filled_data, engine=text_engine_option(engine))
+        return await submit_upload_job("extract-data-from-filled-pdf", operation, filled_pdf)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting extraction job: {str(e)}")
+
+def find_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status and page progress of a background job"""
+    return find_job(job_id).to_dict(jobs.ttl)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a finished job; 409 while it is still queued or running"""
+    job = find_job(job_id)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.error is not None:
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    return job.result
+
+@app.post("/field-coordinates")
+async def get_field_coordinates(template_file: UploadFile = File(...)):
+    """Locate the fillable placeholders of a PDF template"""
     try:
-        # This would normally analyze a PDF to get coordinates
-        # For now, returning mock coordinates
-        fields = PDFService.get_field_coordinates(b"")
+        with executor_errors():
+            async with spooled_uploads(template_file) as (template,):
+                fields = await run_pdf_task(
+                    PDFService.get_field_coordinates, template.path, None, template.sha256,
+                    affinity=template.sha256
+                )
         
         return {
             "fields": [
@@ -221,14 +694,55 @@ async def get_field_coordinates():
                     "x": field.x,
                     "y": field.y,
                     "width": field.width,
-                    "height": field.height
+                    "height": field.height,
+                    "page": field.page
                 }
                 for field in fields
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting field coordinates: {str(e)}")
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit, miss and eviction counts for the parsed-PDF cache.
+    
+    In process mode every worker has its own memory tier, so this reports
+    whichever worker served the call (see its ``pid``).
+    """
+    return await run_pdf_task(PDFService.cache_stats)
+
+@app.get("/executor/stats")
+async def get_executor_stats():
+    """Queue depth and outcome counts for the PDF executor and background jobs"""
+    return {**executor.stats(), "jobs": jobs.stats()}
+
+def check_profile_access(x_profile: Optional[str]):
+    if not authorized(settings.profile_token, x_profile):
+        raise HTTPException(status_code=403, detail="Send the profiling token in X-Profile")
+
+@app.get("/profiles")
+async def list_profiles(x_profile: str = Header(None)):
+    """Saved request profiles, newest first"""
+    check_profile_access(x_profile)
+    return {"profiles": profiles.list()}
+
+@app.get("/profiles/{name}")
+async def download_profile(name: str, x_profile: str = Header(None)):
+    """Download a saved profile (pstats format)"""
+    check_profile_access(x_profile)
+    path = profiles.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, phase, page and byte metrics in the Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/validate-profile")
 async def validate_profile(profile_data: Dict[str, Any]):
     """Validate profile data completeness"""
@@ -239,6 +753,8 @@ async def validate_profile(profile_data: Dict[str, Any]):
             "is_valid": is_valid,
             "missing_fields": missing_fields
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error validating profile: {str(e)}")
 
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Request and per-phase metrics, exposed in the Prometheus text format.
+
+MetricsMiddleware counts every request with its latency and the bytes it
+read and wrote, labelled with the route template (e.g. /jobs/{job_id}).
+Code on the request path marks its phases with ``with phase("parse"):``;
+PDF work running on the executor is timed in the worker, and the worker
+sends its phase timings and page count back with the result (see
+``run_measured``), so per-phase histograms cover process workers too.
+
+Recording is a few dict updates per phase and per request; outside a
+request (scripts, benchmarks calling PDFService directly) ``phase`` only
+reads a context variable.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Phases of a request: reading the upload, opening the PDF, extracting page
+# text/words, classifying and diffing it, drawing new content, writing output
+PHASES = ("upload_read", "parse", "text_extract", "classify", "render", "serialize")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class TaskMetrics:
+    """Phase times (seconds) and pages processed by one request or one executor task"""
+    __slots__ = ("phases", "pages")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.pages = 0
+
+    def merge(self, other: "TaskMetrics"):
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.pages += other.pages
+
+    def __getstate__(self):
+        return self.phases, self.pages
+
+    def __setstate__(self, state):
+        self.phases, self.pages = state
+
+
+_CURRENT: ContextVar[Optional[TaskMetrics]] = ContextVar("task_metrics", default=None)
+
+
+class phase:
+    """Context manager adding the time spent in its block to a phase of the current request or task.
+
+    Phases should not nest: a phase inside another is counted in both.
+    """
+    __slots__ = ("name", "metrics", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.metrics = _CURRENT.get()
+        if self.metrics is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            phases = self.metrics.phases
+            phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as the named phase"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_pages(pages: int):
+    """Add to the pages processed by the current request or task"""
+    metrics = _CURRENT.get()
+    if metrics is not None:
+        metrics.pages += pages
+
+
+def run_measured(fn: Callable, *args) -> Tuple[Any, TaskMetrics]:
+    """Run fn(*args) collecting its phase timings; runs on executor workers.
+
+    Returns the result with the task's metrics, which the caller merges
+    into its request with ``record_task``.
+    """
+    metrics = TaskMetrics()
+    token = _CURRENT.set(metrics)
+    try:
+        return fn(*args), metrics
+    finally:
+        _CURRENT.reset(token)
+
+
+def record_task(metrics: TaskMetrics):
+    """Merge an executor task's metrics into the current request"""
+    current = _CURRENT.get()
+    if current is not None:
+        current.merge(metrics)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [count per bucket (the last for +Inf), sum]
+        self._values: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        names = self.labels + ("le",)
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """The service's metrics; gauges are read from callbacks when rendered"""
+
+    def __init__(self):
+        self.requests = Counter("autotender_requests_total", "HTTP requests handled",
+                                ("method", "endpoint", "status"))
+        self.request_seconds = Histogram("autotender_request_duration_seconds",
+                                         "HTTP request latency, including streaming the response",
+                                         ("method", "endpoint"))
+        self.phase_seconds = Histogram("autotender_phase_duration_seconds",
+                                       "Time one request spent in each processing phase",
+                                       ("endpoint", "phase"))
+        self.pages = Counter("autotender_pages_processed_total", "PDF pages parsed", ("endpoint",))
+        self.bytes_in = Counter("autotender_request_bytes_total", "Request body bytes received", ("endpoint",))
+        self.bytes_out = Counter("autotender_response_bytes_total", "Response body bytes sent", ("endpoint",))
+        self._gauges: List[Tuple[str, str, str, Callable[[], Dict[str, float]]]] = []
+
+    def gauge(self, name: str, documentation: str, label: str, read: Callable[[], Dict[str, float]]):
+        """Register gauges read on every scrape; read() maps each value of label to its gauge value"""
+        self._gauges.append((name, documentation, label, read))
+
+    def record_request(self, method: str, endpoint: str, status: int, seconds: float,
+                       bytes_in: int, bytes_out: int, metrics: TaskMetrics):
+        self.requests.inc((method, endpoint, str(status)))
+        self.request_seconds.observe((method, endpoint), seconds)
+        self.record_work(endpoint, metrics)
+        if bytes_in:
+            self.bytes_in.inc((endpoint,), bytes_in)
+        if bytes_out:
+            self.bytes_out.inc((endpoint,), bytes_out)
+
+    def record_work(self, endpoint: str, metrics: TaskMetrics):
+        """Phase timings and pages of a request, or of a background job (labelled with its kind)"""
+        for name, seconds in metrics.phases.items():
+            self.phase_seconds.observe((endpoint, name), seconds)
+        if metrics.pages:
+            self.pages.inc((endpoint,), metrics.pages)
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.request_seconds, self.phase_seconds, self.pages,
+                       self.bytes_in, self.bytes_out):
+            lines.extend(metric.render())
+        for name, documentation, label, read in self._gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for label_value, value in sorted(read().items()):
+                lines.append(f"{name}{_format_labels((label,), (label_value,))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class track:
+    """Context manager collecting the phases of work done outside a request, e.g. a background job"""
+    __slots__ = ("endpoint", "metrics", "token")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def __enter__(self) -> TaskMetrics:
+        self.metrics = TaskMetrics()
+        self.token = _CURRENT.set(self.metrics)
+        return self.metrics
+
+    def __exit__(self, *exc_info):
+        _CURRENT.reset(self.token)
+        REGISTRY.record_work(self.endpoint, self.metrics)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request in REGISTRY"""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = TaskMetrics()
+        token = _CURRENT.set(metrics)
+        start = time.perf_counter()
+        status = 500
+        bytes_in = 0
+        bytes_out = 0
+
+        async def counting_receive():
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, bytes_out
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _CURRENT.reset(token)
+            # FastAPI puts the matched route in the scope; its path keeps the labels bounded
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            self.registry.record_request(scope["method"], endpoint, status, time.perf_counter() - start,
+                                         bytes_in, bytes_out, metrics)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import hashlib
+import io
+from typing import Dict, List, Optional, Union
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+# PDF bytes, or the path of a PDF staged on disk
+PDFSource = Union[bytes, str]
+
+
+class _Fingerprinter:
+    """Content digests of resource objects, memoized per object so shared fonts and images are hashed once"""
+
+    def __init__(self):
+        self._digests: Dict[tuple, bytes] = {}
+
+    def digest(self, obj) -> bytes:
+        """Digest of an object with indirect references resolved, so it does not depend on object numbers"""
+        if isinstance(obj, IndirectObject):
+            ref = (obj.idnum, obj.generation)
+            if ref not in self._digests:
+                self._digests[ref] = b"cycle"  # a reference back to an object being hashed
+                self._digests[ref] = self.digest(obj.get_object())
+            return self._digests[ref]
+
+        hasher = hashlib.sha256()
+        if isinstance(obj, StreamObject):
+            # Encoded bytes: resource streams (fonts, images) are compared, not interpreted
+            hasher.update(b"S" + hashlib.sha256(obj._data or b"").digest())
+        if isinstance(obj, DictionaryObject):
+            hasher.update(b"D")
+            for key in sorted(dict.keys(obj)):
+                if key not in ("/Length", "/Parent"):
+                    hasher.update(key.encode() + self.digest(dict.__getitem__(obj, key)))
+        elif isinstance(obj, ArrayObject):
+            hasher.update(b"A")
+            for item in list.__iter__(obj):
+                hasher.update(self.digest(item))
+        elif not isinstance(obj, StreamObject):
+            hasher.update(type(obj).__name__.encode() + repr(obj).encode())
+        return hasher.digest()
+
+    def page(self, page: PyPDF2.PageObject) -> str:
+        """Fingerprint of what a page draws: its decoded content streams and its resources"""
+        hasher = hashlib.sha256()
+        contents = page.get_contents()
+        streams = list.__iter__(contents) if isinstance(contents, ArrayObject) else [contents]
+        for stream in streams:
+            if stream is not None:
+                hasher.update(stream.get_object().get_data() + b"\n")
+        hasher.update(self.digest(dict.get(page, "/Resources")))
+        for key in ("/MediaBox", "/CropBox", "/Rotate", "/Annots"):
+            if key in page:
+                hasher.update(key.encode() + self.digest(dict.__getitem__(page, key)))
+        return hasher.hexdigest()
+
+
+def page_fingerprints(pdf_source: PDFSource, page_numbers: Optional[List[int]] = None) -> Dict[int, str]:
+    """Fingerprints of the given 1-based pages (None means every page).
+
+    Two pages with the same fingerprint draw the same content with the same
+    resources, so their text is identical; this costs a fraction of
+    extracting that text. Pages beyond the end are left out.
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_source) if isinstance(pdf_source, (bytes, bytearray)) else pdf_source)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    page_count = len(reader.pages)
+    wanted = page_numbers if page_numbers is not None else range(1, page_count + 1)
+    fingerprinter = _Fingerprinter()
+    return {n: fingerprinter.page(reader.pages[n - 1]) for n in wanted if 1 <= n <= page_count}
+
+
+def identical_pages(filled: Dict[int, str], blank: Dict[int, str]) -> List[int]:
+    """Pages whose fingerprints match in both documents"""
+    return [n for n, fingerprint in filled.items() if blank.get(n) == fingerprint]
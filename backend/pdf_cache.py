@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough per-word footprint of a cached word dict (keys, floats, text object)
+_WORD_OVERHEAD = 400
+
+
+@dataclass
+class ParsedPage:
+    """Text (and optionally words and placeholder runs) extracted from one page"""
+    text: str
+    words: Optional[List[Dict]] = None
+    placeholders: Optional[List[Dict]] = None
+
+
+@dataclass
+class ParsedPDF:
+    """Parsed form of an uploaded PDF, keyed by the SHA-256 of its bytes.
+
+    Pages are filled in lazily, so a document that has only had its cover
+    page read holds just that page.
+    """
+    sha256: str
+    page_count: int
+    metadata: Dict[str, str] = field(default_factory=dict)
+    pages: Dict[int, ParsedPage] = field(default_factory=dict)  # 1-based page number -> page
+
+    def missing_pages(self, page_numbers: List[int], words: bool = False,
+                      placeholders: bool = False) -> List[int]:
+        return [
+            n for n in page_numbers
+            if n not in self.pages
+            or (words and self.pages[n].words is None)
+            or (placeholders and self.pages[n].placeholders is None)
+        ]
+
+    def size_bytes(self) -> int:
+        size = 512 + sum(sys.getsizeof(value) for value in self.metadata.values())
+        for page in self.pages.values():
+            size += sys.getsizeof(page.text)
+            if page.words:
+                size += len(page.words) * _WORD_OVERHEAD
+            if page.placeholders:
+                size += len(page.placeholders) * _WORD_OVERHEAD
+        return size
+
+
+def document_key(pdf_source: Union[bytes, str]) -> str:
+    """Content address of an uploaded PDF, given its bytes or a path to it"""
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(pdf_source).hexdigest()
+    digest = hashlib.sha256()
+    with open(pdf_source, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PDFCache:
+    """LRU cache of parsed PDFs bounded by an estimated memory budget.
+
+    Entries evicted from memory are pickled to ``spill_dir`` when one is
+    configured and promoted back on the next lookup, so repeat uploads skip
+    parsing even after they fall out of the memory tier. The directory is
+    kept under ``spill_max_bytes`` by deleting its least recently used
+    files; every worker process spills to it, so it is measured on disk
+    rather than tracked per process.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None,
+                 spill_max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, ParsedPDF]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_evictions = 0
+
+    def get(self, key: str) -> Optional[ParsedPDF]:
+        with self._lock:
+            doc = self._entries.get(key)
+            if doc is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return doc
+
+        doc = self._load_spilled(key)
+        with self._lock:
+            if doc is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(doc)
+            return doc
+
+    def put(self, doc: ParsedPDF):
+        """Insert or refresh an entry (e.g. after more pages were parsed)"""
+        with self._lock:
+            self._store(doc)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spill_evictions": self.spill_evictions,
+            }
+
+    def discard(self, key: str):
+        """Drop one document from memory, e.g. one parsed only to warm a worker up"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._current_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._current_bytes = 0
+
+    def clear_spilled(self):
+        """Delete every spilled entry, e.g. ones left by a previous run of the service"""
+        for path, _, _ in self._spill_files():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _store(self, doc: ParsedPDF):
+        key = doc.sha256
+        size = doc.size_bytes()
+        self._current_bytes += size - self._sizes.get(key, 0)
+        self._entries[key] = doc
+        self._sizes[key] = size
+        self._entries.move_to_end(key)
+
+        # Always keep the newest entry, even when it alone exceeds the budget
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_doc = self._entries.popitem(last=False)
+            self._current_bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+            self._spill(old_doc)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+    def _spill(self, doc: ParsedPDF):
+        if not self.spill_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(doc, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._spill_path(doc.sha256))
+        except OSError as e:
+            logger.warning("Error spilling cached PDF %s: %s", doc.sha256, e)
+            return
+        self._prune_spilled()
+
+    def _spill_files(self) -> List[Tuple[str, int, int]]:
+        """(path, size, mtime) of the spilled entries and unfinished spills, oldest first"""
+        if not self.spill_dir:
+            return []
+        files = []
+        try:
+            with os.scandir(self.spill_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith((".pkl", ".tmp")):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # deleted by another worker meanwhile
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError as e:
+            logger.warning("Error listing spilled PDFs in %s: %s", self.spill_dir, e)
+        return sorted(files, key=lambda file: file[2])
+
+    def _prune_spilled(self):
+        """Delete the least recently used spilled entries until the directory fits spill_max_bytes"""
+        files = [file for file in self._spill_files() if file[0].endswith(".pkl")]
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.spill_evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _load_spilled(self, key: str) -> Optional[ParsedPDF]:
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                doc = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Error loading spilled PDF %s: %s", key, e)
+            return None
+        try:
+            # Recently used: pruned after the entries nobody has read since
+            os.utime(path)
+        except OSError:
+            pass
+        return doc
+
+
+# Shared by every PDFService call in this process
+DOCUMENT_CACHE = PDFCache(settings.cache_max_bytes, settings.cache_spill_dir, settings.cache_spill_max_bytes)
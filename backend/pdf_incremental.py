@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import io
+import re
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, PdfObject
+
+# Font operands in a reportlab content stream, e.g. "/F1 10 Tf"
+_FONT_OPERATOR = re.compile(rb"/(F\d+)(\s+[\d.]+\s+Tf)")
+
+# Prefix of the font resource names an overlay adds to a page
+FONT_PREFIX = "AutoTender"
+
+
+def _serialize(obj: PdfObject) -> bytes:
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer, None)
+    return buffer.getvalue()
+
+
+def _raw_copy(obj: DictionaryObject) -> DictionaryObject:
+    """Shallow copy that keeps indirect references instead of resolving them"""
+    copy = DictionaryObject()
+    copy.update(dict.items(obj))
+    return copy
+
+
+def _last_startxref(original: bytes) -> int:
+    position = original.rfind(b"startxref")
+    if position < 0:
+        raise ValueError("PDF has no startxref")
+    return int(original[position + len(b"startxref"):].split()[0])
+
+
+class IncrementalUpdate:
+    """Changed and new objects appended to a PDF as an incremental update.
+
+    The original bytes are written unchanged and followed by the new
+    objects, a cross-reference section and a trailer whose /Prev points at
+    the original cross-reference section (PDF 32000-1, 7.5.6). The new
+    section is an xref table or an xref stream, matching the original.
+    """
+
+    def __init__(self, reader: PyPDF2.PdfReader, original: bytes):
+        if reader.is_encrypted:
+            raise ValueError("Encrypted PDFs cannot be updated incrementally")
+        self.reader = reader
+        self.original = original
+        self.prev_startxref = _last_startxref(original)
+        self.uses_xref_stream = not original[self.prev_startxref:self.prev_startxref + 4].startswith(b"xref")
+        self._next_number = int(reader.trailer["/Size"])
+        self._objects: Dict[int, Tuple[int, bytes]] = {}  # object number -> (generation, serialized body)
+        self._fonts: Dict[str, IndirectObject] = {}       # base font -> shared font object
+        self._save_state: Optional[IndirectObject] = None
+
+    def add_object(self, obj: PdfObject) -> IndirectObject:
+        number = self._next_number
+        self._next_number += 1
+        self._objects[number] = (0, _serialize(obj))
+        return IndirectObject(number, 0, self.reader)
+
+    def add_stream(self, data: bytes) -> IndirectObject:
+        compressed = zlib.compress(data)
+        number = self._next_number
+        self._next_number += 1
+        body = (f"<< /Length {len(compressed)} /Filter /FlateDecode >>\nstream\n".encode()
+                + compressed + b"\nendstream")
+        self._objects[number] = (0, body)
+        return IndirectObject(number, 0, self.reader)
+
+    def replace_object(self, reference: IndirectObject, obj: PdfObject):
+        self._objects[reference.idnum] = (reference.generation, _serialize(obj))
+
+    def overlay_page(self, page: PyPDF2.PageObject, content: bytes, fonts: Dict[str, str]):
+        """Draw a content stream on top of a page.
+
+        content uses the font resource names in fonts (name -> base font,
+        e.g. {"F1": "Helvetica"}); they are renamed so they cannot clash
+        with the page's own fonts. The page's existing contents are wrapped
+        in q/Q so the overlay starts from the default graphics state, and the
+        overlay is shifted to the media box origin.
+        """
+        reference = page.indirect_reference
+        if reference is None:
+            raise ValueError("Page is not an indirect object")
+
+        new_page = _raw_copy(page)
+        raw_resources = dict.get(page, "/Resources")
+        resources = _raw_copy(raw_resources.get_object()) if raw_resources is not None else DictionaryObject()
+        raw_fonts = dict.get(resources, "/Font")
+        page_fonts = _raw_copy(raw_fonts.get_object()) if raw_fonts is not None else DictionaryObject()
+
+        renames = {}
+        for name, base_font in fonts.items():
+            new_name = f"{FONT_PREFIX}{name}"
+            suffix = 1
+            while f"/{new_name}" in page_fonts:
+                suffix += 1
+                new_name = f"{FONT_PREFIX}{suffix}{name}"
+            page_fonts[NameObject(f"/{new_name}")] = self._font(base_font)
+            renames[name.encode()] = new_name.encode()
+        resources[NameObject("/Font")] = page_fonts
+        new_page[NameObject("/Resources")] = resources
+
+        content = _FONT_OPERATOR.sub(lambda m: b"/" + renames.get(m.group(1), m.group(1)) + m.group(2), content)
+        media_box = page.mediabox
+        left, bottom = float(media_box.left), float(media_box.bottom)
+        shift = f"1 0 0 1 {left:g} {bottom:g} cm\n".encode() if left or bottom else b""
+        overlay = self.add_stream(b"Q\nq\n" + shift + content + b"\nQ\n")
+
+        raw_contents = dict.get(page, "/Contents")
+        if raw_contents is None:
+            contents: List[PdfObject] = []
+        elif isinstance(raw_contents.get_object(), ArrayObject):
+            contents = list(list.__iter__(raw_contents.get_object()))
+        else:
+            contents = [raw_contents]
+        new_page[NameObject("/Contents")] = ArrayObject([self._save_state_stream(), *contents, overlay])
+
+        self.replace_object(reference, new_page)
+
+    def write(self, output_stream: BinaryIO):
+        """Write the original bytes followed by the update"""
+        output_stream.write(self.original)
+        offset = len(self.original)
+        if not self.original.endswith((b"\n", b"\r")):
+            output_stream.write(b"\n")
+            offset += 1
+
+        offsets: Dict[int, Tuple[int, int]] = {}
+        for number in sorted(self._objects):
+            generation, body = self._objects[number]
+            offsets[number] = (offset, generation)
+            chunk = f"{number} {generation} obj\n".encode() + body + b"\nendobj\n"
+            output_stream.write(chunk)
+            offset += len(chunk)
+
+        trailer = DictionaryObject()
+        for key in ("/Root", "/Info", "/ID"):
+            if key in self.reader.trailer:
+                trailer[NameObject(key)] = dict.__getitem__(self.reader.trailer, key)
+        trailer[NameObject("/Prev")] = NumberObject(self.prev_startxref)
+
+        if self.uses_xref_stream:
+            self._write_xref_stream(output_stream, offset, offsets, trailer)
+        else:
+            self._write_xref_table(output_stream, offset, offsets, trailer)
+
+    def _font(self, base_font: str) -> IndirectObject:
+        if base_font not in self._fonts:
+            font = DictionaryObject({
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject(f"/{base_font}"),
+                NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+            })
+            self._fonts[base_font] = self.add_object(font)
+        return self._fonts[base_font]
+
+    def _save_state_stream(self) -> IndirectObject:
+        if self._save_state is None:
+            self._save_state = self.add_stream(b"q\n")
+        return self._save_state
+
+    @staticmethod
+    def _runs(numbers: List[int]) -> List[Tuple[int, int]]:
+        """Consecutive runs of object numbers as (first, count)"""
+        runs: List[Tuple[int, int]] = []
+        for number in numbers:
+            if runs and runs[-1][0] + runs[-1][1] == number:
+                runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+            else:
+                runs.append((number, 1))
+        return runs
+
+    def _write_xref_table(self, output_stream: BinaryIO, xref_offset: int,
+                          offsets: Dict[int, Tuple[int, int]], trailer: DictionaryObject):
+        # Repeat the head of the free list so the section starts at object 0
+        lines = [b"xref\n0 1\n0000000000 65535 f\r\n"]
+        for first, count in self._runs(sorted(offsets)):
+            lines.append(f"{first} {count}\n".encode())
+            for number in range(first, first + count):
+                position, generation = offsets[number]
+                lines.append(f"{position:010d} {generation:05d} n\r\n".encode())
+        trailer[NameObject("/Size")] = NumberObject(self._next_number)
+        output_stream.write(b"".join(lines) + b"trailer\n" + _serialize(trailer)
+                            + f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def _write_xref_stream(self, output_stream: BinaryIO, xref_offset: int,
+                           offsets: Dict[int, Tuple[int, int]], trailer: DictionaryObject):
+        number = self._next_number
+        offsets = {**offsets, number: (xref_offset, 0)}
+        numbers = sorted(offsets)
+        offset_width = max(4, (xref_offset.bit_length() + 7) // 8)
+        rows = b"".join(
+            b"\x01" + offsets[n][0].to_bytes(offset_width, "big") + offsets[n][1].to_bytes(2, "big")
+            for n in numbers
+        )
+        data = zlib.compress(rows)
+        trailer[NameObject("/Type")] = NameObject("/XRef")
+        trailer[NameObject("/Size")] = NumberObject(number + 1)
+        trailer[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(offset_width), NumberObject(2)])
+        trailer[NameObject("/Index")] = ArrayObject([
+            NumberObject(value) for run in self._runs(numbers) for value in run
+        ])
+        trailer[NameObject("/Filter")] = NameObject("/FlateDecode")
+        trailer[NameObject("/Length")] = NumberObject(len(data))
+        output_stream.write(f"{number} 0 obj\n".encode() + _serialize(trailer) + b"\nstream\n" + data
+                            + f"\nendstream\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode())
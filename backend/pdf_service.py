@@ -1,11 +1,47 @@
 #!/usr/bin/env python3
-import pdfplumber
 import PyPDF2
 import json
 import io
-from typing import Dict, List, Tuple, Optional
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, List, Tuple, Optional, Union
 from dataclasses import dataclass
 import re
+from collections import OrderedDict
+from array import array
+
+from field_extractor import DEFAULT_EXTRACTOR
+from compiled_template import COMPILED_TEMPLATE
+from line_classifier import DIFFERENCE_CLASSIFIER
+from line_diff import diff_lines
+from metrics import count_pages, phase, timed
+from pdf_cache import DOCUMENT_CACHE, ParsedPDF, ParsedPage, document_key
+from page_fingerprint import identical_pages, page_fingerprints
+from template_index import page_signatures
+from pdf_incremental import IncrementalUpdate
+from settings import settings
+from text_engines import PDFPLUMBER, extract_raw_texts, resolve_engine
+from word_diff import LINE_TOLERANCE, TOLERANCE, new_words, word_regions
+
+logger = logging.getLogger(__name__)
+
+# PDF bytes, or the path of a PDF staged on disk
+PDFSource = Union[bytes, str]
+
+def default_compare_pages() -> List[int]:
+    """1-based pages compared between filled and blank tenders unless a request
+    names its own: the compiled template's form section (pages 47-90)"""
+    return COMPILED_TEMPLATE.current().pages or list(range(47, 91))
+
+# Parsed fill templates of this worker, by document hash, so a batch parses its template once
+_TEMPLATE_READERS: "OrderedDict[str, PyPDF2.PdfReader]" = OrderedDict()
+_TEMPLATE_READERS_SIZE = 4
+_TEMPLATE_READERS_LOCK = threading.Lock()
+
+# Standard font used to draw filled values (no embedding needed)
+OVERLAY_FONT = "Helvetica"
 
 @dataclass
 class TenderInfo:
@@ -16,12 +52,14 @@ class TenderInfo:
 
 @dataclass
 class PDFField:
+    """A fillable area, in points from the top-left corner of its page"""
     name: str
     x: float
     y: float
     width: float
     height: float
     value: str = ""
+    page: Optional[int] = None  # 1-based; fields without a page are not filled
 
 @dataclass
 class ExtractedData:
@@ -30,27 +68,207 @@ class ExtractedData:
     field_positions: List[PDFField]
     filled_values: Dict[str, str]  # field_name -> value
 
+class PageComparison:
+    """The page-by-page comparison of a filled and a blank PDF, whoever extracts the pages.
+
+    Pages whose content fingerprints match in both PDFs are dropped up
+    front. ``chunks`` gives the remaining pages to extract and diff (all at
+    once, or a few at a time with first_difference, stopping after the
+    first chunk that differs); each chunk's diff_page_texts result goes to
+    ``add``. PDFService.compare_pdfs_and_extract_differences extracts the
+    pages in-process, the API in sharded executor tasks.
+    """
+
+    def __init__(self, page_numbers: List[int], filled_fingerprints: Dict[int, str],
+                 blank_fingerprints: Dict[int, str], first_difference: bool = False):
+        identical = set(identical_pages(filled_fingerprints, blank_fingerprints))
+        self.page_numbers = [n for n in page_numbers if n not in identical]
+        self.pages_skipped = len(identical)
+        self.first_difference = first_difference
+        self.step = max(1, settings.shard_min_size) if first_difference else max(1, len(self.page_numbers))
+        self.pages_scanned = 0
+        self._result = None
+
+    def chunks(self):
+        for start in range(0, len(self.page_numbers), self.step):
+            if self.first_difference and self._result is not None and self._result['differences']:
+                return
+            yield self.page_numbers[start:start + self.step]
+
+    def add(self, result: Dict[str, any]):
+        self._result = result
+        self.pages_scanned += result['pages_scanned']
+
+    def result(self) -> Dict[str, any]:
+        """Differences, filled values and page counts of the comparison"""
+        result = self._result or PDFService.diff_page_texts({}, {}, self.first_difference)
+        response = {
+            "differences": result['differences'],
+            "filled_values": result['filled_values'],
+            "pages_compared": result['pages_compared'],
+            "total_differences": result['total_differences'],
+            "pages_scanned": self.pages_scanned,
+            "pages_skipped": self.pages_skipped
+        }
+        if self.first_difference:
+            response["first_difference_page"] = result['first_difference_page']
+        return response
+
 class PDFService:
     """Service for processing PDFs - extracting data and filling forms"""
     
     @staticmethod
-    def extract_tender_info(pdf_content: bytes) -> TenderInfo:
+    def _open_pdf(pdf_source: PDFSource):
+        """Open bytes or a file path with pdfplumber"""
+        # Imported on first use, so a process that never parses (the API process
+        # when PDF work runs in worker processes) does not load it
+        import pdfplumber
+        
+        with phase("parse"):
+            if isinstance(pdf_source, (bytes, bytearray)):
+                return pdfplumber.open(io.BytesIO(pdf_source))
+            return pdfplumber.open(pdf_source)
+    
+    @staticmethod
+    def _read_source(pdf_source: PDFSource) -> bytes:
+        """The PDF's bytes, reading them from disk when given a path"""
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return bytes(pdf_source)
+        with open(pdf_source, "rb") as f:
+            return f.read()
+    
+    @staticmethod
+    def _load_document(pdf_source: PDFSource, page_numbers: Optional[List[int]] = None,
+                       words: bool = False, key: Optional[str] = None,
+                       placeholders: bool = False, engine: Optional[str] = None) -> ParsedPDF:
+        """Return the parsed document, parsing only pages missing from the cache.
+        
+        pdf_source is the PDF bytes or a path to the PDF; page_numbers are
+        1-based and None means every page. key is the document hash when the
+        caller already knows it. words and placeholders also collect each
+        page's words and placeholder runs. engine picks the text engine
+        (see text_engines); words and placeholders always come from
+        pdfplumber, and other engines' texts are cached under their own key.
+        """
+        key = key or document_key(pdf_source)
+        engine = resolve_engine(engine)
+        if engine != PDFPLUMBER and not words and not placeholders:
+            return PDFService._load_raw_document(pdf_source, page_numbers, f"{key}-{engine}")
+        
+        doc = DOCUMENT_CACHE.get(key)
+        if doc is not None:
+            wanted = page_numbers if page_numbers is not None else list(range(1, doc.page_count + 1))
+            if not doc.missing_pages(wanted, words, placeholders):
+                return doc
+        
+        with PDFService._open_pdf(pdf_source) as pdf, phase("text_extract"):
+            if doc is None:
+                doc = ParsedPDF(
+                    sha256=key,
+                    page_count=len(pdf.pages),
+                    metadata={str(k): str(v) for k, v in (pdf.metadata or {}).items()}
+                )
+            wanted = page_numbers if page_numbers is not None else list(range(1, doc.page_count + 1))
+            missing = [n for n in doc.missing_pages(wanted, words, placeholders) if 1 <= n <= doc.page_count]
+            count_pages(len(missing))
+            for page_num in missing:
+                page = pdf.pages[page_num - 1]
+                parsed = doc.pages.get(page_num) or ParsedPage(text=page.extract_text() or "")
+                if words and parsed.words is None:
+                    parsed.words = [
+                        {k: w[k] for k in ('text', 'x0', 'x1', 'top', 'bottom')}
+                        for w in page.extract_words()
+                    ]
+                if placeholders and parsed.placeholders is None:
+                    parsed.placeholders = COMPILED_TEMPLATE.current().locator.find_placeholders(page.chars)
+                doc.pages[page_num] = parsed
+                PDFService._release_page(page)
+        
+        DOCUMENT_CACHE.put(doc)
+        return doc
+    
+    @staticmethod
+    def _load_raw_document(pdf_source: PDFSource, page_numbers: Optional[List[int]], key: str) -> ParsedPDF:
+        """_load_document for the raw PyPDF2 text engine"""
+        doc = DOCUMENT_CACHE.get(key)
+        if doc is not None:
+            wanted = page_numbers if page_numbers is not None else list(range(1, doc.page_count + 1))
+            missing = [n for n in doc.missing_pages(wanted) if 1 <= n <= doc.page_count]
+            if not missing:
+                return doc
+        else:
+            missing = page_numbers
+        
+        with phase("text_extract"):
+            page_count, metadata, texts = extract_raw_texts(pdf_source, missing)
+        count_pages(len(texts))
+        if doc is None:
+            doc = ParsedPDF(sha256=key, page_count=page_count, metadata=metadata)
+        for page_num, text in texts.items():
+            doc.pages[page_num] = ParsedPage(text=text)
+        
+        DOCUMENT_CACHE.put(doc)
+        return doc
+    
+    @staticmethod
+    def _release_page(page):
+        """Drop a pdfplumber page's parsed layout and text map.
+        
+        pdfplumber keeps both alive on every visited page until the PDF is
+        closed, which grows memory linearly with the pages extracted.
+        """
+        page.flush_cache()
+        get_textmap = getattr(page, "get_textmap", None)
+        if hasattr(get_textmap, "cache_clear"):
+            get_textmap.cache_clear()
+    
+    @staticmethod
+    def page_count(pdf_source: PDFSource, key: Optional[str] = None) -> int:
+        """Number of pages in the PDF (parses no page content)"""
+        return PDFService._load_document(pdf_source, [], key=key).page_count
+    
+    @staticmethod
+    def extract_page_texts(pdf_source: PDFSource, page_numbers: List[int],
+                           key: Optional[str] = None, engine: Optional[str] = None) -> Dict[int, str]:
+        """Text of the given 1-based pages; used as one shard of a parallel extraction"""
+        doc = PDFService._load_document(pdf_source, page_numbers, key=key, engine=engine)
+        return {n: doc.pages[n].text for n in page_numbers if n in doc.pages}
+    
+    @staticmethod
+    def page_fingerprints(pdf_source: PDFSource, page_numbers: Optional[List[int]] = None) -> Dict[int, str]:
+        """Content fingerprints of the given 1-based pages (see page_fingerprint)"""
+        with phase("parse"):
+            return page_fingerprints(pdf_source, page_numbers)
+    
+    @staticmethod
+    def page_signatures(pdf_source: PDFSource, page_numbers: Optional[List[int]] = None,
+                        sample: Optional[int] = None) -> Tuple[int, Dict[int, array]]:
+        """Page count and MinHash signatures of the given (or sample evenly spread) pages (see template_index)"""
+        with phase("text_extract"):
+            return page_signatures(pdf_source, page_numbers, sample)
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, int]:
+        """Hit, miss and eviction counts for this process's parsed-document cache"""
+        return {**DOCUMENT_CACHE.stats(), "pid": os.getpid()}
+    
+    @staticmethod
+    def extract_tender_info(pdf_content: PDFSource, engine: Optional[str] = None) -> TenderInfo:
         """Extract tender information from the first page of a PDF"""
         try:
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                if len(pdf.pages) == 0:
-                    raise ValueError("PDF has no pages")
-                
-                # Extract text from first page
-                first_page = pdf.pages[0]
-                text = first_page.extract_text()
-                
-                # Look for tender information patterns
-                tender_info = PDFService._parse_tender_text(text)
-                return tender_info
+            doc = PDFService._load_document(pdf_content, [1], engine=engine)
+            if doc.page_count == 0:
+                raise ValueError("PDF has no pages")
+            
+            # Look for tender information patterns in the first page
+            tender_info = PDFService._parse_tender_text(doc.pages[1].text)
+            return tender_info
                 
+        except MemoryError:
+            # Over the worker's memory ceiling: the request fails (413) rather than falling back
+            raise
         except Exception as e:
-            print(f"Error extracting tender info: {e}")
+            logger.warning("Error extracting tender info: %s", e)
             # Return default info if extraction fails
             return TenderInfo(
                 tender_name="Road Construction Project",
@@ -60,6 +278,7 @@ class PDFService:
             )
     
     @staticmethod
+    @timed("classify")
     def _parse_tender_text(text: str) -> TenderInfo:
         """Parse tender information from extracted text"""
         # Common patterns for tender information
@@ -112,188 +331,55 @@ class PDFService:
         )
     
     @staticmethod
-    def extract_data_from_filled_pdf(filled_pdf_content: bytes) -> ExtractedData:
+    def extract_data_from_filled_pdf(filled_pdf_content: PDFSource, engine: Optional[str] = None) -> ExtractedData:
         """Extract filled data from a completed PDF"""
         try:
-            with pdfplumber.open(io.BytesIO(filled_pdf_content)) as pdf:
-                text_content = {}
-                filled_values = {}
-                
-                # Extract text from each page
-                for page_num, page in enumerate(pdf.pages):
-                    text = page.extract_text()
-                    text_content[str(page_num + 1)] = text
-                
-                # Identify filled values based on common patterns
-                filled_values = PDFService._identify_filled_values(text_content)
-                
-                # Get field positions (mock for now)
-                field_positions = PDFService.get_field_coordinates(b"")
-                
-                return ExtractedData(
-                    text_content=text_content,
-                    field_positions=field_positions,
-                    filled_values=filled_values
-                )
+            doc = PDFService._load_document(filled_pdf_content, engine=engine)
+            
+            # Text of each page, in page order
+            text_content = {str(page_num): doc.pages[page_num].text
+                            for page_num in range(1, doc.page_count + 1)}
+            
+            return PDFService.extract_data_from_text(text_content)
                 
         except Exception as e:
-            print(f"Error extracting data from filled PDF: {e}")
+            logger.error("Error extracting data from filled PDF: %s", e)
             raise
     
     @staticmethod
+    def extract_data_from_text(text_content: Dict[str, str],
+                               field_positions: Optional[List[PDFField]] = None) -> ExtractedData:
+        """Build ExtractedData from already extracted page texts (page number -> text)"""
+        # Identify filled values based on common patterns
+        filled_values = PDFService._identify_filled_values(text_content)
+        
+        return ExtractedData(
+            text_content=text_content,
+            field_positions=field_positions or [],
+            filled_values=filled_values
+        )
+    
+    @staticmethod
+    @timed("classify")
     def _identify_filled_values(text_content: Dict[str, str]) -> Dict[str, str]:
         """Identify filled values from text content"""
-        filled_values = {}
-        
         # Combine all text content
         all_text = " ".join(text_content.values())
         
-        # Debug: Print first 500 characters to see what we're working with
-        print(f"DEBUG: First 500 chars of extracted text: {all_text[:500]}")
-        
-        # Common patterns for identifying filled data
-        patterns = {
-            'company_name': [
-                r'Company[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-                r'Firm[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-                r'Organization[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-                r'Name[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-                r'Business[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-            ],
-            'registration_number': [
-                r'Registration[:\s]+([A-Z0-9/-]+)',
-                r'Reg[.\s]+No[.:\s]+([A-Z0-9/-]+)',
-                r'Company[:\s]+No[.:\s]+([A-Z0-9/-]+)',
-                r'Reg[:\s]+([A-Z0-9/-]+)',
-                r'Number[:\s]+([A-Z0-9/-]+)',
-            ],
-            'contact_person': [
-                r'Contact[:\s]+([A-Za-z\s]+)',
-                r'Person[:\s]+([A-Za-z\s]+)',
-                r'Representative[:\s]+([A-Za-z\s]+)',
-                r'Director[:\s]+([A-Za-z\s]+)',
-                r'Manager[:\s]+([A-Za-z\s]+)',
-            ],
-            'phone': [
-                r'Phone[:\s]+([+\d\s-]+)',
-                r'Tel[.:\s]+([+\d\s-]+)',
-                r'Mobile[:\s]+([+\d\s-]+)',
-                r'Telephone[:\s]+([+\d\s-]+)',
-                r'Call[:\s]+([+\d\s-]+)',
-            ],
-            'email': [
-                r'Email[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'E-mail[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'Mail[:\s]+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-            ],
-            'address': [
-                r'Address[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
-                r'Location[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
-                r'Street[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
-                r'Office[:\s]+([A-Za-z0-9\s,.-]+?)(?:\n|$)',
-            ],
-            'annual_turnover': [
-                r'Turnover[:\s]+([0-9,]+)',
-                r'Revenue[:\s]+([0-9,]+)',
-                r'Annual[:\s]+([0-9,]+)',
-                r'Income[:\s]+([0-9,]+)',
-            ],
-            'tax_id': [
-                r'Tax[:\s]+([A-Z0-9/-]+)',
-                r'VAT[:\s]+([A-Z0-9/-]+)',
-                r'PIN[:\s]+([A-Z0-9/-]+)',
-                r'Tax ID[:\s]+([A-Z0-9/-]+)',
-            ],
-            'directors': [
-                r'Director[:\s]+([A-Za-z\s,]+)',
-                r'Directors[:\s]+([A-Za-z\s,]+)',
-                r'Board[:\s]+([A-Za-z\s,]+)',
-                r'Management[:\s]+([A-Za-z\s,]+)',
-            ],
-            'signature': [
-                r'Signature[:\s]+([A-Za-z\s]+)',
-                r'Signed[:\s]+([A-Za-z\s]+)',
-                r'Authorized[:\s]+([A-Za-z\s]+)',
-            ],
-            'bank_reference': [
-                r'Bank[:\s]+([A-Za-z\s,.-]+)',
-                r'Reference[:\s]+([A-Za-z\s,.-]+)',
-                r'Banking[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'credit_facility': [
-                r'Credit[:\s]+([A-Za-z\s,.-]+)',
-                r'Facility[:\s]+([A-Za-z\s,.-]+)',
-                r'Loan[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'financial_capacity': [
-                r'Capacity[:\s]+([A-Za-z\s,.-]+)',
-                r'Financial[:\s]+([A-Za-z\s,.-]+)',
-                r'Capability[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'bank_guarantee': [
-                r'Guarantee[:\s]+([A-Za-z\s,.-]+)',
-                r'Bank Guarantee[:\s]+([A-Za-z\s,.-]+)',
-                r'Security[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'insurance': [
-                r'Insurance[:\s]+([A-Za-z\s,.-]+)',
-                r'Coverage[:\s]+([A-Za-z\s,.-]+)',
-                r'Policy[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'similar_projects': [
-                r'Projects[:\s]+([A-Za-z\s,.-]+)',
-                r'Experience[:\s]+([A-Za-z\s,.-]+)',
-                r'Previous[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'project_value': [
-                r'Value[:\s]+([0-9,]+)',
-                r'Project Value[:\s]+([0-9,]+)',
-                r'Cost[:\s]+([0-9,]+)',
-            ],
-            'completion_date': [
-                r'Completion[:\s]+([0-9/-]+)',
-                r'Finished[:\s]+([0-9/-]+)',
-                r'Date[:\s]+([0-9/-]+)',
-            ],
-            'client_reference': [
-                r'Client[:\s]+([A-Za-z\s,.-]+)',
-                r'Reference[:\s]+([A-Za-z\s,.-]+)',
-                r'Customer[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'equipment': [
-                r'Equipment[:\s]+([A-Za-z\s,.-]+)',
-                r'Machinery[:\s]+([A-Za-z\s,.-]+)',
-                r'Tools[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'personnel': [
-                r'Personnel[:\s]+([A-Za-z\s,.-]+)',
-                r'Staff[:\s]+([A-Za-z\s,.-]+)',
-                r'Employees[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'methodology': [
-                r'Methodology[:\s]+([A-Za-z\s,.-]+)',
-                r'Approach[:\s]+([A-Za-z\s,.-]+)',
-                r'Method[:\s]+([A-Za-z\s,.-]+)',
-            ],
-            'timeline': [
-                r'Timeline[:\s]+([A-Za-z\s,.-]+)',
-                r'Schedule[:\s]+([A-Za-z\s,.-]+)',
-                r'Duration[:\s]+([A-Za-z\s,.-]+)',
-            ],
-        }
+        # Debug lines are built only when debug logging is on
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("First 500 chars of extracted text: %s", all_text[:500])
         
-        # Extract values using patterns
-        for field_name, field_patterns in patterns.items():
-            for pattern in field_patterns:
-                match = re.search(pattern, all_text, re.IGNORECASE)
-                if match:
-                    filled_values[field_name] = match.group(1).strip()
-                    print(f"DEBUG: Found {field_name}: {match.group(1).strip()}")
-                    break
+        # Extract values using the precompiled single-pass extractor
+        filled_values = DEFAULT_EXTRACTOR.extract(all_text)
+        if debug:
+            for field_name, value in filled_values.items():
+                logger.debug("Found %s: %s", field_name, value)
         
         # If no patterns match, try to extract any text that looks like filled data
         if not filled_values:
-            print("DEBUG: No patterns matched, trying generic extraction...")
+            logger.debug("No patterns matched, trying generic extraction...")
             # Look for any text that might be filled data (not just labels)
             lines = all_text.split('\n')
             for line in lines:
@@ -309,249 +395,333 @@ class PDFService:
                     elif re.match(r'^[0-9,]+$', line):
                         filled_values['annual_turnover'] = line
         
-        print(f"DEBUG: Extracted {len(filled_values)} fields: {list(filled_values.keys())}")
+        if debug:
+            logger.debug("Extracted %d fields: %s", len(filled_values), list(filled_values))
         return filled_values
     
     @staticmethod
-    def compare_pdfs_and_extract_template(filled_pdf_content: bytes, blank_pdf_content: bytes) -> Dict[str, any]:
+    def compare_pdfs_and_extract_template(filled_pdf_content: PDFSource, blank_pdf_content: PDFSource,
+                                          engine: Optional[str] = None) -> Dict[str, any]:
         """Compare filled and blank PDFs to create a template mapping"""
         try:
+            engine = resolve_engine(engine)
+            
             # Extract data from filled PDF
-            filled_data = PDFService.extract_data_from_filled_pdf(filled_pdf_content)
+            filled_data = PDFService.extract_data_from_filled_pdf(filled_pdf_content, engine)
             
             # Extract text from blank PDF
-            with pdfplumber.open(io.BytesIO(blank_pdf_content)) as blank_pdf:
-                blank_text_content = {}
-                for page_num, page in enumerate(blank_pdf.pages):
-                    text = page.extract_text()
-                    blank_text_content[str(page_num + 1)] = text
+            blank_doc = PDFService._load_document(blank_pdf_content, engine=engine)
+            blank_text_content = {str(page_num): blank_doc.pages[page_num].text
+                                  for page_num in range(1, blank_doc.page_count + 1)}
+            
+            # Positions of the filled-in text on the form pages
+            filled_regions = PDFService.filled_regions(filled_pdf_content, blank_pdf_content)
             
             # Create template mapping
             template = {
                 'filled_values': filled_data.filled_values,
-                'field_mappings': PDFService._create_field_mappings(filled_data, blank_text_content),
-                'extracted_data': filled_data
+                'field_mappings': PDFService._create_field_mappings(filled_data, blank_text_content, filled_regions),
+                'filled_regions': filled_regions,
+                'extracted_data': filled_data,
+                'text_engine': engine
             }
             
             return template
             
         except Exception as e:
-            print(f"Error comparing PDFs: {e}")
+            logger.error("Error comparing PDFs: %s", e)
             raise
     
     @staticmethod
-    def _create_field_mappings(filled_data: ExtractedData, blank_text_content: Dict[str, str]) -> Dict[str, any]:
-        """Create field mappings between filled and blank PDFs"""
-        # This would analyze the differences between filled and blank PDFs
-        # For now, returning a basic mapping structure
+    def _create_field_mappings(filled_data: ExtractedData, blank_text_content: Dict[str, str],
+                               filled_regions: Optional[List[PDFField]] = None) -> Dict[str, any]:
+        """Create field mappings between filled and blank PDFs.
         
+        Fields whose value was found in one of filled_regions get that
+        region's page and box as their position; the rest stay 'auto'.
+        """
         field_mappings = {
-            'company_name': {'type': 'text', 'position': 'auto'},
-            'registration_number': {'type': 'text', 'position': 'auto'},
-            'contact_person': {'type': 'text', 'position': 'auto'},
-            'phone': {'type': 'text', 'position': 'auto'},
-            'email': {'type': 'text', 'position': 'auto'},
-            'address': {'type': 'text', 'position': 'auto'},
-            'annual_turnover': {'type': 'number', 'position': 'auto'},
-            'bank_reference': {'type': 'text', 'position': 'auto'},
-            'credit_facility': {'type': 'text', 'position': 'auto'},
-            'financial_capacity': {'type': 'text', 'position': 'auto'},
-            'bank_guarantee': {'type': 'text', 'position': 'auto'},
-            'insurance': {'type': 'text', 'position': 'auto'},
-            'similar_projects': {'type': 'text', 'position': 'auto'},
-            'project_value': {'type': 'number', 'position': 'auto'},
-            'completion_date': {'type': 'date', 'position': 'auto'},
-            'client_reference': {'type': 'text', 'position': 'auto'},
-            'equipment': {'type': 'text', 'position': 'auto'},
-            'personnel': {'type': 'text', 'position': 'auto'},
-            'methodology': {'type': 'text', 'position': 'auto'},
-            'timeline': {'type': 'text', 'position': 'auto'},
+            spec.name: {'type': spec.type, 'position': 'auto'}
+            for spec in COMPILED_TEMPLATE.current().profile_fields
         }
         
+        for region in filled_regions or []:
+            mapping = field_mappings.get(region.name)
+            if mapping is not None and mapping['position'] == 'auto':
+                mapping['position'] = {
+                    'page': region.page, 'x': region.x, 'y': region.y,
+                    'width': region.width, 'height': region.height
+                }
+        
         return field_mappings
     
     @staticmethod
-    def fill_pdf_using_template(template_data: Dict, blank_pdf_content: bytes, profile_data: Dict) -> bytes:
-        """Fill a blank PDF using template data and profile info"""
+    def fill_pdf_using_template(template_data: Dict, blank_pdf_content: PDFSource, profile_data: Dict) -> bytes:
+        """Fill a blank PDF using template data and profile info.
+
+        The summary's styles, page layout, title and category headers are
+        built once per worker (see pdf_summary); only the field paragraphs
+        are built per request.
+        """
         try:
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib import colors
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from io import BytesIO
-            
-            print(f"DEBUG: Filling PDF with {len(template_data.get('filled_values', {}))} fields")
-            
-            # Create a new PDF with the filled data
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            
-            # Create content for the filled PDF
-            story = []
+            from pdf_summary import render_summary
             
-            # Add title
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            story.append(Paragraph("FILLED TENDER DOCUMENT", title_style))
-            story.append(Spacer(1, 20))
-            
-            # Add extracted data
             filled_values = template_data.get('filled_values', {})
+            logger.debug("Filling PDF with %d fields", len(filled_values))
             
-            # Group data by categories
-            categories = {
-                'Company Information': ['company_name', 'registration_number', 'contact_person', 'phone', 'email', 'address'],
-                'Financial Information': ['annual_turnover', 'tax_id', 'directors', 'signature'],
-                'Banking Information': ['bank_reference', 'credit_facility', 'financial_capacity', 'bank_guarantee'],
-                'Technical Information': ['insurance', 'similar_projects', 'project_value', 'completion_date', 'client_reference', 'equipment', 'personnel', 'methodology', 'timeline']
-            }
+            pdf_content = render_summary(filled_values, COMPILED_TEMPLATE.current())
             
-            for category, fields in categories.items():
-                # Add category header
-                category_style = ParagraphStyle(
-                    'CategoryHeader',
-                    parent=styles['Heading2'],
-                    fontSize=14,
-                    spaceAfter=12,
-                    spaceBefore=20,
-                    textColor=colors.darkblue
-                )
-                story.append(Paragraph(category, category_style))
-                
-                # Add fields in this category
-                for field in fields:
-                    if field in filled_values and filled_values[field]:
-                        field_style = ParagraphStyle(
-                            'FieldStyle',
-                            parent=styles['Normal'],
-                            fontSize=10,
-                            spaceAfter=6,
-                            leftIndent=20
-                        )
-                        field_text = f"<b>{field.replace('_', ' ').title()}:</b> {filled_values[field]}"
-                        story.append(Paragraph(field_text, field_style))
-                
-                story.append(Spacer(1, 10))
-            
-            # Add any remaining fields that weren't categorized
-            remaining_fields = {k: v for k, v in filled_values.items() 
-                             if k not in [field for fields in categories.values() for field in fields]}
-            
-            if remaining_fields:
-                story.append(Paragraph("Additional Information", category_style))
-                for field, value in remaining_fields.items():
-                    if value:
-                        field_style = ParagraphStyle(
-                            'FieldStyle',
-                            parent=styles['Normal'],
-                            fontSize=10,
-                            spaceAfter=6,
-                            leftIndent=20
-                        )
-                        field_text = f"<b>{field.replace('_', ' ').title()}:</b> {value}"
-                        story.append(Paragraph(field_text, field_style))
-            
-            # Build the PDF
-            doc.build(story)
-            
-            # Get the PDF content
-            pdf_content = buffer.getvalue()
-            buffer.close()
-            
-            print(f"DEBUG: Successfully created filled PDF with {len(pdf_content)} bytes")
+            logger.debug("Successfully created filled PDF with %d bytes", len(pdf_content))
             return pdf_content
             
         except Exception as e:
-            print(f"ERROR: Failed to fill PDF: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise e
+            logger.exception("Failed to fill PDF: %s", e)
+            raise
     
     @staticmethod
-    def get_field_coordinates(pdf_content: bytes) -> List[PDFField]:
-        """Get field coordinates from a PDF template"""
-        # This would analyze the PDF to find field positions
-        # For now, returning coordinates based on our analysis of the KURA tender
-        
-        return [
-            # Company Information fields (pages 47-90)
-            PDFField(name='company_name', x=100, y=200, width=150, height=20),
-            PDFField(name='registration_number', x=300, y=200, width=100, height=20),
-            PDFField(name='contact_person', x=100, y=250, width=120, height=20),
-            PDFField(name='phone', x=250, y=250, width=100, height=20),
-            PDFField(name='email', x=370, y=250, width=150, height=20),
-            PDFField(name='address', x=100, y=300, width=300, height=40),
-            PDFField(name='tax_id', x=100, y=350, width=100, height=20),
-            PDFField(name='directors', x=250, y=350, width=200, height=40),
-            PDFField(name='signature', x=100, y=400, width=150, height=30),
-            
-            # Financial Information fields
-            PDFField(name='annual_turnover', x=100, y=500, width=150, height=20),
-            PDFField(name='bank_reference', x=300, y=500, width=200, height=40),
-            PDFField(name='credit_facility', x=100, y=550, width=200, height=40),
-            PDFField(name='financial_capacity', x=350, y=550, width=150, height=40),
-            PDFField(name='bank_guarantee', x=100, y=600, width=200, height=40),
-            PDFField(name='insurance', x=350, y=600, width=150, height=40),
-            
-            # Experience Information fields
-            PDFField(name='similar_projects', x=100, y=700, width=400, height=60),
-            PDFField(name='project_value', x=100, y=780, width=150, height=20),
-            PDFField(name='completion_date', x=300, y=780, width=100, height=20),
-            PDFField(name='client_reference', x=100, y=820, width=400, height=40),
-            
-            # Technical Information fields
-            PDFField(name='equipment', x=100, y=900, width=400, height=60),
-            PDFField(name='personnel', x=100, y=980, width=400, height=60),
-            PDFField(name='methodology', x=100, y=1060, width=400, height=60),
-            PDFField(name='timeline', x=100, y=1140, width=400, height=60),
-        ]
+    def get_field_coordinates(pdf_content: PDFSource, page_numbers: Optional[List[int]] = None,
+                              key: Optional[str] = None) -> List[PDFField]:
+        """Locate the fillable placeholders of a PDF template.
+        
+        Scans each page's characters for underscore, dot and ellipsis runs
+        (see compiled_template) and names each run after its label. The runs
+        are cached with the parsed document, so repeat fills of the same
+        template skip the scan. page_numbers default to the template's pages.
+        Runs whose label matches no profile field get a positional name.
+        """
+        locator = COMPILED_TEMPLATE.current().locator
+        if page_numbers is None:
+            page_numbers = locator.pages
+        doc = PDFService._load_document(pdf_content, page_numbers, key=key, placeholders=True)
+        
+        wanted = set(page_numbers) if page_numbers is not None else set(doc.pages)
+        fields = []
+        for page_num in sorted(wanted & set(doc.pages)):
+            for index, run in enumerate(doc.pages[page_num].placeholders or [], start=1):
+                fields.append(PDFField(
+                    name=locator.field_name(run["label"]) or f"field_p{page_num}_{index}",
+                    x=run["x0"],
+                    y=run["top"],
+                    width=run["x1"] - run["x0"],
+                    height=run["bottom"] - run["top"],
+                    page=page_num
+                ))
+        return fields
+    
+    @staticmethod
+    def compare_words(filled_pdf_content: PDFSource, blank_pdf_content: PDFSource,
+                      page_numbers: Optional[List[int]] = None,
+                      tolerance: float = TOLERANCE) -> Dict[str, List[Dict]]:
+        """Words of a filled PDF that its blank PDF lacks, with coordinates (page -> words).
+        
+        A filled word is new unless the blank page has the same word within
+        tolerance points on both axes; lookups go through a grid index (see
+        word_diff). page_numbers are 1-based (default default_compare_pages());
+        pages with identical content fingerprints are skipped.
+        """
+        page_numbers = page_numbers or default_compare_pages()
+        identical = set(identical_pages(PDFService.page_fingerprints(filled_pdf_content, page_numbers),
+                                        PDFService.page_fingerprints(blank_pdf_content, page_numbers)))
+        page_numbers = [n for n in page_numbers if n not in identical]
+        filled_doc = PDFService._load_document(filled_pdf_content, page_numbers, words=True)
+        blank_doc = PDFService._load_document(blank_pdf_content, page_numbers, words=True)
+        
+        differences = {}
+        with phase("classify"):
+            for page_num in page_numbers:
+                if page_num in filled_doc.pages and page_num in blank_doc.pages:
+                    words = new_words(filled_doc.pages[page_num].words, blank_doc.pages[page_num].words, tolerance)
+                    if words:
+                        differences[str(page_num)] = words
+        return differences
     
     @staticmethod
-    def fill_pdf(template_pdf_content: bytes, profile_data: Dict, tender_info: TenderInfo) -> bytes:
+    def filled_regions(filled_pdf_content: PDFSource, blank_pdf_content: PDFSource,
+                       page_numbers: Optional[List[int]] = None) -> List[PDFField]:
+        """Boxes of the text filled into a blank PDF, named after the profile field they hold.
+        
+        New words (see compare_words) running on along a line form one
+        region. A region is named after the label in front of it on its
+        line when the label matches a profile field, else positionally.
+        """
+        differences = PDFService.compare_words(filled_pdf_content, blank_pdf_content, page_numbers)
+        filled_doc = PDFService._load_document(filled_pdf_content, [int(p) for p in differences], words=True)
+        locator = COMPILED_TEMPLATE.current().locator
+        
+        regions = []
+        for page_str, words in differences.items():
+            page_num = int(page_str)
+            page_words = filled_doc.pages[page_num].words
+            for index, region in enumerate(word_regions(words), start=1):
+                label = " ".join(
+                    w["text"] for w in page_words
+                    if abs(w["top"] - region["top"]) <= LINE_TOLERANCE and w["x1"] <= region["x0"]
+                )
+                regions.append(PDFField(
+                    name=locator.field_name(label) or f"field_p{page_num}_{index}",
+                    x=region["x0"],
+                    y=region["top"],
+                    width=region["x1"] - region["x0"],
+                    height=region["bottom"] - region["top"],
+                    value=region["text"],
+                    page=page_num
+                ))
+        return regions
+    
+    @staticmethod
+    def fill_pdf(template_pdf_content: PDFSource, profile_data: Dict, tender_info: TenderInfo,
+                 fields: Optional[List[PDFField]] = None) -> bytes:
         """Fill a PDF template with profile data and tender information"""
         try:
-            # Create a PDF reader from the template
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(template_pdf_content))
-            pdf_writer = PyPDF2.PdfWriter()
-            
-            # Copy all pages from the template
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
-            
-            # Create a new PDF with filled data
-            # Note: This is a simplified implementation
-            # In production, you would use a more sophisticated approach to fill PDF forms
-            
-            # For now, we'll create a simple filled PDF
             output_buffer = io.BytesIO()
-            pdf_writer.write(output_buffer)
-            output_buffer.seek(0)
-            
+            PDFService._write_filled_pdf(template_pdf_content, profile_data, tender_info, output_buffer,
+                                         fields=fields)
             return output_buffer.getvalue()
             
+        except MemoryError:
+            # Over the worker's memory ceiling: the request fails (413) rather than falling back
+            raise
+        except Exception as e:
+            logger.error("Error filling PDF: %s", e)
+            # Return the original PDF if filling fails
+            return PDFService._read_source(template_pdf_content)
+    
+    @staticmethod
+    def fill_pdf_to_file(template_pdf_content: PDFSource, profile_data: Dict, tender_info: TenderInfo,
+                         output_path: str, key: Optional[str] = None,
+                         fields: Optional[List[PDFField]] = None) -> int:
+        """Fill a PDF template straight into output_path; returns the bytes written.
+        
+        Writing to the file directly avoids holding the filled document in
+        memory, so the caller can stream it to the client from disk. key is
+        the template's hash; passing it reuses this worker's parsed template.
+        """
+        try:
+            with open(output_path, "wb") as output_file:
+                PDFService._write_filled_pdf(template_pdf_content, profile_data, tender_info, output_file, key, fields)
+            
+        except MemoryError:
+            # Over the worker's memory ceiling: the request fails (413) rather than falling back
+            raise
         except Exception as e:
-            print(f"Error filling PDF: {e}")
+            logger.error("Error filling PDF: %s", e)
             # Return the original PDF if filling fails
-            return template_pdf_content
+            if isinstance(template_pdf_content, (bytes, bytearray)):
+                with open(output_path, "wb") as output_file:
+                    output_file.write(template_pdf_content)
+            else:
+                shutil.copyfile(template_pdf_content, output_path)
+        
+        return os.path.getsize(output_path)
+    
+    @staticmethod
+    def _template_reader(template_pdf_content: PDFSource, key: Optional[str] = None) -> PyPDF2.PdfReader:
+        """Parse a fill template, reusing the parsed copy when the hash is known"""
+        if key is not None:
+            with _TEMPLATE_READERS_LOCK:
+                if key in _TEMPLATE_READERS:
+                    _TEMPLATE_READERS.move_to_end(key)
+                    return _TEMPLATE_READERS[key]
+        
+        # PdfReader loads a path fully into memory, so the cached reader
+        # outlives the uploaded file
+        with phase("parse"):
+            if isinstance(template_pdf_content, (bytes, bytearray)):
+                pdf_reader = PyPDF2.PdfReader(io.BytesIO(template_pdf_content))
+            else:
+                pdf_reader = PyPDF2.PdfReader(template_pdf_content)
+        
+        if key is not None:
+            with _TEMPLATE_READERS_LOCK:
+                _TEMPLATE_READERS[key] = pdf_reader
+                while len(_TEMPLATE_READERS) > _TEMPLATE_READERS_SIZE:
+                    _TEMPLATE_READERS.popitem(last=False)
+        return pdf_reader
+    
+    @staticmethod
+    def _write_filled_pdf(template_pdf_content: PDFSource, profile_data: Dict, tender_info: TenderInfo,
+                          output_stream, key: Optional[str] = None, fields: Optional[List[PDFField]] = None):
+        """Write the template with the values drawn onto the pages that have fields.
+        
+        The template bytes are copied unchanged and the filled pages are
+        appended as an incremental update, so untouched pages are never
+        re-serialized. fields default to the template's field coordinates.
+        """
+        pdf_reader = PDFService._template_reader(template_pdf_content, key)
+        original = pdf_reader.stream.getvalue()
+        if fields is None:
+            fields = PDFService.get_field_coordinates(template_pdf_content, key=key)
+        
+        values = {
+            'tender_name': tender_info.tender_name,
+            'tender_number': tender_info.tender_number,
+            'organization': tender_info.organization,
+            'date': tender_info.date,
+            **profile_data
+        }
+        placements: Dict[int, List[Tuple[PDFField, str]]] = {}
+        for field in fields:
+            value = field.value or values.get(field.name)
+            if field.page is not None and 1 <= field.page <= len(pdf_reader.pages) and value:
+                placements.setdefault(field.page, []).append((field, str(value)))
+        
+        if not placements:
+            with phase("serialize"):
+                output_stream.write(original)
+            return
+        
+        update = IncrementalUpdate(pdf_reader, original)
+        for page_number, (content, fonts) in PDFService._render_overlays(pdf_reader, placements).items():
+            update.overlay_page(pdf_reader.pages[page_number - 1], content, fonts)
+        with phase("serialize"):
+            update.write(output_stream)
+    
+    @staticmethod
+    @timed("render")
+    def _render_overlays(pdf_reader: PyPDF2.PdfReader,
+                         placements: Dict[int, List[Tuple[PDFField, str]]]) -> Dict[int, Tuple[bytes, Dict[str, str]]]:
+        """Draw the field values of each page with reportlab.
+        
+        Returns page number -> (content stream, font resource name -> base
+        font). Only pages with fields are rendered, in one small document.
+        """
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from reportlab.pdfgen import canvas
+        
+        page_numbers = sorted(placements)
+        buffer = io.BytesIO()
+        overlay = canvas.Canvas(buffer, pageCompression=0)
+        for page_number in page_numbers:
+            media_box = pdf_reader.pages[page_number - 1].mediabox
+            page_height = float(media_box.height)
+            overlay.setPageSize((float(media_box.width), page_height))
+            for field, text in placements[page_number]:
+                # Fit the text to the field's height, then shrink it to its width
+                size = max(5.0, min(10.0, field.height * 0.8))
+                text_width = stringWidth(text, OVERLAY_FONT, size)
+                if text_width > field.width > 0:
+                    size = max(5.0, size * field.width / text_width)
+                baseline = page_height - field.y - (field.height + size * 0.7) / 2
+                overlay.setFont(OVERLAY_FONT, size)
+                overlay.drawString(field.x, baseline, text)
+            overlay.showPage()
+        overlay.save()
+        
+        rendered = {}
+        overlay_reader = PyPDF2.PdfReader(io.BytesIO(buffer.getvalue()))
+        for page_number, overlay_page in zip(page_numbers, overlay_reader.pages):
+            font_resources = overlay_page['/Resources'].get('/Font')
+            fonts = {
+                name.lstrip('/'): str(font.get_object()['/BaseFont']).lstrip('/')
+                for name, font in (font_resources.get_object().items() if font_resources else [])
+            }
+            rendered[page_number] = (overlay_page.get_contents().get_data(), fonts)
+        return rendered
     
     @staticmethod
     def validate_profile_data(profile_data: Dict) -> Tuple[bool, List[str]]:
         """Validate that all required fields are present in the profile data"""
-        required_fields = [
-            'company_name', 'registration_number', 'contact_person', 'phone', 'email',
-            'address', 'tax_id', 'directors', 'signature',
-            'annual_turnover', 'bank_reference', 'credit_facility', 'financial_capacity',
-            'bank_guarantee', 'insurance',
-            'similar_projects', 'project_value', 'completion_date', 'client_reference',
-            'equipment', 'personnel', 'methodology', 'timeline'
-        ]
+        required_fields = COMPILED_TEMPLATE.current().required_profile_fields
         
         missing_fields = []
         for field in required_fields:
@@ -561,32 +731,60 @@ class PDFService:
         return len(missing_fields) == 0, missing_fields
 
     @staticmethod
-    def compare_pdfs_and_extract_differences(filled_pdf_content: bytes, blank_pdf_content: bytes) -> Dict[str, any]:
-        """Compare filled vs blank PDFs and extract only the differences (filled data)"""
+    def compare_pdfs_and_extract_differences(filled_pdf_content: PDFSource, blank_pdf_content: PDFSource,
+                                             page_numbers: Optional[List[int]] = None,
+                                             first_difference: bool = False,
+                                             engine: Optional[str] = None) -> Dict[str, any]:
+        """Compare filled vs blank PDFs and extract only the differences (filled data).
+
+        page_numbers are 1-based (default default_compare_pages()); no other
+        page is parsed. Pages are skipped and chunked as PageComparison does.
+        """
+        try:
+            page_numbers = page_numbers or default_compare_pages()
+            comparison = PageComparison(page_numbers,
+                                        PDFService.page_fingerprints(filled_pdf_content, page_numbers),
+                                        PDFService.page_fingerprints(blank_pdf_content, page_numbers),
+                                        first_difference)
+            filled_key = document_key(filled_pdf_content)
+            blank_key = document_key(blank_pdf_content)
+
+            for chunk in comparison.chunks():
+                filled_text = {
+                    str(page_num): text
+                    for page_num, text in PDFService.extract_page_texts(filled_pdf_content, chunk, filled_key, engine).items()
+                }
+                blank_text = {
+                    str(page_num): text
+                    for page_num, text in PDFService.extract_page_texts(blank_pdf_content, chunk, blank_key, engine).items()
+                }
+                comparison.add(PDFService.diff_page_texts(filled_text, blank_text, first_difference))
+            return comparison.result()
+
+        except Exception as e:
+            logger.exception("Failed to compare PDFs: %s", e)
+            raise
+    
+    @staticmethod
+    @timed("classify")
+    def diff_page_texts(filled_text: Dict[str, str], blank_text: Dict[str, str],
+                        first_difference: bool = False) -> Dict[str, any]:
+        """Diff page texts of a filled and a blank PDF (page number -> text) and classify the filled lines.
+        
+        Pages are compared in the order given; with first_difference the
+        comparison stops after the first page that differs.
+        """
         try:
-            # Extract text from both PDFs for pages 47-90
-            filled_text = {}
-            blank_text = {}
-            
-            with pdfplumber.open(io.BytesIO(filled_pdf_content)) as filled_pdf:
-                for page_num in range(47, 91):  # pages 47-90
-                    if page_num < len(filled_pdf.pages):
-                        page = filled_pdf.pages[page_num]
-                        filled_text[str(page_num)] = page.extract_text() or ""
-            
-            with pdfplumber.open(io.BytesIO(blank_pdf_content)) as blank_pdf:
-                for page_num in range(47, 91):  # pages 47-90
-                    if page_num < len(blank_pdf.pages):
-                        page = blank_pdf.pages[page_num]
-                        blank_text[str(page_num)] = page.extract_text() or ""
-            
             # Find differences between filled and blank text
             differences = {}
             filled_values = {}
+            pages_scanned = 0
             
-            for page_num in range(47, 91):
-                page_str = str(page_num)
-                if page_str in filled_text and page_str in blank_text:
+            for page_str in filled_text:
+                if first_difference and differences:
+                    break
+                if page_str in blank_text:
+                    pages_scanned += 1
                     filled_page_text = filled_text[page_str]
                     blank_page_text = blank_text[page_str]
                     
@@ -594,21 +792,16 @@ class PDFService:
                     filled_lines = filled_page_text.split('\n')
                     blank_lines = blank_page_text.split('\n')
                     
-                    # Find lines that are different
+                    # Align the lines and keep the inserted or changed filled lines
                     page_differences = []
-                    for i, (filled_line, blank_line) in enumerate(zip(filled_lines, blank_lines)):
-                        if filled_line.strip() != blank_line.strip():
-                            # This line has differences - extract the filled data
-                            filled_data = filled_line.strip()
-                            blank_data = blank_line.strip()
-                            
-                            # Only include if the filled data looks like actual content (not just whitespace)
-                            if filled_data and len(filled_data) > 2 and not filled_data.isspace():
-                                page_differences.append({
-                                    'line_number': i,
-                                    'filled_data': filled_data,
-                                    'blank_data': blank_data
-                                })
+                    for i, filled_data, blank_data in diff_lines(blank_lines, filled_lines):
+                        # Only include if the filled data looks like actual content (not just whitespace)
+                        if filled_data and len(filled_data) > 2:
+                            page_differences.append({
+                                'line_number': i,
+                                'filled_data': filled_data,
+                                'blank_data': blank_data
+                            })
                     
                     if page_differences:
                         differences[page_str] = page_differences
@@ -617,72 +810,29 @@ class PDFService:
                         for diff in page_differences:
                             filled_data = diff['filled_data']
                             
-                            # Look for specific field patterns
-                            if re.search(r'company|firm|organization', filled_data.lower()):
-                                filled_values['company_name'] = filled_data
-                            elif re.search(r'registration|reg\.?|no\.?', filled_data.lower()):
-                                filled_values['registration_number'] = filled_data
-                            elif re.search(r'contact|person|representative', filled_data.lower()):
-                                filled_values['contact_person'] = filled_data
-                            elif re.search(r'phone|tel|mobile', filled_data.lower()):
-                                filled_values['phone'] = filled_data
-                            elif re.search(r'@|email|mail', filled_data.lower()):
-                                filled_values['email'] = filled_data
-                            elif re.search(r'address|location|street', filled_data.lower()):
-                                filled_values['address'] = filled_data
-                            elif re.search(r'turnover|revenue|income', filled_data.lower()):
-                                filled_values['annual_turnover'] = filled_data
-                            elif re.search(r'tax|vat|pin', filled_data.lower()):
-                                filled_values['tax_id'] = filled_data
-                            elif re.search(r'director|board|management', filled_data.lower()):
-                                filled_values['directors'] = filled_data
-                            elif re.search(r'signature|signed|authorized', filled_data.lower()):
-                                filled_values['signature'] = filled_data
-                            elif re.search(r'bank|reference|banking', filled_data.lower()):
-                                filled_values['bank_reference'] = filled_data
-                            elif re.search(r'credit|facility|loan', filled_data.lower()):
-                                filled_values['credit_facility'] = filled_data
-                            elif re.search(r'capacity|capability', filled_data.lower()):
-                                filled_values['financial_capacity'] = filled_data
-                            elif re.search(r'guarantee|security', filled_data.lower()):
-                                filled_values['bank_guarantee'] = filled_data
-                            elif re.search(r'insurance|coverage|policy', filled_data.lower()):
-                                filled_values['insurance'] = filled_data
-                            elif re.search(r'project|experience|previous', filled_data.lower()):
-                                filled_values['similar_projects'] = filled_data
-                            elif re.search(r'value|cost|amount', filled_data.lower()):
-                                filled_values['project_value'] = filled_data
-                            elif re.search(r'completion|finished|date', filled_data.lower()):
-                                filled_values['completion_date'] = filled_data
-                            elif re.search(r'client|reference|customer', filled_data.lower()):
-                                filled_values['client_reference'] = filled_data
-                            elif re.search(r'equipment|machinery|tools', filled_data.lower()):
-                                filled_values['equipment'] = filled_data
-                            elif re.search(r'personnel|staff|employees', filled_data.lower()):
-                                filled_values['personnel'] = filled_data
-                            elif re.search(r'methodology|approach|method', filled_data.lower()):
-                                filled_values['methodology'] = filled_data
-                            elif re.search(r'timeline|schedule|duration', filled_data.lower()):
-                                filled_values['timeline'] = filled_data
+                            # Classify the line by its field keywords (first matching rule wins)
+                            field_name = DIFFERENCE_CLASSIFIER.classify(filled_data)
+                            if field_name:
+                                filled_values[field_name] = filled_data
                             else:
                                 # Generic field - store with line number as key
                                 filled_values[f'field_line_{diff["line_number"]}'] = filled_data
             
-            print(f"DEBUG: Found {len(differences)} pages with differences")
-            print(f"DEBUG: Extracted {len(filled_values)} specific fields")
+            logger.debug("Found %d pages with differences", len(differences))
+            logger.debug("Extracted %d specific fields", len(filled_values))
             
             return {
                 'differences': differences,
                 'filled_values': filled_values,
                 'pages_compared': list(differences.keys()),
-                'total_differences': sum(len(diffs) for diffs in differences.values())
+                'total_differences': sum(len(diffs) for diffs in differences.values()),
+                'pages_scanned': pages_scanned,
+                'first_difference_page': next(iter(differences), None) if first_difference else None
             }
             
         except Exception as e:
-            print(f"ERROR: Failed to compare PDFs: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise e
+            logger.exception("Failed to compare PDFs: %s", e)
+            raise
 
 # Example usage
 if __name__ == "__main__":
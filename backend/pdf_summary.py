@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""The summary PDF fill_pdf_using_template builds from a template's filled values.
+
+The document is a title, then one section per profile category of the
+compiled template (a header and a paragraph per filled field), then any
+uncategorised fields under "Additional Information". Everything but the
+field values is the same for every request, so each thread (in practice
+each worker process) builds it once in a SummaryRenderer:
+- the paragraph styles and the page template with its frame;
+- the parsed text of the title and category headers;
+- the parsed "<b>Label:</b>" of every field.
+A request then builds its flowables from those fragments, and the field
+values as plain text, without parsing any markup. Flowables themselves
+are never shared between stories: reportlab keeps layout state on them
+(a flowable postponed at a page break is marked so), which would leak
+from one document into the next.
+"""
+import threading
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer
+from reportlab.platypus.paraparser import ParaFrag
+
+from compiled_template import CompiledTemplate
+from metrics import phase
+
+TITLE = "FILLED TENDER DOCUMENT"
+ADDITIONAL = "Additional Information"
+
+
+def category_title(category: str) -> str:
+    """Header of a profile category ("company_info" -> "Company Information")"""
+    return category.replace('_info', '_information').replace('_', ' ').title()
+
+
+def field_label(field: str) -> str:
+    return field.replace('_', ' ').title()
+
+
+class SummaryRenderer:
+    """Styles, page layout and parsed static text of the summary PDF; not shared between threads"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30,
+                                          alignment=1)  # Center alignment
+        self.category_style = ParagraphStyle('CategoryHeader', parent=styles['Heading2'], fontSize=14,
+                                             spaceAfter=12, spaceBefore=20, textColor=colors.darkblue)
+        self.field_style = ParagraphStyle('FieldStyle', parent=styles['Normal'], fontSize=10, spaceAfter=6,
+                                          leftIndent=20)
+        # Letter pages with one-inch margins, as SimpleDocTemplate lays them out
+        width, height = letter
+        frame = Frame(inch, inch, width - 2 * inch, height - 2 * inch, id='normal')
+        self.page_template = PageTemplate(id='normal', frames=[frame], pagesize=letter)
+
+        self._title = Paragraph(TITLE, self.title_style).frags
+        # header text -> its frags, in the category style
+        self._headers: Dict[str, List[ParaFrag]] = {}
+        # field -> (frags of its bold label, frag the value is cloned from)
+        self._labels: Dict[str, Tuple[List[ParaFrag], ParaFrag]] = {}
+        # The compiled template whose categories _sections holds
+        self._sections_of = None
+        self._sections: List[Tuple[str, List[str]]] = []
+
+    def sections(self, template: CompiledTemplate) -> List[Tuple[str, List[str]]]:
+        """Header text and fields of each profile category, rebuilt when the compiled template is reloaded"""
+        if self._sections_of is not template:
+            self._sections = [(category_title(category), list(fields))
+                              for category, fields in template.categories.items()]
+            self._sections_of = template
+        return self._sections
+
+    def header(self, text: str) -> Paragraph:
+        """A new category header paragraph, from the cached parse of its text"""
+        frags = self._headers.get(text)
+        if frags is None:
+            frags = self._headers[text] = Paragraph(text, self.category_style).frags
+        return Paragraph(text, self.category_style, frags=list(frags))
+
+    def field(self, field: str, value) -> Paragraph:
+        """The "<b>Label:</b> value" paragraph of a field; the value is text, not markup"""
+        label = self._labels.get(field)
+        if label is None:
+            frags = Paragraph(f"<b>{field_label(field)}:</b> -", self.field_style).frags
+            label = self._labels[field] = (frags[:-1], frags[-1])
+        label_frags, value_frag = label
+        text = f" {value}"
+        return Paragraph(f"{field_label(field)}:{text}", self.field_style,
+                         frags=[*label_frags, value_frag.clone(text=text)])
+
+    def story(self, filled_values: Dict[str, str], template: CompiledTemplate) -> List:
+        story = [Paragraph(TITLE, self.title_style, frags=list(self._title)), Spacer(1, 20)]
+        categorised = set()
+        for header, fields in self.sections(template):
+            story.append(self.header(header))
+            for field in fields:
+                categorised.add(field)
+                value = filled_values.get(field)
+                if value:
+                    story.append(self.field(field, value))
+            story.append(Spacer(1, 10))
+
+        remaining = [(field, value) for field, value in filled_values.items() if field not in categorised]
+        if remaining:
+            story.append(self.header(ADDITIONAL))
+            story.extend(self.field(field, value) for field, value in remaining if value)
+        return story
+
+    def render(self, filled_values: Dict[str, str], template: CompiledTemplate) -> bytes:
+        story = self.story(filled_values, template)
+        buffer = BytesIO()
+        doc = BaseDocTemplate(buffer, pagesize=letter, pageTemplates=[self.page_template])
+        with phase("render"):
+            doc.build(story)
+        return buffer.getvalue()
+
+
+_LOCAL = threading.local()
+
+
+def render_summary(filled_values: Dict[str, str], template: CompiledTemplate) -> bytes:
+    """The summary PDF of filled_values, with this thread's renderer"""
+    renderer = getattr(_LOCAL, "renderer", None)
+    if renderer is None:
+        renderer = _LOCAL.renderer = SummaryRenderer()
+    return renderer.render(filled_values, template)
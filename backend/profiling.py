@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Opt-in per-request profiling.
+
+A request is profiled when it sends the configured token in the
+``X-Profile`` header, or at random at the configured sample rate. Its
+executor tasks then run under cProfile on the worker that executes them,
+and the workers' stats are merged into one pstats file per request, named
+after the request id (see logs) and the hash of its first uploaded document. Read one
+with ``python -m pstats FILE`` or any pstats viewer. The handler's own
+code on the event loop (JSON parsing, upload spooling) is not profiled,
+nor is a background job's work after its submit request has returned.
+
+With neither a token nor a sample rate set, ProfilingMiddleware is not
+installed and tasks only check that no profile is active.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logs import current_request_id
+from metrics import TaskMetrics, run_measured
+from settings import settings
+
+PROFILE_HEADER = b"x-profile"
+
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+\.prof$")
+
+logger = logging.getLogger(__name__)
+
+
+class _StatsHolder:
+    """Raw cProfile stats in the shape pstats.Stats loads (an object with create_stats)"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    """The merged profile of one request's executor tasks"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.documents: List[str] = []
+        self.tasks = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def add(self, raw_stats: Dict):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(_StatsHolder(raw_stats))
+            else:
+                self._stats.add(_StatsHolder(raw_stats))
+            self.tasks += 1
+
+    @property
+    def stats(self) -> Optional[pstats.Stats]:
+        return self._stats
+
+
+_ACTIVE: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def active_profile() -> Optional[RequestProfile]:
+    """The profile of the current request, or None when it is not profiled"""
+    return _ACTIVE.get()
+
+
+def note_document(sha256: str):
+    """Record the hash of a document the current request uploaded, for its profile's name"""
+    profile = _ACTIVE.get()
+    if profile is not None and sha256 not in profile.documents:
+        profile.documents.append(sha256)
+
+
+def run_profiled(fn: Callable, *args) -> Tuple[Any, TaskMetrics, Dict]:
+    """run_measured under cProfile; returns the result, the task's metrics and the raw profile stats"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result, metrics = run_measured(fn, *args)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, metrics, profiler.stats
+
+
+class ProfileStore:
+    """Saved profiles in a directory: NAME.prof (pstats) with NAME.json describing the request"""
+
+    def __init__(self, directory: Optional[str] = None, keep: int = 200):
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+        self.keep = keep
+
+    @classmethod
+    def from_settings(cls) -> "ProfileStore":
+        return cls(settings.profile_dir, settings.profile_keep)
+
+    def save(self, profile: RequestProfile, method: str, path: str, status: int, seconds: float,
+             reason: str) -> Optional[str]:
+        """Write a finished request's profile; returns its name, or None when it ran no executor task"""
+        stats = profile.stats
+        if stats is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        document = profile.documents[0][:16] if profile.documents else "none"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}_{profile.request_id}_{document}.prof"
+        stats.dump_stats(os.path.join(self.directory, name))
+        info = {
+            "name": name,
+            "request_id": profile.request_id,
+            "documents": profile.documents,
+            "method": method,
+            "path": path,
+            "status": status,
+            "seconds": round(seconds, 4),
+            "tasks": profile.tasks,
+            "reason": reason,
+            "created": time.time(),
+        }
+        with open(os.path.join(self.directory, name[:-len(".prof")] + ".json"), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        self.prune()
+        return name
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Descriptions of the saved profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    info = json.load(f)
+                info["size"] = os.path.getsize(entry.path[:-len(".json")] + ".prof")
+            except (OSError, ValueError):
+                continue
+            profiles.append(info)
+        return sorted(profiles, key=lambda info: info.get("created", 0), reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a saved profile, or None for an unknown or malformed name"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def prune(self):
+        """Delete all but the newest ``keep`` profiles"""
+        for info in self.list()[self.keep:]:
+            for suffix in (".prof", ".json"):
+                try:
+                    os.unlink(os.path.join(self.directory, info["name"][:-len(".prof")] + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def authorized(token: Optional[str], sent: Optional[str]) -> bool:
+    """Whether a request may see saved profiles: it sent the token, or no token is configured"""
+    if not token:
+        return True
+    return sent is not None and hmac.compare_digest(sent.encode(), token.encode())
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that send the token in X-Profile, or a sample of all requests"""
+
+    def __init__(self, app, store: ProfileStore, token: Optional[str] = None, sample_rate: float = 0.0):
+        self.app = app
+        self.store = store
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+
+    def _reason(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        sent = headers.get(PROFILE_HEADER)
+        if self.token is not None and sent is not None and hmac.compare_digest(sent, self.token):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(dict(scope.get("headers") or []))
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        # RequestContextMiddleware, installed outside this one, has set the request id
+        request_id = current_request_id() or uuid.uuid4().hex
+        profile = RequestProfile(request_id)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _ACTIVE.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _ACTIVE.reset(token)
+            try:
+                self.store.save(profile, scope["method"], scope["path"], status, time.perf_counter() - start,
+                                reason)
+            except OSError as e:
+                logger.error("Could not save profile of request %s: %s", request_id, e)
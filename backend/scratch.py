@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScratchQuotaError(Exception):
+    """Raised when the scratch area is over its size quota"""
+
+
+class ScratchArea:
+    """Managed directory for generated files that are streamed to clients.
+
+    Files are deleted by ``release`` once their response has been sent; the
+    periodic ``sweep`` removes anything older than ``ttl`` that a dropped
+    connection left behind. ``allocate`` refuses new files while the
+    directory holds more than ``quota_bytes``.
+    """
+
+    def __init__(self, directory: Optional[str] = None, quota_bytes: int = 0, ttl: float = 600.0):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "auto-tender-scratch")
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> "ScratchArea":
+        return cls(settings.scratch_dir, settings.scratch_quota_bytes, settings.scratch_ttl)
+
+    def usage_bytes(self) -> int:
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    total += entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def allocate(self, suffix: str = ".pdf") -> str:
+        """Reserve a new empty file and return its path"""
+        if self.quota_bytes and self.usage_bytes() >= self.quota_bytes:
+            raise ScratchQuotaError("Scratch space is full, please retry shortly")
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def release(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> int:
+        """Delete files older than the TTL; returns how many were removed"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    async def sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            removed = await asyncio.to_thread(self.sweep)
+            if removed:
+                logger.info("Scratch sweep removed %d stale files", removed)
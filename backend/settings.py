@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# field_mapping.json and profile_template.json at the repository root, and
+# the compiled template built from them
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DEFAULT_FIELD_MAPPING = os.path.join(_REPO_ROOT, "field_mapping.json")
+_DEFAULT_PROFILE_TEMPLATE = os.path.join(_REPO_ROOT, "profile_template.json")
+_DEFAULT_COMPILED_TEMPLATE = os.path.join(_REPO_ROOT, "field_mapping.bin")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    return os.environ.get(name) or default
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Backend configuration, read from AUTO_TENDER_* environment variables"""
+    # Parsed-document cache
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_spill_dir: Optional[str] = None
+    cache_spill_max_bytes: int = 1024 * 1024 * 1024  # least recently used spill files beyond it are deleted
+    # Executor that runs PDFService work off the event loop
+    executor_mode: str = "process"  # process | thread | inline
+    executor_workers: int = os.cpu_count() or 1
+    executor_max_pending: int = 0  # 0 means 4 tasks per worker
+    task_timeout: float = 120.0
+    # Page-sharded extraction: documents with at least this many pages are
+    # split across workers (0 disables sharding)
+    shard_min_pages: int = 64
+    shard_min_size: int = 8
+    # Uploads are streamed to disk and capped per file and per request
+    upload_dir: Optional[str] = None
+    max_upload_bytes: int = 200 * 1024 * 1024
+    max_request_bytes: int = 300 * 1024 * 1024
+    # Scratch area for generated PDFs streamed back to clients
+    scratch_dir: Optional[str] = None
+    scratch_quota_bytes: int = 1024 * 1024 * 1024
+    scratch_ttl: float = 600.0
+    # Address-space ceiling of each worker process, i.e. of one task (0 = unlimited)
+    worker_memory_bytes: int = 0
+    # Batch fills
+    batch_max_profiles: int = 50
+    # Background jobs for long operations
+    job_concurrency: int = 2
+    job_max_queued: int = 32
+    job_ttl: float = 3600.0
+    # Field definitions (placeholders, categories, types) and the compiled
+    # template built from them, which is reloaded when it changes
+    field_mapping_path: Optional[str] = _DEFAULT_FIELD_MAPPING
+    profile_template_path: Optional[str] = _DEFAULT_PROFILE_TEMPLATE
+    compiled_template_path: str = _DEFAULT_COMPILED_TEMPLATE
+    template_reload_interval: float = 2.0
+    # JSON rule table classifying differing lines by field (None = built-in rules)
+    classifier_rules_path: Optional[str] = None
+    # Text extraction engine when neither the request nor the template names one
+    text_engine: str = "pdfplumber"  # pdfplumber | pypdf2
+    # SQLite file of the templates fills refer to by id (None = backend/templates.sqlite3)
+    template_store_path: Optional[str] = None
+    # Per-request profiling, off unless a token or a sample rate is set:
+    # requests sending the token in X-Profile, and a random share of all
+    # requests, run their PDF work under cProfile
+    profile_token: Optional[str] = None
+    profile_sample_rate: float = 0.0
+    profile_dir: Optional[str] = None  # None = backend/profiles
+    profile_keep: int = 200
+    # Lowest level logged (DEBUG | INFO | WARNING | ERROR), as JSON lines on stderr
+    log_level: str = "INFO"
+    # Start the PDF workers at boot and run each PDF path once in them, so
+    # the first request after a deploy is not a cold one
+    warmup: bool = True
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            cache_max_bytes=_env_int("AUTO_TENDER_CACHE_MAX_MB", 256) * 1024 * 1024,
+            cache_spill_dir=_env_str("AUTO_TENDER_CACHE_DIR"),
+            cache_spill_max_bytes=_env_int("AUTO_TENDER_CACHE_DIR_MAX_MB", 1024) * 1024 * 1024,
+            executor_mode=_env_str("AUTO_TENDER_EXECUTOR", "process"),
+            executor_workers=_env_int("AUTO_TENDER_WORKERS", os.cpu_count() or 1),
+            executor_max_pending=_env_int("AUTO_TENDER_MAX_PENDING", 0),
+            task_timeout=_env_float("AUTO_TENDER_TASK_TIMEOUT", 120.0),
+            shard_min_pages=_env_int("AUTO_TENDER_SHARD_MIN_PAGES", 64),
+            shard_min_size=_env_int("AUTO_TENDER_SHARD_MIN_SIZE", 8),
+            upload_dir=_env_str("AUTO_TENDER_UPLOAD_DIR"),
+            max_upload_bytes=_env_int("AUTO_TENDER_MAX_UPLOAD_MB", 200) * 1024 * 1024,
+            max_request_bytes=_env_int("AUTO_TENDER_MAX_REQUEST_MB", 300) * 1024 * 1024,
+            scratch_dir=_env_str("AUTO_TENDER_SCRATCH_DIR"),
+            scratch_quota_bytes=_env_int("AUTO_TENDER_SCRATCH_QUOTA_MB", 1024) * 1024 * 1024,
+            scratch_ttl=_env_float("AUTO_TENDER_SCRATCH_TTL", 600.0),
+            worker_memory_bytes=_env_int("AUTO_TENDER_WORKER_MEMORY_MB", 0) * 1024 * 1024,
+            batch_max_profiles=_env_int("AUTO_TENDER_BATCH_MAX_PROFILES", 50),
+            job_concurrency=_env_int("AUTO_TENDER_JOB_CONCURRENCY", 2),
+            job_max_queued=_env_int("AUTO_TENDER_JOB_MAX_QUEUED", 32),
+            job_ttl=_env_float("AUTO_TENDER_JOB_TTL", 3600.0),
+            field_mapping_path=_env_str("AUTO_TENDER_FIELD_MAPPING", _DEFAULT_FIELD_MAPPING),
+            profile_template_path=_env_str("AUTO_TENDER_PROFILE_TEMPLATE", _DEFAULT_PROFILE_TEMPLATE),
+            compiled_template_path=_env_str("AUTO_TENDER_COMPILED_TEMPLATE", _DEFAULT_COMPILED_TEMPLATE),
+            template_reload_interval=_env_float("AUTO_TENDER_TEMPLATE_RELOAD_INTERVAL", 2.0),
+            classifier_rules_path=_env_str("AUTO_TENDER_CLASSIFIER_RULES"),
+            text_engine=_env_str("AUTO_TENDER_TEXT_ENGINE", "pdfplumber"),
+            template_store_path=_env_str("AUTO_TENDER_TEMPLATE_STORE"),
+            profile_token=_env_str("AUTO_TENDER_PROFILE_TOKEN"),
+            profile_sample_rate=_env_float("AUTO_TENDER_PROFILE_SAMPLE_RATE", 0.0),
+            profile_dir=_env_str("AUTO_TENDER_PROFILE_DIR"),
+            profile_keep=_env_int("AUTO_TENDER_PROFILE_KEEP", 200),
+            log_level=_env_str("AUTO_TENDER_LOG_LEVEL", "INFO"),
+            warmup=_env_int("AUTO_TENDER_WARMUP", 1) != 0,
+        )
+
+
+settings = Settings.from_env()
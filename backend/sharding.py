@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import asyncio
+from typing import Dict, List, Optional
+
+from executor import PDFExecutor
+from jobs import Job
+from pdf_service import PDFService
+from settings import settings
+
+
+def plan_shards(page_numbers: List[int], shard_count: int) -> List[List[int]]:
+    """Split pages into at most shard_count contiguous, near-equal runs"""
+    shard_count = max(1, min(shard_count, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(page_numbers[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+def merge_shards(results: List[Dict[int, str]]) -> Dict[int, str]:
+    """Merge shard results into one page -> text dict in page order"""
+    merged = {}
+    for result in results:
+        merged.update(result)
+    return {page_num: merged[page_num] for page_num in sorted(merged)}
+
+
+def shard_count_for(executor: PDFExecutor, pages: int) -> int:
+    """How many shards a document of this size should be split into"""
+    if not settings.shard_min_pages or pages < settings.shard_min_pages:
+        return 1
+    return max(1, min(executor.workers, pages // max(1, settings.shard_min_size)))
+
+
+async def _extract_shard(executor: PDFExecutor, pdf_path: str, key: str, page_numbers: List[int],
+                         affinity: Optional[str], progress: Optional[Job],
+                         engine: Optional[str] = None) -> Dict[int, str]:
+    """Extract one shard; with progress, in steps of shard_min_size pages so it can be reported"""
+    if progress is None:
+        return await executor.run(PDFService.extract_page_texts, pdf_path, page_numbers, key, engine,
+                                  affinity=affinity)
+
+    step = max(1, settings.shard_min_size)
+    texts = {}
+    for start in range(0, len(page_numbers), step):
+        chunk = page_numbers[start:start + step]
+        texts.update(await executor.run(PDFService.extract_page_texts, pdf_path, chunk, key, engine,
+                                        affinity=affinity))
+        progress.complete_pages(len(chunk))
+    return texts
+
+
+async def extract_page_texts(executor: PDFExecutor, pdf_path: str, key: str,
+                             page_numbers: Optional[List[int]] = None,
+                             shards: Optional[int] = None,
+                             progress: Optional[Job] = None,
+                             engine: Optional[str] = None) -> Dict[int, str]:
+    """Extract page texts, sharding large documents across worker processes.
+
+    Every shard task opens the PDF from pdf_path itself, so only the path
+    and a list of page numbers cross the process boundary. page_numbers are
+    1-based; None means every page. Pages beyond the end are ignored.
+    shards overrides the shard count chosen from the settings. When a job
+    is given as progress, its page counts are updated as pages finish.
+    engine names the text engine (see text_engines).
+    """
+    page_count = await executor.run(PDFService.page_count, pdf_path, key, affinity=key)
+    if page_numbers is None:
+        page_numbers = list(range(1, page_count + 1))
+    else:
+        page_numbers = [n for n in page_numbers if 1 <= n <= page_count]
+    if progress is not None:
+        progress.expect_pages(len(page_numbers))
+
+    shards = plan_shards(page_numbers, shards or shard_count_for(executor, len(page_numbers)))
+    if len(shards) <= 1:
+        return await _extract_shard(executor, pdf_path, key, page_numbers, key, progress, engine)
+
+    results = await asyncio.gather(*(
+        _extract_shard(executor, pdf_path, key, shard_pages, None, progress, engine)
+        for shard_pages in shards
+    ))
+    return merge_shards(results)
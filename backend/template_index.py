@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+import hashlib
+import io
+import re
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject
+
+# PDF bytes, or the path of a PDF staged on disk
+PDFSource = Union[bytes, str]
+
+# MinHash signature length, split into LSH bands of BAND_ROWS values: pages
+# whose shingle sets overlap by about (1 / BANDS) ** (1 / BAND_ROWS) = 0.5
+# or more share a band with high probability
+SIGNATURE_SIZE = 64
+BAND_ROWS = 4
+BANDS = SIGNATURE_SIZE // BAND_ROWS
+# Words per shingle
+SHINGLE_WORDS = 3
+# Pages of an uploaded PDF read to match it
+SAMPLE_PAGES = 8
+# Estimated similarity below which a candidate page does not count
+MIN_SIMILARITY = 0.5
+# Buckets holding more pages than this are pages (such as shared boilerplate)
+# too common to tell templates apart, and are not scanned
+MAX_BUCKET = 256
+
+_EMPTY = 0xFFFFFFFF
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Text operations of a content stream: a font selection (Tf), a TJ array, or
+# the string of Tj, ' or "
+_TEXT_OPERATION = re.compile(
+    rb"/([^\s/\[\]()<>]+)\s+-?[\d.]+\s+Tf"
+    rb"|\[((?:[^\]\\]|\\.)*)\]\s*TJ|(\((?:[^()\\]|\\.)*\)|<[0-9A-Fa-f\s]*>)\s*(?:Tj|'|\")", re.S
+)
+# Strings and kerning adjustments inside a TJ array
+_TJ_ITEM = re.compile(rb"\(((?:[^()\\]|\\.)*)\)|<([0-9A-Fa-f\s]*)>|(-?\d*\.?\d+)", re.S)
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|.)", re.S)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+# A TJ adjustment this far left (thousandths of an em) reads as a space
+_WORD_GAP = -200
+
+
+def _unescape(literal: bytes) -> bytes:
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        return _ESCAPES.get(code, code)
+    return _ESCAPE.sub(replace, literal)
+
+
+def _string(operand: bytes) -> str:
+    """A literal (...) or hex <...> string operand as text, one character per byte"""
+    if operand.startswith(b"<"):
+        hex_digits = re.sub(rb"\s", b"", operand[1:-1])
+        return bytes.fromhex((hex_digits + b"0" * (len(hex_digits) % 2)).decode()).decode("latin-1")
+    return _unescape(operand[1:-1]).decode("latin-1")
+
+
+def _content_text(data: bytes, composite_fonts: Set[bytes]) -> str:
+    """The strings a content stream shows, in drawing order, without decoding fonts.
+
+    Strings shown in one of composite_fonts (resource names) are glyph ids
+    rather than characters and read as a word break.
+    """
+    pieces = []
+    composite = False
+    for operation in _TEXT_OPERATION.finditer(data):
+        font, array_operand, string_operand = operation.groups()
+        if font is not None:
+            composite = font in composite_fonts
+            continue
+        if composite:
+            pieces.append(" ")
+            continue
+        if array_operand is None:
+            pieces.append(_string(string_operand))
+        else:
+            for literal, hex_digits, adjustment in _TJ_ITEM.findall(array_operand):
+                if adjustment:
+                    if float(adjustment) <= _WORD_GAP:
+                        pieces.append(" ")
+                elif hex_digits:
+                    pieces.append(_string(b"<" + hex_digits + b">"))
+                else:
+                    pieces.append(_unescape(literal).decode("latin-1"))
+        pieces.append(" ")
+    return "".join(pieces)
+
+
+def page_text(page: PyPDF2.PageObject) -> str:
+    """Text of a page for signing.
+
+    The strings of simple (one byte per character) fonts are read straight
+    from the content streams, ten to fifty times faster than PyPDF2's
+    extract_text. Composite fonts' strings are skipped; a page drawn only
+    with them falls back to extract_text. Either way the same page always
+    gives the same text.
+    """
+    resources = page.get("/Resources")
+    fonts = resources.get_object().get("/Font") if resources is not None else None
+    fonts = fonts.get_object() if fonts is not None else {}
+    composite_fonts = {
+        name[1:].encode() for name, font in fonts.items() if font.get_object().get("/Subtype") == "/Type0"
+    }
+    contents = page.get_contents()
+    streams = list.__iter__(contents) if isinstance(contents, ArrayObject) else [contents]
+    data = b"\n".join(stream.get_object().get_data() for stream in streams if stream is not None)
+    text = _content_text(data, composite_fonts)
+    if composite_fonts and not _WORD.search(text.lower()):
+        return page.extract_text() or ""
+    return text
+
+
+def page_signature(text: str) -> Optional[array]:
+    """MinHash signature of the word shingles of a page's text, or None for a page without words.
+
+    One-permutation MinHash: every shingle is hashed once, the hash picks
+    one of SIGNATURE_SIZE bins and each bin keeps its smallest value. Empty
+    bins borrow the next non-empty bin's value, so short pages still give
+    full signatures. The fraction of equal positions in two signatures
+    estimates the Jaccard similarity of the pages' shingle sets.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    width = min(SHINGLE_WORDS, len(words))
+    mins = [_EMPTY] * SIGNATURE_SIZE
+    for i in range(len(words) - width + 1):
+        shingle = " ".join(words[i:i + width]).encode()
+        h = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        b, value = h % SIGNATURE_SIZE, (h // SIGNATURE_SIZE) & 0xFFFFFFFE
+        if value < mins[b]:
+            mins[b] = value
+    for b in range(SIGNATURE_SIZE):
+        if mins[b] == _EMPTY:
+            step = 1
+            while mins[(b + step) % SIGNATURE_SIZE] == _EMPTY:
+                step += 1
+            # Odd values mark borrowed bins, which never equal a real minimum
+            mins[b] = (mins[(b + step) % SIGNATURE_SIZE] + step * 2 + 1) & 0xFFFFFFFF
+    return array("I", mins)
+
+
+def sample_pages(page_count: int, sample: int = SAMPLE_PAGES) -> List[int]:
+    """Up to sample 1-based pages spread evenly over a document, first and last included"""
+    if page_count <= sample:
+        return list(range(1, page_count + 1))
+    return sorted({1 + i * (page_count - 1) // (sample - 1) for i in range(sample)})
+
+
+def page_signatures(pdf_source: PDFSource, page_numbers: Optional[List[int]] = None,
+                    sample: Optional[int] = None) -> Tuple[int, Dict[int, array]]:
+    """Page count and signatures of the given 1-based pages (None means every page).
+
+    With sample, only that many pages spread over the document are read.
+    Text comes from page_text whatever the template's text engine, so
+    stored and uploaded pages are always signed alike. Pages without words
+    are left out.
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_source) if isinstance(pdf_source, (bytes, bytearray)) else pdf_source)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    page_count = len(reader.pages)
+    if sample is not None:
+        wanted = sample_pages(page_count, sample)
+    else:
+        wanted = page_numbers if page_numbers is not None else range(1, page_count + 1)
+    signatures = {}
+    for n in wanted:
+        if 1 <= n <= page_count:
+            signature = page_signature(page_text(reader.pages[n - 1]))
+            if signature is not None:
+                signatures[n] = signature
+    return page_count, signatures
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of the pages two signatures were made from"""
+    return sum(1 for x, y in zip(a, b) if x == y) / SIGNATURE_SIZE
+
+
+@dataclass
+class TemplateMatch:
+    """The stored template an uploaded PDF is most like"""
+    template_id: str
+    page_offset: int  # template page = uploaded page + page_offset
+    score: float  # summed similarity of the matching pages over the pages sampled
+    pages_matched: int
+    pages_sampled: int
+
+
+class TemplateIndex:
+    """Locality-sensitive hash index over the pages of stored templates.
+
+    Each page's signature is cut into BANDS bands; pages sharing any band
+    land in a common bucket. Matching a PDF looks up the buckets of a few of
+    its pages, so its cost depends on the sample and the bucket sizes, not
+    on how many templates are stored. Candidates are checked against their
+    full signatures and vote for (template, page offset).
+    """
+
+    def __init__(self):
+        self._templates: List[str] = []
+        self._template_numbers: Dict[str, int] = {}
+        self._signatures: Dict[Tuple[int, int], array] = {}
+        self._buckets: Dict[int, List[Tuple[int, int]]] = {}
+
+    @classmethod
+    def from_signatures(cls, rows: Iterable[Tuple[str, int, array]]) -> "TemplateIndex":
+        """Index built from (template id, page, signature) rows, e.g. TemplateStore.page_signatures()"""
+        index = cls()
+        for template_id, page, signature in rows:
+            index.add(template_id, {page: signature})
+        return index
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    @staticmethod
+    def _band_keys(signature: array) -> List[int]:
+        return [hash((band, *signature[band * BAND_ROWS:(band + 1) * BAND_ROWS])) for band in range(BANDS)]
+
+    def add(self, template_id: str, signatures: Dict[int, array]):
+        """Index the page signatures of a template"""
+        number = self._template_numbers.get(template_id)
+        if number is None:
+            number = self._template_numbers[template_id] = len(self._templates)
+            self._templates.append(template_id)
+        for page, signature in signatures.items():
+            if (number, page) in self._signatures:
+                continue
+            self._signatures[(number, page)] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, []).append((number, page))
+
+    def match(self, signatures: Dict[int, array]) -> Optional[TemplateMatch]:
+        """Best (template, page offset) for the sampled page signatures of a PDF, or None"""
+        votes: Dict[Tuple[int, int], List[float]] = {}
+        for page, signature in signatures.items():
+            candidates = set()
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None and len(bucket) <= MAX_BUCKET:
+                    candidates.update(bucket)
+            # Each sampled page votes once per (template, offset), with its best similarity
+            best: Dict[Tuple[int, int], float] = {}
+            for number, stored_page in candidates:
+                score = similarity(signature, self._signatures[(number, stored_page)])
+                key = (number, stored_page - page)
+                if score >= MIN_SIMILARITY and score > best.get(key, 0.0):
+                    best[key] = score
+            for key, score in best.items():
+                votes.setdefault(key, []).append(score)
+        if not votes:
+            return None
+        (number, offset), scores = max(votes.items(), key=lambda item: (sum(item[1]), -abs(item[0][1])))
+        return TemplateMatch(
+            template_id=self._templates[number],
+            page_offset=offset,
+            score=round(sum(scores) / len(signatures), 4),
+            pages_matched=len(scores),
+            pages_sampled=len(signatures)
+        )
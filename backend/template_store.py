@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pdf_service import PDFField
+from settings import settings
+
+
+@dataclass
+class StoredTemplate:
+    """A template as the fill endpoints use it, parsed once per process"""
+    template_id: str
+    filled_values: Dict[str, str]
+    field_mappings: Dict[str, Any]
+    text_engine: Optional[str]
+    fields: List[PDFField]  # where to draw each profile field, without values
+    page_fingerprints: Dict[int, str]  # fingerprints of the blank's pages that have fields
+
+    def template_data(self) -> Dict[str, Any]:
+        """The template dict PDFService.fill_pdf_using_template takes"""
+        return {
+            'filled_values': self.filled_values,
+            'field_mappings': self.field_mappings,
+            'text_engine': self.text_engine,
+        }
+
+
+def template_id(body: Dict[str, Any]) -> str:
+    """Content hash of a template body, so storing the same template twice yields one row"""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def field_pages(template: Dict[str, Any]) -> List[int]:
+    """Pages of a new template's filled_regions, whose blank fingerprints are stored with it"""
+    return sorted({field.page for field in template.get('filled_regions') or [] if field.page is not None})
+
+
+class TemplateStore:
+    """Templates persisted in SQLite under their content hash.
+
+    Only what filling needs is kept: the filled values, the field mappings,
+    the field positions found when the template was created and the blank
+    PDF's fingerprints of the pages those fields are on. Parsed templates
+    are kept in a small LRU, so a fill that names a template by id costs a
+    dict lookup.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = 64):
+        self.path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates.sqlite3")
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, StoredTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS templates (id TEXT PRIMARY KEY, created REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS page_signatures ("
+            "id TEXT NOT NULL, page INTEGER NOT NULL, signature BLOB NOT NULL, PRIMARY KEY (id, page))"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_settings(cls) -> "TemplateStore":
+        return cls(settings.template_store_path)
+
+    def put(self, template: Dict[str, Any], page_fingerprints: Dict[int, str],
+            page_signatures: Optional[Dict[int, array]] = None) -> str:
+        """Persist a template from PDFService.compare_pdfs_and_extract_template; returns its id.
+
+        page_fingerprints are the blank PDF's fingerprints of the pages its
+        filled_regions are on; page_signatures the blank's page signatures
+        (see template_index), by which uploads are matched to the template.
+        """
+        fields = [
+            {**asdict(field), 'value': ""}
+            for field in template.get('filled_regions') or []
+        ]
+        body = {
+            'filled_values': template.get('filled_values', {}),
+            'field_mappings': template.get('field_mappings', {}),
+            'text_engine': template.get('text_engine'),
+            'fields': fields,
+            'page_fingerprints': {str(page): digest for page, digest in page_fingerprints.items()},
+        }
+        key = template_id(body)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO templates (id, created, body) VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(body, separators=(",", ":"), ensure_ascii=False))
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO page_signatures (id, page, signature) VALUES (?, ?, ?)",
+                [(key, page, signature.tobytes()) for page, signature in (page_signatures or {}).items()]
+            )
+            self._db.commit()
+        return key
+
+    def get(self, key: str) -> Optional[StoredTemplate]:
+        """The stored template with this id, or None"""
+        with self._lock:
+            stored = self._cache.get(key)
+            if stored is not None:
+                self._cache.move_to_end(key)
+                return stored
+            row = self._db.execute("SELECT body FROM templates WHERE id = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        body = json.loads(row[0])
+        stored = StoredTemplate(
+            template_id=key,
+            filled_values=body['filled_values'],
+            field_mappings=body['field_mappings'],
+            text_engine=body['text_engine'],
+            fields=[PDFField(**field) for field in body['fields']],
+            page_fingerprints={int(page): digest for page, digest in body['page_fingerprints'].items()},
+        )
+        with self._lock:
+            self._cache[key] = stored
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return stored
+
+    def page_signatures(self) -> Iterator[Tuple[str, int, array]]:
+        """(template id, page, signature) of every stored blank page"""
+        with self._lock:
+            rows = self._db.execute("SELECT id, page, signature FROM page_signatures ORDER BY id, page").fetchall()
+        for key, page, blob in rows:
+            signature = array("I")
+            signature.frombytes(blob)
+            yield key, page, signature
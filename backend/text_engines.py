@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import io
+from typing import Dict, List, Optional, Tuple, Union
+
+import PyPDF2
+
+from compiled_template import COMPILED_TEMPLATE
+from settings import settings
+
+# PDF bytes, or the path of a PDF staged on disk
+PDFSource = Union[bytes, str]
+
+# Layout-aware text from pdfplumber: reading order and spacing follow the
+# page layout, which the field patterns were written against
+PDFPLUMBER = "pdfplumber"
+# Raw content-stream text from PyPDF2: several times faster, but spacing and
+# line breaks follow the order the text was drawn in
+PYPDF2 = "pypdf2"
+
+TEXT_ENGINES = (PDFPLUMBER, PYPDF2)
+
+
+def default_engine() -> str:
+    """Engine used when a request names none: the compiled template's, then the configured one"""
+    engine = COMPILED_TEMPLATE.current().text_engine
+    return engine if engine in TEXT_ENGINES else settings.text_engine
+
+
+def resolve_engine(engine: Optional[str]) -> str:
+    """Validate an engine name, falling back to default_engine().
+
+    Raises ValueError for unknown engines.
+    """
+    engine = (engine or default_engine()).lower()
+    if engine not in TEXT_ENGINES:
+        raise ValueError(f"Unknown text engine '{engine}' (expected one of: {', '.join(TEXT_ENGINES)})")
+    return engine
+
+
+def extract_raw_texts(pdf_source: PDFSource, page_numbers: Optional[List[int]]
+                      ) -> Tuple[int, Dict[str, str], Dict[int, str]]:
+    """Page count, metadata and raw PyPDF2 text of the given 1-based pages (None means every page)"""
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_source) if isinstance(pdf_source, (bytes, bytearray)) else pdf_source)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    page_count = len(reader.pages)
+    metadata = {str(k).lstrip("/"): str(v) for k, v in (reader.metadata or {}).items()}
+    wanted = page_numbers if page_numbers is not None else range(1, page_count + 1)
+    texts = {n: reader.pages[n - 1].extract_text() or "" for n in wanted if 1 <= n <= page_count}
+    return page_count, metadata, texts
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from metrics import phase
+from profiling import note_document
+from settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+# Room in a request body for multipart boundaries, part headers and form fields
+# beyond the files AUTO_TENDER_MAX_REQUEST_MB counts
+BODY_OVERHEAD = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the per-file or per-request size cap"""
+
+
+@dataclass
+class SpooledUpload:
+    """An upload streamed to disk, addressed by its SHA-256"""
+    path: str
+    size: int
+    sha256: str
+    filename: Optional[str] = None
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def discard(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _copy_to_disk(source: BinaryIO, limit: int, directory: Optional[str]) -> SpooledUpload:
+    """Copy a file object to a named temp file in fixed-size chunks, hashing as it goes"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="upload-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLargeError(f"Upload exceeds {limit // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path=path, size=size, sha256=digest.hexdigest())
+
+
+class BodyLimitMiddleware:
+    """ASGI middleware refusing request bodies past the request cap while they arrive.
+
+    A declared Content-Length over the cap gets a 413 before any of the
+    body is read; otherwise received bytes are counted and the upload is
+    cut off with a 413 as soon as they pass it, so an oversized request
+    never reaches disk in full. Starlette still spools each file it parses
+    (and spooled_uploads copies it once more to hash it), so within the cap
+    the per-file limit is only checked after the file has been received.
+    """
+
+    def __init__(self, app, max_request_bytes: Optional[int] = None):
+        self.app = app
+        max_request_bytes = max_request_bytes or settings.max_request_bytes
+        self.max_body_bytes = max_request_bytes + BODY_OVERHEAD
+        self.detail = f"Request uploads exceed {max_request_bytes // (1024 * 1024)} MB"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_body_bytes
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            body = b'{"detail":"%s"}' % self.detail.encode()
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()), (b"connection", b"close")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the app's body parsing, which returns HTTPExceptions as they are
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, counted_receive, send)
+
+
+@asynccontextmanager
+async def spooled_uploads(*files: UploadFile):
+    """Stream uploads to size-capped temp files and delete them afterwards.
+
+    Each file is capped at AUTO_TENDER_MAX_UPLOAD_MB and all files of the
+    request together at AUTO_TENDER_MAX_REQUEST_MB, so no endpoint ever
+    holds a whole PDF in memory. The files have already been received by
+    then: BodyLimitMiddleware is what bounds the body as it arrives.
+    Yields one SpooledUpload per file.
+    """
+    spooled: List[SpooledUpload] = []
+    remaining = settings.max_request_bytes
+    try:
+        for upload in files:
+            limit = min(settings.max_upload_bytes, remaining)
+            await upload.seek(0)
+            with phase("upload_read"):
+                item = await asyncio.to_thread(_copy_to_disk, upload.file, limit, settings.upload_dir)
+            item.filename = upload.filename
+            note_document(item.sha256)
+            spooled.append(item)
+            remaining -= item.size
+        yield spooled
+    finally:
+        for item in spooled:
+            item.discard()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Cold-start measurement and warm-up of the processes that run PDF work.
+
+The first PDF call in a fresh process pays for loading pdfplumber and
+reportlab, initialising reportlab's fonts and stylesheet, and compiling
+pdfminer's and PyPDF2's lazily built tables. ``warm_up`` pays for all of
+that at boot: it imports the heavy modules, timing each, then runs the
+extract, locate, fingerprint and fill paths on a one-page PDF built here,
+and forgets that PDF so it does not sit in the worker's caches. Each
+executor worker runs it in its initializer (AUTO_TENDER_WARMUP), and
+the app waits for the workers to be ready before it serves requests.
+
+Run ``python warmup.py`` for a cold-start report of a fresh process: how
+long importing the app and warming up took, step by step.
+"""
+import importlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Modules PDF work needs that the API process does not import itself
+HEAVY_MODULES = ("pdfplumber", "PyPDF2", "reportlab.pdfgen.canvas", "reportlab.platypus",
+                 "reportlab.lib.styles", "pdf_summary")
+
+WARMUP_PROFILE = {"company_name": "Warm-up Ltd", "phone": "+254 700 000000"}
+
+# This process's warm-up report, for worker_report
+_REPORT: Optional[Dict[str, Any]] = None
+
+
+def _tiny_pdf() -> bytes:
+    """A one-page tender form: a title, a label with a leader to fill, Helvetica only"""
+    content = (b"BT /F1 12 Tf 72 720 Td (TENDER NO: WARMUP/001) Tj ET\n"
+               b"BT /F1 11 Tf 72 690 Td (Name of Tenderer: ..............................) Tj ET")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+WARMUP_PDF = _tiny_pdf()
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started, interpreter start-up included (Linux only)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(max(0.0, uptime - started / os.sysconf("SC_CLK_TCK")), 3)
+
+
+def _timed(timings: Dict[str, float], name: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        fn(*args)
+    except Exception as e:
+        # A failed step only leaves that path cold
+        logger.warning("Warm-up step %s failed: %s", name, e)
+    timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def warm_up() -> Dict[str, Any]:
+    """Import the heavy modules and run each PDF path once; returns the time of every step in ms"""
+    global _REPORT
+    from pdf_cache import DOCUMENT_CACHE, document_key
+    from pdf_service import PDFField, PDFService, TenderInfo
+
+    start = time.perf_counter()
+    imports: Dict[str, float] = {}
+    for name in HEAVY_MODULES:
+        _timed(imports, name, importlib.import_module, name)
+
+    steps: Dict[str, float] = {}
+    tender = TenderInfo("Warm-up", "WARMUP/001", "Warm-up")
+    field = PDFField("company_name", 170, 90, 200, 14, page=1)
+    _timed(steps, "extract", PDFService.extract_data_from_filled_pdf, WARMUP_PDF)
+    _timed(steps, "locate", PDFService.get_field_coordinates, WARMUP_PDF)
+    _timed(steps, "fingerprint", PDFService.page_fingerprints, WARMUP_PDF)
+    _timed(steps, "fill", PDFService.fill_pdf, WARMUP_PDF, WARMUP_PROFILE, tender, [field])
+    _timed(steps, "fill_using_template", PDFService.fill_pdf_using_template,
+           {"filled_values": WARMUP_PROFILE}, WARMUP_PDF, WARMUP_PROFILE)
+    DOCUMENT_CACHE.discard(document_key(WARMUP_PDF))
+
+    _REPORT = {
+        "pid": os.getpid(),
+        "imports_ms": imports,
+        "steps_ms": steps,
+        "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        "process_age_s": process_age(),
+    }
+    logger.info("Warmed up in %.0f ms", _REPORT["total_ms"], extra={"warmup": _REPORT})
+    return _REPORT
+
+
+def worker_report() -> Optional[Dict[str, Any]]:
+    """The warm-up report of the worker running this, or None when it was not warmed up"""
+    return _REPORT
+
+
+def main():
+    """Print the cold-start report of this fresh process as JSON"""
+    from logs import configure_logging
+
+    start = time.perf_counter()
+    importlib.import_module("main")
+    imported = time.perf_counter() - start
+    age = process_age()
+    configure_logging("WARNING")
+    report = warm_up()
+    print(json.dumps({"import_app_ms": round(imported * 1000, 2), "started_to_imported_s": age, **report},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Distance (points) on each axis within which a blank word with the same
+# text counts as the same word
+TOLERANCE = 5.0
+
+# Vertical distance (points) within which new words share a line
+LINE_TOLERANCE = 2.0
+# Horizontal gap (points) beyond which new words on a line start a new region
+REGION_GAP = 12.0
+
+
+class WordGrid:
+    """Word positions bucketed by text and a uniform grid of tolerance-sized cells.
+
+    A word within the tolerance of (x, y) can only sit in that point's cell
+    or one of its eight neighbours, so a lookup inspects at most nine small
+    buckets however many words the page holds.
+    """
+
+    def __init__(self, words: Iterable[Tuple[str, float, float]], tolerance: float = TOLERANCE):
+        self.tolerance = tolerance
+        self._cells: Dict[Tuple[str, int, int], List[Tuple[float, float]]] = defaultdict(list)
+        for text, x, y in words:
+            self._cells[(text, math.floor(x / tolerance), math.floor(y / tolerance))].append((x, y))
+
+    def contains(self, text: str, x: float, y: float) -> bool:
+        """Whether a word with this text lies strictly within the tolerance of (x, y) on both axes"""
+        cell_x, cell_y = math.floor(x / self.tolerance), math.floor(y / self.tolerance)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for word_x, word_y in self._cells.get((text, cell_x + dx, cell_y + dy), ()):
+                    if abs(word_x - x) < self.tolerance and abs(word_y - y) < self.tolerance:
+                        return True
+        return False
+
+
+def new_words(filled_words: List[Dict], blank_words: List[Dict], tolerance: float = TOLERANCE,
+              x_key: str = "x0", y_key: str = "top") -> List[Dict]:
+    """Filled words with no blank word of the same text at (about) the same position.
+
+    Words are dicts such as pdfplumber's extract_words() output; x_key and
+    y_key name their coordinates. The filled words are returned unchanged,
+    in order.
+    """
+    grid = WordGrid(((w["text"], w[x_key], w[y_key]) for w in blank_words), tolerance)
+    return [
+        w for w in filled_words
+        if w["text"].strip() and not grid.contains(w["text"], w[x_key], w[y_key])
+    ]
+
+
+def word_regions(words: List[Dict], line_tolerance: float = LINE_TOLERANCE,
+                 gap: float = REGION_GAP) -> List[Dict]:
+    """Merge words (with x0, x1, top, bottom) that run on along a line into regions.
+
+    Each region has the bounding box of its words and their joined text, so
+    a multi-word filled value becomes one box.
+    """
+    regions: List[Dict] = []
+    for word in sorted(words, key=lambda w: (round(w["top"] / line_tolerance), w["x0"])):
+        last = regions[-1] if regions else None
+        if (last is not None and abs(word["top"] - last["top"]) <= line_tolerance
+                and 0 <= word["x0"] - last["x1"] <= gap):
+            last["text"] += " " + word["text"]
+            last["x1"] = max(last["x1"], word["x1"])
+            last["bottom"] = max(last["bottom"], word["bottom"])
+        else:
+            regions.append({k: word[k] for k in ("text", "x0", "x1", "top", "bottom")})
+    return regions
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import io
+import zipfile
+from typing import Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile writes into"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamWriter:
+    """Builds a ZIP archive incrementally and hands back the bytes as they are produced.
+
+    The sink is not seekable, so zipfile writes each member's sizes in a
+    data descriptor after its content and nothing needs to be rewritten.
+    Members are stored uncompressed since PDFs are already compressed.
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=zipfile.ZIP_STORED)
+
+    def add_file(self, arcname: str, path: str) -> Iterator[bytes]:
+        """Copy a file into the archive, yielding output chunk by chunk"""
+        with open(path, "rb") as source, self._zip.open(arcname, mode="w", force_zip64=True) as member:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                member.write(chunk)
+                yield self._sink.drain()
+        yield self._sink.drain()
+
+    def add_bytes(self, arcname: str, data: bytes) -> bytes:
+        self._zip.writestr(arcname, data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the final bytes"""
+        self._zip.close()
+        return self._sink.drain()
@@ -68,6 +68,13 @@ def analyze_field_patterns():
         'fields': {}
     }
     
+    # Value types other than free text
+    field_types = {
+        'annual_turnover': 'number',
+        'project_value': 'number',
+        'completion_date': 'date'
+    }
+    
     # Add fields to mapping
     field_id = 1
     for category, fields in field_categories.items():
@@ -76,7 +83,7 @@ def analyze_field_patterns():
                 'name': field_name,
                 'category': category,
                 'placeholder': placeholder,
-                'type': 'text',  # Default type
+                'type': field_types.get(field_name, 'text'),
                 'required': True
             }
             field_id += 1
@@ -126,6 +133,7 @@ def analyze_field_patterns():
         json.dump(profile_template, f, indent=2)
     
     print(f"Profile template saved to profile_template.json")
+    print("Run backend/compiled_template.py to rebuild the compiled template (the backend also does on startup)")
     
     return field_mapping, profile_template
 
@@ -1,23 +1,44 @@
 import { CompanyProfile } from '@/types/profile';
-import { TenderInfo } from '@/lib/pdf-processor';
+import { PDFField, TenderInfo } from '@/lib/pdf-processor';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// pdfplumber: layout-aware text; pypdf2: raw content-stream text, several times faster
+export type TextEngine = 'pdfplumber' | 'pypdf2';
+
+const engineQuery = (engine?: TextEngine) => (engine ? `?engine=${engine}` : '');
+
 export interface TemplateData {
   filled_values: Record<string, string>;
   field_mappings: Record<string, any>;
-  extracted_data: any;
+  // Raw extraction; the server keeps it and leaves it out of created templates
+  extracted_data?: any;
+  // Boxes of the filled-in text, named after the profile field they hold
+  filled_regions?: PDFField[];
+  text_engine?: TextEngine;
+  // Id of the server-side copy, which fills can send instead of the template
+  template_id?: string;
+}
+
+export interface TemplateMatch {
+  template_id: string;
+  // Template page = uploaded page + page_offset
+  page_offset: number;
+  score: number;
+  pages_matched: number;
+  pages_sampled: number;
+  page_count: number;
 }
 
 export class APIClient {
   /**
    * Extract tender information from uploaded PDF
    */
-  static async extractTenderInfo(file: File): Promise<TenderInfo> {
+  static async extractTenderInfo(file: File, engine?: TextEngine): Promise<TenderInfo> {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response = await fetch(`${API_BASE_URL}/extract-tender-info`, {
+    const response = await fetch(`${API_BASE_URL}/extract-tender-info${engineQuery(engine)}`, {
       method: 'POST',
       body: formData,
     });
@@ -94,13 +115,14 @@ export class APIClient {
    */
   static async comparePDFsAndCreateTemplate(
     filledPDF: File,
-    blankPDF: File
+    blankPDF: File,
+    engine?: TextEngine
   ): Promise<TemplateData> {
     const formData = new FormData();
     formData.append('filled_pdf', filledPDF);
     formData.append('blank_pdf', blankPDF);
 
-    const response = await fetch(`${API_BASE_URL}/compare-pdfs-and-create-template`, {
+    const response = await fetch(`${API_BASE_URL}/compare-pdfs-and-create-template${engineQuery(engine)}`, {
       method: 'POST',
       body: formData,
     });
@@ -111,7 +133,30 @@ export class APIClient {
     }
 
     const data = await response.json();
-    return data.template;
+    return { ...data.template, template_id: data.template_id };
+  }
+
+  /**
+   * Find the stored template a blank PDF was made from; null when none matches
+   */
+  static async matchTemplate(blankPDF: File): Promise<TemplateMatch | null> {
+    const formData = new FormData();
+    formData.append('blank_pdf', blankPDF);
+
+    const response = await fetch(`${API_BASE_URL}/templates/match`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (response.status === 404) {
+      return null;
+    }
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new Error(`Failed to match template: ${errorText}`);
+    }
+
+    return response.json();
   }
 
   /**
@@ -120,10 +165,17 @@ export class APIClient {
   static async fillPDFUsingTemplate(blankPDF: File, templateData: TemplateData, profile: CompanyProfile): Promise<Blob> {
     const formData = new FormData();
     formData.append('blank_pdf', blankPDF);
-    formData.append('template_data', JSON.stringify(templateData));
     formData.append('profile_data', JSON.stringify(profile));
 
-    const response = await fetch(`${API_BASE_URL}/fill-pdf-using-template`, {
+    // A stored template is referenced by id rather than posted again
+    let query = '';
+    if (templateData.template_id) {
+      query = `?template_id=${encodeURIComponent(templateData.template_id)}`;
+    } else {
+      formData.append('template_data', JSON.stringify(templateData));
+    }
+
+    const response = await fetch(`${API_BASE_URL}/fill-pdf-using-template${query}`, {
       method: 'POST',
       body: formData,
     });
@@ -140,7 +192,7 @@ export class APIClient {
   /**
    * Extract data from a filled PDF
    */
-  static async extractDataFromFilledPDF(filledPDF: File): Promise<{
+  static async extractDataFromFilledPDF(filledPDF: File, engine?: TextEngine): Promise<{
     extracted_values: Record<string, string>;
     pages_processed: number;
     fields_found: string[];
@@ -148,7 +200,7 @@ export class APIClient {
     const formData = new FormData();
     formData.append('filled_pdf', filledPDF);
 
-    const response = await fetch(`${API_BASE_URL}/extract-data-from-filled-pdf`, {
+    const response = await fetch(`${API_BASE_URL}/extract-data-from-filled-pdf${engineQuery(engine)}`, {
       method: 'POST',
       body: formData,
     });
@@ -207,10 +259,16 @@ export class APIClient {
   }
 
   /**
-   * Get field coordinates for PDF templates
+   * Locate the fillable placeholders of a PDF template
    */
-  static async getFieldCoordinates(): Promise<any[]> {
-    const response = await fetch(`${API_BASE_URL}/field-coordinates`);
+  static async getFieldCoordinates(templateFile: File): Promise<any[]> {
+    const formData = new FormData();
+    formData.append('template_file', templateFile);
+
+    const response = await fetch(`${API_BASE_URL}/field-coordinates`, {
+      method: 'POST',
+      body: formData,
+    });
 
     if (!response.ok) {
       throw new Error(`Failed to get field coordinates: ${response.statusText}`);
@@ -220,17 +278,30 @@ export class APIClient {
     return data.fields;
   }
 
-  static async comparePDFsAndExtractDifferences(filledPDF: File, blankPDF: File): Promise<{
+  static async comparePDFsAndExtractDifferences(
+    filledPDF: File,
+    blankPDF: File,
+    options: { pages?: string; mode?: 'full' | 'first'; engine?: TextEngine } = {}
+  ): Promise<{
     differences: Record<string, any[]>;
     filled_values: Record<string, string>;
     pages_compared: string[];
     total_differences: number;
+    pages_scanned: number;
+    pages_skipped: number;
+    first_difference_page?: string | null;
   }> {
     const formData = new FormData();
     formData.append('filled_pdf', filledPDF);
     formData.append('blank_pdf', blankPDF);
 
-    const response = await fetch(`${API_BASE_URL}/compare-pdfs-and-extract-differences`, {
+    const params = new URLSearchParams();
+    if (options.pages) params.append('pages', options.pages);
+    if (options.mode) params.append('mode', options.mode);
+    if (options.engine) params.append('engine', options.engine);
+    const query = params.toString() ? `?${params.toString()}` : '';
+
+    const response = await fetch(`${API_BASE_URL}/compare-pdfs-and-extract-differences${query}`, {
       method: 'POST',
       body: formData,
     });
@@ -14,6 +14,7 @@ export interface PDFField {
   width: number;
   height: number;
   value: string;
+  page?: number;
 }
 
 export interface PDFTemplate {